@@ -0,0 +1,221 @@
+"""
+Asynchronous aggregate maintenance — range buckets and org rollups from the
+``queries`` change stream.
+
+With ``aggregates_mode="stream"`` ingest is a single insert: the event is
+stored with ``deferred: true`` (and the member's ``org_id``), and
+``python -m app.jobs.aggregates`` tails the collection's change stream for
+such inserts and applies their increments (see ``buckets.increments`` and
+``orgs.member_increment``):
+
+- events are gathered for up to ``aggregates_batch_ms`` or
+  ``aggregates_batch_size`` events, and increments to the same bucket or
+  leaderboard row are merged into one ``$inc``;
+- each batch is written in one transaction together with the stream's
+  resume token (the ``aggregates`` checkpoint), so every event is counted
+  exactly once, whatever point the worker dies at;
+- the transaction also renews the worker's leader lock and aborts if another
+  worker has taken it, so two workers never count the same events.
+
+The checkpoint's ``applied_through`` — the time of the last applied event,
+or of the last poll that found none — holds back the buckets' seal line
+(``buckets.seal_line``): prefix sums are only stored for buckets the worker
+can no longer increment, however far behind it falls.
+
+After downtime the worker resumes from the saved token and replays what it
+missed, as long as the oplog still holds it; the ``aggregates.lag_seconds``
+gauge (age of the newest applied event, 0 when idle) shows how far behind it
+is. If the history is gone, rebuild the user buckets with
+``python -m app.jobs.build_buckets`` while the worker is stopped and restart
+it with ``--reset``; org rollups miss the events in between.
+
+Only ``deferred`` events are counted, so API workers still ingesting inline
+during a rollout are not counted twice. Change streams need a replica set,
+and time-series collections have none, so this requires the ``standard``
+query storage. The memory backend always aggregates inline.
+"""
+
+from __future__ import annotations
+
+import calendar
+import time
+from collections.abc import Iterable
+from datetime import datetime, timedelta
+from typing import Any
+
+from bson import Timestamp
+from loguru import logger
+from pymongo import UpdateOne
+from pymongo.client_session import ClientSession
+from pymongo.database import Database
+
+from app import buckets, metrics, orgs
+from app.jobs.state import load_checkpoint, save_checkpoint
+from app.locks import acquire_lock
+from app.models.query import STANDARD_LAYOUT
+
+JOB_NAME = "aggregates"
+LOCK_TTL_SECONDS = 60
+# ChangeStreamFatalError, ChangeStreamHistoryLost: the resume token is no
+# longer in the oplog
+HISTORY_LOST_CODES = (280, 286)
+
+_PIPELINE = [
+    {"$match": {"operationType": "insert", "fullDocument.deferred": True}},
+    {
+        "$project": {
+            "clusterTime": 1,
+            **{
+                f"fullDocument.{field}": 1
+                for field in ("user_id", "platform", "carbon_grams", "timestamp", "org_id")
+            },
+        }
+    },
+]
+
+Increments = dict[str, list[tuple[dict[str, Any], dict[str, float]]]]
+
+
+class LeadershipLost(RuntimeError):
+    """Another worker has taken the aggregates lock."""
+
+
+def merge(changes: Iterable[dict[str, Any]]) -> Increments:
+    """Per collection, one ``(filter, $inc)`` per target document for a batch of inserts."""
+    merged: dict[str, dict[tuple, tuple[dict[str, Any], dict[str, float]]]] = {}
+
+    def add(collection: str, filter_: dict[str, Any], inc: dict[str, float]) -> None:
+        entries = merged.setdefault(collection, {})
+        key = tuple(filter_.items())
+        if key not in entries:
+            entries[key] = (filter_, dict(inc))
+            return
+        total = entries[key][1]
+        for field, amount in inc.items():
+            total[field] = total.get(field, 0) + amount
+
+    for change in changes:
+        doc = change["fullDocument"]
+        user_id, platform, carbon = doc["user_id"], doc["platform"], doc["carbon_grams"]
+        for filter_, inc in buckets.increments(user_id, platform, carbon, doc["timestamp"]):
+            add(buckets.BUCKETS_COLLECTION, filter_, inc)
+        org_id = doc.get("org_id")
+        if org_id is not None:
+            store = buckets.ORG_BUCKETS
+            for filter_, inc in buckets.increments(org_id, platform, carbon, doc["timestamp"], store):
+                add(store.collection, filter_, inc)
+            add(orgs.MEMBER_TOTALS_COLLECTION, *orgs.member_increment(org_id, user_id, platform, carbon))
+    return {collection: list(entries.values()) for collection, entries in merged.items()}
+
+
+def _event_time(change: dict[str, Any]) -> datetime:
+    return change["clusterTime"].as_datetime().replace(tzinfo=None)
+
+
+def applied_through(db: Database) -> datetime | None:
+    """Instant before which every deferred event has been applied (None before the worker's first batch or poll)."""
+    return load_checkpoint(db, JOB_NAME).get("applied_through")
+
+
+def apply_batch(db: Database, changes: list[dict[str, Any]], owner: str) -> None:
+    """Apply *changes* and save the resume token after the last one, atomically."""
+    increments = merge(changes)
+    last = changes[-1]
+
+    def write(session: ClientSession) -> None:
+        # Renew the lock inside the transaction: if it has passed to another
+        # worker, nothing of this batch is written
+        fenced = db.locks.update_one(
+            {"_id": JOB_NAME, "owner": owner},
+            {"$set": {"expires_at": datetime.utcnow() + timedelta(seconds=LOCK_TTL_SECONDS)}},
+            session=session,
+        )
+        if not fenced.matched_count:
+            raise LeadershipLost(f"Lock {JOB_NAME!r} is no longer held by {owner}")
+        for collection, entries in increments.items():
+            db[collection].bulk_write(
+                [UpdateOne(filter_, {"$inc": inc}, upsert=True) for filter_, inc in entries],
+                ordered=False,
+                session=session,
+            )
+        at = _event_time(last)
+        save_checkpoint(
+            db, JOB_NAME, session=session, resume_token=last["_id"], last_event_at=at, applied_through=at
+        )
+
+    with db.client.start_session() as session:
+        session.with_transaction(write)
+
+
+def run(
+    db: Database,
+    owner: str,
+    *,
+    batch_size: int,
+    batch_ms: int,
+    since: datetime | None = None,
+    follow: bool = True,
+) -> int:
+    """
+    Tail the change stream and apply its events in batches.
+
+    Resumes after the saved token, or starts at *since* (naive UTC) or now
+    when there is none. Returns the number of events applied once the stream
+    is drained, unless *follow*, in which case it runs until interrupted.
+    """
+    options: dict[str, Any] = {}
+    token = load_checkpoint(db, JOB_NAME).get("resume_token")
+    if token is not None:
+        options["resume_after"] = token
+    elif since is not None:
+        options["start_at_operation_time"] = Timestamp(calendar.timegm(since.timetuple()), 0)
+
+    lag = metrics.gauge("aggregates.lag_seconds")
+    applied = metrics.counter("aggregates.events")
+    batch_timer = metrics.summary("aggregates.batch_ms")
+    total = 0
+    renewed = time.monotonic()
+    collection = db[STANDARD_LAYOUT.collection]
+    with collection.watch(_PIPELINE, max_await_time_ms=batch_ms, **options) as stream:
+
+        def mark_idle(polled_at: datetime) -> None:
+            # Keep the lock, move the token past the quiet period so a
+            # restart does not need old oplog entries, and let the seal line
+            # advance: everything inserted before the poll has been applied
+            # (up to commit latency, well within the seal grace period)
+            if not acquire_lock(db, JOB_NAME, owner, LOCK_TTL_SECONDS):
+                raise LeadershipLost(f"Lock {JOB_NAME!r} is no longer held by {owner}")
+            fields: dict[str, Any] = {"applied_through": polled_at}
+            if stream.resume_token is not None:
+                fields["resume_token"] = stream.resume_token
+            save_checkpoint(db, JOB_NAME, **fields)
+
+        while True:
+            polled_at = datetime.utcnow()
+            batch: list[dict[str, Any]] = []
+            deadline = time.monotonic() + batch_ms / 1000
+            while len(batch) < batch_size and time.monotonic() < deadline:
+                change = stream.try_next()
+                if change is None:
+                    break
+                batch.append(change)
+
+            if batch:
+                started = time.perf_counter()
+                apply_batch(db, batch, owner)
+                batch_timer.observe((time.perf_counter() - started) * 1000)
+                applied.inc(len(batch))
+                total += len(batch)
+                behind = (datetime.utcnow() - _event_time(batch[-1])).total_seconds()
+                lag.set(max(behind, 0.0))
+                renewed = time.monotonic()
+                logger.debug("Applied {} events ({:.1f} s behind)", len(batch), behind)
+                continue
+
+            lag.set(0.0)
+            if not follow:
+                mark_idle(polled_at)
+                return total
+            if time.monotonic() - renewed >= LOCK_TTL_SECONDS / 3:
+                mark_idle(polled_at)
+                renewed = time.monotonic()
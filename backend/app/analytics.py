@@ -0,0 +1,347 @@
+"""
+Platform-wide analytics — incremental, parallel map-reduce over query events.
+
+``run_analytics()`` processes whole UTC days that have not been processed
+yet. The user-id keyspace is split into contiguous ranges and each range is
+aggregated by its own MongoDB pipeline, in parallel (map); the partial
+results are merged in Python (reduce) and written to:
+
+- ``analytics_platform_daily`` — queries and CO₂ per (day, platform);
+- ``analytics_user_totals``   — all-time queries and CO₂ per user, with the
+  user's signup cohort (month);
+- ``analytics_cohorts``       — per cohort: users, active users, average
+  eco-score (same thresholds as the dashboard) and totals.
+
+Progress is a day watermark in ``job_state``. The window being processed is
+recorded before any write and re-used if a run is interrupted: daily rows are
+written with ``$set``, and user totals remember which window they include,
+so a re-run never counts a day twice. The first run also folds in compacted
+``query_summaries``. Re-pricing resets everything (``reset_analytics``).
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any
+
+from bson import ObjectId
+from loguru import logger
+from pymongo import UpdateOne
+from pymongo.database import Database
+
+from app.constants.eco_score import ECO_SCORE_MIN, ECO_SCORE_THRESHOLDS
+from app.jobs.state import clear_checkpoint, load_checkpoint, save_checkpoint
+from app.models.query import QueryLayout
+
+JOB_NAME = "analytics"
+PLATFORM_DAILY = "analytics_platform_daily"
+USER_TOTALS = "analytics_user_totals"
+COHORTS = "analytics_cohorts"
+
+_DAY_FORMAT = "%Y-%m-%d"
+
+# (day, platform) → [queries, carbon, users]
+PlatformDays = dict[tuple[str, str], list[float]]
+# user_id → [queries, carbon]
+UserTotals = dict[ObjectId, list[float]]
+
+
+def eco_score(avg_carbon: float) -> int:
+    """Score a user's average grams per query, 5 (best) to 1."""
+    for bound, score in ECO_SCORE_THRESHOLDS:
+        if avg_carbon <= bound:
+            return score
+    return ECO_SCORE_MIN
+
+
+def _eco_score_expr(avg: Any) -> dict[str, Any]:
+    """``eco_score()`` as an aggregation expression."""
+    return {
+        "$switch": {
+            "branches": [{"case": {"$lte": [avg, bound]}, "then": score} for bound, score in ECO_SCORE_THRESHOLDS],
+            "default": ECO_SCORE_MIN,
+        }
+    }
+
+
+def user_ranges(db: Database, parts: int) -> list[tuple[ObjectId | None, ObjectId | None]]:
+    """Split the users' ``_id`` keyspace into up to *parts* contiguous ranges."""
+    if parts < 2:
+        return [(None, None)]
+    buckets = list(db.users.aggregate([{"$bucketAuto": {"groupBy": "$_id", "buckets": parts}}]))
+    starts = [b["_id"]["min"] for b in buckets[1:]]
+    edges: list[ObjectId | None] = [None, *starts, None]
+    return list(zip(edges[:-1], edges[1:]))
+
+
+def _id_range(lower: ObjectId | None, upper: ObjectId | None) -> dict[str, ObjectId]:
+    bounds: dict[str, ObjectId] = {}
+    if lower is not None:
+        bounds["$gte"] = lower
+    if upper is not None:
+        bounds["$lt"] = upper
+    return bounds
+
+
+def _map_range(
+    db: Database,
+    layout: QueryLayout,
+    users: tuple[ObjectId | None, ObjectId | None],
+    since: datetime | None,
+    until: datetime,
+    include_summaries: bool,
+) -> tuple[PlatformDays, UserTotals]:
+    """Aggregate one user range's events in ``[since, until)``."""
+    match: dict[str, Any] = {"timestamp": {"$lt": until}}
+    if since is not None:
+        match["timestamp"]["$gte"] = since
+    if bounds := _id_range(*users):
+        match[layout.user_field] = bounds
+
+    groups: list[Iterable[dict[str, Any]]] = [
+        db[layout.collection].aggregate(
+            [
+                {"$match": match},
+                {
+                    "$group": {
+                        "_id": {
+                            "user": f"${layout.user_field}",
+                            "day": {"$dateToString": {"format": _DAY_FORMAT, "date": "$timestamp"}},
+                            "platform": f"${layout.platform_field}",
+                        },
+                        "count": {"$sum": 1},
+                        "carbon": {"$sum": "$carbon_grams"},
+                    }
+                },
+            ]
+        )
+    ]
+    if include_summaries:
+        summary_match: dict[str, Any] = {"start": {"$lt": until}}
+        if bounds:
+            summary_match["user_id"] = bounds
+        groups.append(
+            db.query_summaries.aggregate(
+                [
+                    {"$match": summary_match},
+                    {
+                        "$group": {
+                            "_id": {
+                                "user": "$user_id",
+                                "day": {"$dateToString": {"format": _DAY_FORMAT, "date": "$start"}},
+                                "platform": "$platform",
+                            },
+                            "count": {"$sum": "$count"},
+                            "carbon": {"$sum": "$carbon_grams"},
+                        }
+                    },
+                ]
+            )
+        )
+
+    platform_days: PlatformDays = {}
+    user_totals: UserTotals = {}
+    seen: set[tuple[ObjectId, str, str]] = set()
+    for group in groups:
+        for g in group:
+            key = g["_id"]
+            day_platform = platform_days.setdefault((key["day"], key["platform"]), [0, 0.0, 0])
+            day_platform[0] += g["count"]
+            day_platform[1] += g["carbon"]
+            if (key["user"], key["day"], key["platform"]) not in seen:
+                seen.add((key["user"], key["day"], key["platform"]))
+                day_platform[2] += 1
+            user = user_totals.setdefault(key["user"], [0, 0.0])
+            user[0] += g["count"]
+            user[1] += g["carbon"]
+    return platform_days, user_totals
+
+
+def _reduce(partials: Iterable[tuple[PlatformDays, UserTotals]]) -> tuple[PlatformDays, UserTotals]:
+    """Merge per-range results; user ranges are disjoint, so users never collide."""
+    platform_days: PlatformDays = {}
+    user_totals: UserTotals = {}
+    for days, users in partials:
+        for key, (count, carbon, active) in days.items():
+            merged = platform_days.setdefault(key, [0, 0.0, 0])
+            merged[0] += count
+            merged[1] += carbon
+            merged[2] += active
+        user_totals.update(users)
+    return platform_days, user_totals
+
+
+def _write_platform_days(db: Database, platform_days: PlatformDays) -> None:
+    ops = [
+        UpdateOne(
+            {"_id": f"{day}:{platform}"},
+            {
+                "$set": {
+                    "day": day,
+                    "month": day[:7],
+                    "platform": platform,
+                    "count": count,
+                    "carbon_grams": carbon,
+                    "users": users,
+                }
+            },
+            upsert=True,
+        )
+        for (day, platform), (count, carbon, users) in platform_days.items()
+    ]
+    if ops:
+        db[PLATFORM_DAILY].bulk_write(ops, ordered=False)
+
+
+def _write_user_totals(db: Database, user_totals: UserTotals, window: datetime) -> None:
+    """Add each user's window totals once; users already updated for *window* are skipped."""
+    if not user_totals:
+        return
+    signups = {
+        u["_id"]: u.get("created_at")
+        for u in db.users.find({"_id": {"$in": list(user_totals)}}, {"created_at": 1})
+    }
+    ops: list[UpdateOne] = []
+    for user_id, (count, carbon) in user_totals.items():
+        created_at = signups.get(user_id)
+        ops.append(
+            UpdateOne(
+                {"_id": user_id},
+                {
+                    "$setOnInsert": {
+                        "cohort": created_at.strftime("%Y-%m") if created_at else "unknown",
+                        "count": 0,
+                        "carbon_grams": 0.0,
+                        "through": None,
+                    }
+                },
+                upsert=True,
+            )
+        )
+        ops.append(
+            UpdateOne(
+                {"_id": user_id, "through": {"$ne": window}},
+                {"$inc": {"count": count, "carbon_grams": carbon}, "$set": {"through": window}},
+            )
+        )
+    db[USER_TOTALS].bulk_write(ops, ordered=True)
+
+
+def _write_cohorts(db: Database, computed_through: datetime) -> int:
+    """Recompute every cohort from the user totals; return how many cohorts."""
+    sizes = {
+        c["_id"]: c["users"]
+        for c in db.users.aggregate(
+            [
+                {"$group": {"_id": {"$dateToString": {"format": "%Y-%m", "date": "$created_at"}}, "users": {"$sum": 1}}},
+            ]
+        )
+    }
+    cohorts = db[USER_TOTALS].aggregate(
+        [
+            {"$match": {"count": {"$gt": 0}}},
+            {"$project": {"cohort": 1, "count": 1, "carbon_grams": 1, "score": _eco_score_expr({"$divide": ["$carbon_grams", "$count"]})}},
+            {
+                "$group": {
+                    "_id": "$cohort",
+                    "active_users": {"$sum": 1},
+                    "avg_eco_score": {"$avg": "$score"},
+                    "queries": {"$sum": "$count"},
+                    "carbon_grams": {"$sum": "$carbon_grams"},
+                }
+            },
+        ]
+    )
+    ops = [
+        UpdateOne(
+            {"_id": c["_id"]},
+            {
+                "$set": {
+                    "users": sizes.get(c["_id"], c["active_users"]),
+                    "active_users": c["active_users"],
+                    "avg_eco_score": c["avg_eco_score"],
+                    "queries": c["queries"],
+                    "carbon_grams": c["carbon_grams"],
+                    "computed_through": computed_through,
+                }
+            },
+            upsert=True,
+        )
+        for c in cohorts
+    ]
+    if ops:
+        db[COHORTS].bulk_write(ops, ordered=False)
+    return len(ops)
+
+
+def run_analytics(
+    db: Database,
+    layout: QueryLayout,
+    *,
+    workers: int = 4,
+    now: datetime | None = None,
+) -> dict[str, Any]:
+    """Process all complete days not processed yet; return what was done."""
+    now = now or datetime.now(timezone.utc)
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0, tzinfo=None)
+
+    checkpoint = load_checkpoint(db, JOB_NAME)
+    since: datetime | None = checkpoint.get("processed_until")
+    # Finish an interrupted window before starting a new one.
+    until: datetime = checkpoint.get("pending_until") or today
+    if since is not None and since >= until:
+        logger.info("Analytics are up to date (through {})", since.date())
+        return {"days": 0, "users": 0, "cohorts": 0}
+    save_checkpoint(db, JOB_NAME, pending_until=until)
+
+    ranges = user_ranges(db, workers)
+    logger.info("Aggregating {} → {} over {} user ranges", since.date() if since else "start", until.date(), len(ranges))
+    with ThreadPoolExecutor(max_workers=len(ranges), thread_name_prefix="analytics") as pool:
+        partials = pool.map(
+            lambda users: _map_range(db, layout, users, since, until, include_summaries=since is None),
+            ranges,
+        )
+        platform_days, user_totals = _reduce(partials)
+
+    _write_platform_days(db, platform_days)
+    _write_user_totals(db, user_totals, until)
+    cohorts = _write_cohorts(db, until)
+    save_checkpoint(db, JOB_NAME, processed_until=until, pending_until=None)
+
+    return {
+        "days": len({day for day, _ in platform_days}),
+        "users": len(user_totals),
+        "cohorts": cohorts,
+    }
+
+
+def reset_analytics(db: Database) -> None:
+    """Drop all computed analytics; the next run recomputes from the start."""
+    for name in (PLATFORM_DAILY, USER_TOTALS, COHORTS):
+        db[name].delete_many({})
+    clear_checkpoint(db, JOB_NAME)
+
+
+# ── Reads ───────────────────────────────────────────────────────────────
+
+
+def computed_through(db: Database) -> datetime | None:
+    """Return the end (exclusive) of the last processed day, if any."""
+    return load_checkpoint(db, JOB_NAME).get("processed_until")
+
+
+def platform_month(db: Database, month: str) -> list[dict[str, Any]]:
+    """Sum the daily rows of *month* (``YYYY-MM``) per platform."""
+    totals: dict[str, dict[str, Any]] = {}
+    for row in db[PLATFORM_DAILY].find({"month": month}, {"_id": 0, "platform": 1, "count": 1, "carbon_grams": 1}):
+        total = totals.setdefault(row["platform"], {"platform": row["platform"], "count": 0, "carbon_grams": 0.0})
+        total["count"] += row["count"]
+        total["carbon_grams"] += row["carbon_grams"]
+    return sorted(totals.values(), key=lambda t: t["carbon_grams"], reverse=True)
+
+
+def cohort_rows(db: Database) -> list[dict[str, Any]]:
+    """Return every cohort, oldest first."""
+    return list(db[COHORTS].find({}).sort("_id", 1))
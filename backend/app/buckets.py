@@ -0,0 +1,498 @@
+"""
+Range buckets — per-user (and per-organization) hourly and daily counters
+with prefix sums.
+
+Every query event increments one ``hour`` and one ``day`` bucket of its
+user in ``query_buckets`` (per-platform ``count`` / ``carbon`` maps). Once a
+bucket can no longer receive events — ``range_bucket_grace_seconds`` after
+it ends — it is *sealed* and gets ``cum_count`` / ``cum_carbon``: the user's
+totals over every bucket up to and including it. Those prefix sums are
+filled in by the first read that needs them, oldest first, and never change
+afterwards (rebuilds and re-pricing rewrite them explicitly).
+
+The totals before an instant T are the prefix sums of the last bucket before
+T, plus — when T is past the seal line — the few unsealed buckets in
+between. A range total is therefore the difference of two prefixes, however
+many events fall in it; a series reads the buckets inside the range.
+
+Hour buckets also count their second, third and fourth quarter hour
+(``q1``..``q3``), so an hour can be split at :15, :30 or :45. That is what
+local days in timezones with half- or quarter-hour offsets need: a user's
+day view in any timezone is assembled from hour buckets (``local_day_edges``
+gives the UTC instants of its midnights, DST transitions included).
+
+Organizations keep the same buckets in ``org_buckets``, incremented with
+their member's on ingest (see ``BucketStore``). With
+``aggregates_mode="stream"`` both are incremented by the aggregate worker
+instead (see ``app.aggregates``), and buckets are only sealed once the
+worker has applied the events up to the seal line.
+
+Buckets outlive raw events, so ranges reach back into compacted history.
+User buckets are (re)built from events and summaries by
+``python -m app.jobs.build_buckets``; all are re-priced by
+``app.jobs.reprice``.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Literal
+from zoneinfo import ZoneInfo
+
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.database import Database
+
+from app.config import get_settings
+from app.models.query import QueryLayout
+
+
+@dataclass(frozen=True)
+class BucketStore:
+    """The collection holding one kind of owner's buckets, and its key field."""
+
+    collection: str
+    owner_field: str
+
+
+USER_BUCKETS = BucketStore("query_buckets", "user_id")
+ORG_BUCKETS = BucketStore("org_buckets", "org_id")
+BUCKETS_COLLECTION = USER_BUCKETS.collection
+
+Period = Literal["hour", "day"]
+Granularity = Literal["hour", "day", "week", "month"]
+
+PERIODS: tuple[Period, ...] = ("hour", "day")
+_STEP: dict[str, timedelta] = {"hour": timedelta(hours=1), "day": timedelta(days=1)}
+# Quarter hours counted separately within an hour bucket (the first is the rest).
+QUARTERS = (1, 2, 3)
+
+# platform → (queries, grams of CO₂)
+Totals = dict[str, tuple[int, float]]
+
+
+# ── Time arithmetic (naive UTC, like stored timestamps) ─────────────────
+
+
+def naive_utc(ts: datetime) -> datetime:
+    """Convert an aware datetime to naive UTC; naive ones are taken as UTC."""
+    if ts.tzinfo is not None:
+        return ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return ts
+
+
+def bucket_start(ts: datetime, period: str) -> datetime:
+    """Start of the *period* bucket containing *ts*."""
+    ts = ts.replace(minute=0, second=0, microsecond=0)
+    return ts.replace(hour=0) if period == "day" else ts
+
+
+def quarter_of(ts: datetime) -> int:
+    """Quarter hour (0–3) of *ts* within its hour."""
+    return ts.minute // 15
+
+
+def bucket_end(ts: datetime, period: str) -> datetime:
+    """*ts* rounded up to a *period* boundary."""
+    start = bucket_start(ts, period)
+    return start if start == ts else start + _STEP[period]
+
+
+def seal_line(period: str, now: datetime | None = None, db: Database | None = None) -> datetime:
+    """
+    Buckets starting before this instant are sealed (complete).
+
+    With ``aggregates_mode="stream"`` and *db* given, the line also stays
+    behind the events the aggregate worker has applied, so a worker catching
+    up never increments a bucket whose prefix sums are already stored.
+    """
+    now = now or datetime.utcnow()
+    if db is not None and get_settings().aggregates_mode == "stream":
+        from app.aggregates import applied_through  # app.aggregates imports this module
+
+        applied = applied_through(db)
+        if applied is None:
+            return datetime.min  # nothing applied yet, nothing sealed
+        now = min(now, applied)
+    grace = timedelta(seconds=get_settings().range_bucket_grace_seconds)
+    return bucket_start(now - grace, period)
+
+
+def range_boundaries(
+    start: datetime,
+    end: datetime,
+    granularity: Granularity,
+    limit: int | None = None,
+) -> list[datetime]:
+    """
+    Split ``[start, end)`` into calendar-aligned intervals; return their edges.
+
+    Weeks start on Monday and months on the 1st; the first and last interval
+    may be partial. Stops early once there are more than *limit* intervals.
+    """
+
+    def next_edge(point: datetime) -> datetime:
+        if granularity in _STEP:
+            return point + _STEP[granularity]
+        if granularity == "week":
+            return bucket_start(point, "day") + timedelta(days=7 - point.weekday())
+        return (point.replace(day=28) + timedelta(days=4)).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+    edges = [start]
+    point = next_edge(start)
+    while point < end:
+        edges.append(point)
+        if limit is not None and len(edges) > limit + 1:
+            return edges
+        point = next_edge(point)
+    edges.append(end)
+    return edges
+
+
+def local_day_edges(tz: ZoneInfo, first_day: date, days: int) -> list[datetime]:
+    """
+    Naive UTC instants of the local midnights starting *days* days in *tz*.
+
+    Days around DST transitions are 23 or 25 hours long. Offsets that are not
+    a multiple of 15 minutes (historical local mean time) are rounded down.
+    """
+    edges = []
+    for i in range(days + 1):
+        edge = naive_utc(datetime.combine(first_day + timedelta(days=i), time(), tzinfo=tz))
+        edges.append(edge.replace(minute=edge.minute - edge.minute % 15, second=0, microsecond=0))
+    return edges
+
+
+# ── Totals arithmetic ───────────────────────────────────────────────────
+
+
+def add_counts(totals: Totals, counts: dict[str, int], carbon: dict[str, float]) -> Totals:
+    """Return *totals* plus one bucket's per-platform maps."""
+    result = dict(totals)
+    for platform, count in counts.items():
+        queries, grams = result.get(platform, (0, 0.0))
+        result[platform] = (queries + count, grams + carbon.get(platform, 0.0))
+    return result
+
+
+def merge(a: Totals, b: Totals) -> Totals:
+    """Per-platform ``a + b``."""
+    result = dict(a)
+    for platform, (queries, grams) in b.items():
+        prior_queries, prior_grams = result.get(platform, (0, 0.0))
+        result[platform] = (prior_queries + queries, prior_grams + grams)
+    return result
+
+
+def subtract(after: Totals, before: Totals) -> Totals:
+    """Per-platform ``after - before``, without platforms left at zero."""
+    result: Totals = {}
+    for platform, (queries, grams) in after.items():
+        prior_queries, prior_grams = before.get(platform, (0, 0.0))
+        if queries != prior_queries:
+            result[platform] = (queries - prior_queries, grams - prior_grams)
+    return result
+
+
+def pick(totals: Totals, platform: str | None) -> tuple[int, float]:
+    """(queries, grams) for one platform, or for all of them."""
+    if platform is not None:
+        return totals.get(platform, (0, 0.0))
+    return sum(q for q, _ in totals.values()), sum(g for _, g in totals.values())
+
+
+def _cumulative(doc: dict[str, Any] | None) -> Totals:
+    if doc is None:
+        return {}
+    return add_counts({}, doc["cum_count"], doc["cum_carbon"])
+
+
+def _totals(doc: dict[str, Any]) -> Totals:
+    return add_counts({}, doc.get("count", {}), doc.get("carbon", {}))
+
+
+def _from_quarter(doc: dict[str, Any], at: datetime) -> Totals:
+    """An hour bucket's totals from *at* (a quarter hour inside it) to its end."""
+    totals: Totals = {}
+    for quarter in QUARTERS:
+        if quarter >= quarter_of(at):
+            part = doc.get(f"q{quarter}", {})
+            totals = add_counts(totals, part.get("count", {}), part.get("carbon", {}))
+    return totals
+
+
+def _splits(doc: dict[str, Any], at: datetime) -> bool:
+    """True if *at* falls inside the hour bucket *doc*, after its start."""
+    return doc["start"] < at and doc["start"] == bucket_start(at, "hour")
+
+
+# ── MongoDB ─────────────────────────────────────────────────────────────
+
+
+def increments(
+    owner_id: ObjectId,
+    platform: str,
+    carbon_grams: float,
+    timestamp: datetime,
+    store: BucketStore = USER_BUCKETS,
+) -> list[tuple[dict[str, Any], dict[str, float]]]:
+    """``(filter, $inc)`` pairs for one new event (hour and day), for ``store.collection``."""
+    timestamp = naive_utc(timestamp)
+    pairs = []
+    for period in PERIODS:
+        inc: dict[str, float] = {f"count.{platform}": 1, f"carbon.{platform}": carbon_grams}
+        quarter = quarter_of(timestamp)
+        if period == "hour" and quarter:
+            inc.update({f"q{quarter}.count.{platform}": 1, f"q{quarter}.carbon.{platform}": carbon_grams})
+        pairs.append(({store.owner_field: owner_id, "period": period, "start": bucket_start(timestamp, period)}, inc))
+    return pairs
+
+
+def record_ops(
+    owner_id: ObjectId,
+    platform: str,
+    carbon_grams: float,
+    timestamp: datetime,
+    store: BucketStore = USER_BUCKETS,
+) -> list[UpdateOne]:
+    """Bucket increments for one new event (hour and day), for ``store.collection``."""
+    return [
+        UpdateOne(filter_, {"$inc": inc}, upsert=True)
+        for filter_, inc in increments(owner_id, platform, carbon_grams, timestamp, store)
+    ]
+
+
+def _sealed_prefix(
+    db: Database,
+    owner_id: ObjectId,
+    period: str,
+    seal: datetime,
+    store: BucketStore = USER_BUCKETS,
+) -> Totals:
+    """
+    Totals over all buckets before *seal*, filling in missing prefix sums.
+
+    Walks back from the seal line to the newest bucket that already has them
+    (normally the first one read), then sets them on the newer buckets. Two
+    readers doing this at once write identical values.
+    """
+    collection = db[store.collection]
+    pending: list[dict[str, Any]] = []
+    base: dict[str, Any] | None = None
+    cursor = collection.find({store.owner_field: owner_id, "period": period, "start": {"$lt": seal}}).sort(
+        "start", -1
+    )
+    for doc in cursor:
+        if "cum_count" in doc:
+            base = doc
+            break
+        pending.append(doc)
+    cursor.close()
+
+    running = _cumulative(base)
+    ops = []
+    for doc in reversed(pending):
+        running = add_counts(running, doc.get("count", {}), doc.get("carbon", {}))
+        ops.append(
+            UpdateOne(
+                {"_id": doc["_id"]},
+                {
+                    "$set": {
+                        "cum_count": {p: q for p, (q, _) in running.items()},
+                        "cum_carbon": {p: g for p, (_, g) in running.items()},
+                    }
+                },
+            )
+        )
+    if ops:
+        collection.bulk_write(ops, ordered=False)
+    return running
+
+
+def prefix(
+    db: Database,
+    owner_id: ObjectId,
+    period: str,
+    at: datetime,
+    *,
+    now: datetime | None = None,
+    store: BucketStore = USER_BUCKETS,
+) -> Totals:
+    """
+    An owner's totals before *at*, from the *period* buckets.
+
+    For hour buckets *at* may be a quarter hour; other instants are taken as
+    the start of their bucket.
+    """
+    collection = db[store.collection]
+    owner = {store.owner_field: owner_id, "period": period}
+    seal = seal_line(period, now, db)
+    sealed = _sealed_prefix(db, owner_id, period, seal, store)
+    if at >= seal:
+        totals = sealed
+        for doc in collection.find({**owner, "start": {"$gte": seal, "$lt": at}}):
+            totals = merge(totals, _totals(doc))
+            if period == "hour" and _splits(doc, at):
+                totals = subtract(totals, _from_quarter(doc, at))
+        return totals
+    doc = collection.find_one(
+        {**owner, "start": {"$lt": at}},
+        {"start": 1, "cum_count": 1, "cum_carbon": 1, **{f"q{q}": 1 for q in QUARTERS}},
+        sort=[("start", -1)],
+    )
+    totals = _cumulative(doc)
+    if doc is not None and period == "hour" and _splits(doc, at):
+        totals = subtract(totals, _from_quarter(doc, at))
+    return totals
+
+
+def series(
+    db: Database,
+    owner_id: ObjectId,
+    period: str,
+    boundaries: list[datetime],
+    *,
+    store: BucketStore = USER_BUCKETS,
+) -> list[Totals]:
+    """
+    An owner's totals per interval between consecutive *boundaries*.
+
+    For hour buckets the boundaries may be quarter hours, at most one per
+    hour; an hour containing one is split between its two intervals.
+    """
+    intervals: list[Totals] = [{} for _ in boundaries[:-1]]
+    starts = [bucket_start(edge, period) for edge in boundaries]
+    docs = (
+        db[store.collection]
+        .find(
+            {store.owner_field: owner_id, "period": period, "start": {"$gte": starts[0], "$lt": boundaries[-1]}},
+            {"_id": 0, "start": 1, "count": 1, "carbon": 1, **{f"q{q}": 1 for q in QUARTERS}},
+        )
+        .sort("start", 1)
+    )
+    i = 0
+    for doc in docs:
+        while i + 1 < len(starts) and doc["start"] >= starts[i + 1]:
+            i += 1
+        totals = _totals(doc)
+        if period == "hour" and _splits(doc, boundaries[i]):
+            later = _from_quarter(doc, boundaries[i])
+            if i > 0:
+                intervals[i - 1] = merge(intervals[i - 1], subtract(totals, later))
+            totals = later
+        if i < len(intervals):
+            intervals[i] = merge(intervals[i], totals)
+    return intervals
+
+
+# ── Rebuilds ────────────────────────────────────────────────────────────
+
+
+def hour_group(layout: QueryLayout) -> dict[str, Any]:
+    """``$group`` stage summing a user's events per hour, quarter hour and platform."""
+    return {
+        "_id": {
+            "hour": {"$dateToString": {"format": "%Y-%m-%dT%H", "date": "$timestamp"}},
+            "quarter": {"$floor": {"$divide": [{"$minute": "$timestamp"}, 15]}},
+            "platform": f"${layout.platform_field}",
+        },
+        "count": {"$sum": 1},
+        "carbon_grams": {"$sum": "$carbon_grams"},
+    }
+
+
+def _hour_groups(db: Database, layout: QueryLayout, user_id: ObjectId, since: datetime | None) -> Iterable[dict]:
+    return db[layout.collection].aggregate(
+        [{"$match": layout.user_filter(user_id, since)}, {"$group": hour_group(layout)}]
+    )
+
+
+def rebuild_user(
+    db: Database,
+    layout: QueryLayout,
+    user_id: ObjectId,
+    compacted_until: datetime | None = None,
+) -> int:
+    """
+    Rebuild a user's buckets and prefix sums; return how many buckets were written.
+
+    Buckets from ``compacted_until`` on are recomputed from raw events.
+    Earlier buckets are kept (they were built while the events existed),
+    unless there are none, in which case they are seeded from the compacted
+    summaries — at their day/month resolution. Increments made to the
+    current hour and day while the rebuild runs may be lost; re-run it to
+    correct them.
+    """
+    collection = db[BUCKETS_COLLECTION]
+    seed_summaries = compacted_until is not None and collection.find_one(
+        {"user_id": user_id, "start": {"$lt": compacted_until}}, {"_id": 1}
+    ) is None
+
+    # (period, start) → bucket fields: {"count": {...}, "carbon": {...}, "q1": {...}, ...}
+    buckets: dict[tuple[str, datetime], dict[str, Any]] = {}
+
+    def bump(fields: dict[str, Any], platform: str, count: int, carbon: float) -> None:
+        counts, grams = fields.setdefault("count", {}), fields.setdefault("carbon", {})
+        counts[platform] = counts.get(platform, 0) + count
+        grams[platform] = grams.get(platform, 0.0) + carbon
+
+    def add(start: datetime, quarter: int, platform: str, count: int, carbon: float) -> None:
+        for period in PERIODS:
+            fields = buckets.setdefault((period, bucket_start(start, period)), {})
+            bump(fields, platform, count, carbon)
+            if period == "hour" and quarter:
+                bump(fields.setdefault(f"q{quarter}", {}), platform, count, carbon)
+
+    for group in _hour_groups(db, layout, user_id, compacted_until):
+        key = group["_id"]
+        start = datetime.strptime(key["hour"], "%Y-%m-%dT%H")
+        add(start, int(key["quarter"]), key["platform"] or "unknown", group["count"], group["carbon_grams"])
+    if seed_summaries:
+        for row in db.query_summaries.find({"user_id": user_id}):
+            add(row["start"], 0, row["platform"], row["count"], row["carbon_grams"])
+
+    built_at = datetime.utcnow()
+    ops = []
+    for (period, start), fields in buckets.items():
+        update: dict[str, Any] = {"$set": {**fields, "built_at": built_at}}
+        stale_quarters = {f"q{q}": "" for q in QUARTERS if f"q{q}" not in fields}
+        if stale_quarters:
+            update["$unset"] = stale_quarters
+        ops.append(UpdateOne({"user_id": user_id, "period": period, "start": start}, update, upsert=True))
+    if ops:
+        collection.bulk_write(ops, ordered=False)
+
+    # Sealed buckets the rebuild did not produce have no events left.
+    rebuilt_from = None if seed_summaries else compacted_until
+    for period in PERIODS:
+        start_range: dict[str, datetime] = {"$lt": seal_line(period, db=db)}
+        if rebuilt_from is not None:
+            start_range["$gte"] = rebuilt_from
+        collection.delete_many(
+            {"user_id": user_id, "period": period, "start": start_range, "built_at": {"$ne": built_at}}
+        )
+
+    # Prefix sums are recomputed from the first bucket on.
+    collection.update_many({"user_id": user_id}, {"$unset": {"cum_count": "", "cum_carbon": ""}})
+    for period in PERIODS:
+        _sealed_prefix(db, user_id, period, seal_line(period, db=db))
+    return len(ops)
+
+
+def reprice_buckets(db: Database, factors: dict[str, float]) -> int:
+    """Set every user and org bucket's carbon to ``count × factor``; return how many changed."""
+    fields = [("count", "carbon"), ("cum_count", "cum_carbon")]
+    fields += [(f"q{q}.count", f"q{q}.carbon") for q in QUARTERS]
+    changed = 0
+    for store in (USER_BUCKETS, ORG_BUCKETS):
+        collection = db[store.collection]
+        for platform, grams in factors.items():
+            for count_field, carbon_field in fields:
+                result = collection.update_many(
+                    {f"{count_field}.{platform}": {"$exists": True}},
+                    [{"$set": {f"{carbon_field}.{platform}": {"$multiply": [f"${count_field}.{platform}", grams]}}}],
+                )
+                changed += result.modified_count
+    return changed
@@ -0,0 +1,262 @@
+"""
+Response compression — zstd / brotli / gzip negotiated from Accept-Encoding.
+
+``CompressionMiddleware`` compresses JSON, CSV and other text bodies of at
+least ``compression_min_size`` bytes. Streamed bodies (the CSV export) are
+compressed chunk by chunk as they are produced; Server-Sent Events and
+responses that already carry a ``Content-Encoding`` are passed through.
+
+Endpoints that serve the same payload to many requests (the org dashboard,
+the factor table) return ``precompressed(request, key, response)`` instead:
+the compressed bytes are kept per ``(key, encoding)``, so a hot payload is
+compressed once per worker rather than on every request. Bodies under
+``compression_min_size`` are sent as they are.
+
+zstd and br come from the ``zstandard`` / ``brotli`` packages in
+requirements.txt; an environment without them offers only gzip.
+"""
+
+from __future__ import annotations
+
+import gzip
+import zlib
+from collections import OrderedDict
+from collections.abc import Hashable
+from functools import lru_cache
+from typing import Any
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app import metrics
+from app.config import get_settings
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+# Server preference when the client accepts several equally.
+ENCODINGS: tuple[str, ...] = tuple(
+    name
+    for name, available in (("zstd", zstandard is not None), ("br", brotli is not None), ("gzip", True))
+    if available
+)
+
+_COMPRESSIBLE_TYPES = frozenset(
+    {
+        "application/json",
+        "application/javascript",
+        "application/xml",
+        "image/svg+xml",
+    }
+)
+
+
+@lru_cache(maxsize=128)
+def negotiate(accept_encoding: str) -> str | None:
+    """Pick the encoding for an ``Accept-Encoding`` header, or None for identity."""
+    if not accept_encoding:
+        return None
+    weights: dict[str, float] = {}
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[coding.strip()] = q
+
+    best, best_q = None, 0.0
+    for encoding in ENCODINGS:
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    """Compress a complete body with *encoding*."""
+    settings = get_settings()
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=settings.compression_zstd_level).compress(data)
+    if encoding == "br":
+        return brotli.compress(data, quality=settings.compression_brotli_quality)
+    return gzip.compress(data, compresslevel=settings.compression_gzip_level, mtime=0)
+
+
+class _BrotliStream:
+    """``brotli.Compressor`` behind the zlib-style compress/flush interface."""
+
+    def __init__(self, quality: int) -> None:
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.finish()
+
+
+def _stream_compressor(encoding: str) -> Any:
+    """Return an incremental compressor with ``compress()`` and a final ``flush()``."""
+    settings = get_settings()
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=settings.compression_zstd_level).compressobj()
+    if encoding == "br":
+        return _BrotliStream(settings.compression_brotli_quality)
+    return zlib.compressobj(settings.compression_gzip_level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+
+
+def _compressible(status: int, headers: Headers) -> bool:
+    if status < 200 or status in (204, 304):
+        return False
+    if "content-encoding" in headers or "no-transform" in headers.get("cache-control", ""):
+        return False
+    content_type = headers.get("content-type", "").partition(";")[0].strip().lower()
+    if content_type == "text/event-stream":
+        return False  # must reach the client event by event
+    return content_type.startswith("text/") or content_type in _COMPRESSIBLE_TYPES
+
+
+def _mark_encoded(headers: MutableHeaders, encoding: str) -> None:
+    headers["Content-Encoding"] = encoding
+    headers.add_vary_header("Accept-Encoding")
+
+
+def _record(encoding: str, size_in: int, size_out: int) -> None:
+    metrics.counter(f"compression.{encoding}.bytes_in").inc(size_in)
+    metrics.counter(f"compression.{encoding}.bytes_out").inc(size_out)
+
+
+# ── Middleware ──────────────────────────────────────────────────────────
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing eligible responses for the negotiated encoding."""
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await self.app(scope, receive, _CompressingSend(send, encoding, self.minimum_size))
+
+
+class _CompressingSend:
+    """The ``send`` callable handed to the app for one response."""
+
+    def __init__(self, send: Send, encoding: str, minimum_size: int) -> None:
+        self._send = send
+        self._encoding = encoding
+        self._minimum_size = minimum_size
+        self._start: Message | None = None
+        self._passthrough = False
+        self._stream: Any = None
+
+    async def __call__(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self._start = message
+            return
+        if message["type"] != "http.response.body" or self._passthrough:
+            await self._flush_start()
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self._stream is not None:
+            data = self._stream.compress(body)
+            if not more_body:
+                data += self._stream.flush()
+            self._size_in += len(body)
+            self._size_out += len(data)
+            if data or not more_body:
+                await self._send({"type": "http.response.body", "body": data, "more_body": more_body})
+            if not more_body:
+                _record(self._encoding, self._size_in, self._size_out)
+            return
+
+        start = self._start
+        start["headers"] = list(start.get("headers", []))
+        headers = MutableHeaders(raw=start["headers"])
+        if not _compressible(start["status"], headers) or (not more_body and len(body) < self._minimum_size):
+            self._passthrough = True
+            await self._flush_start()
+            await self._send(message)
+            return
+
+        _mark_encoded(headers, self._encoding)
+        if more_body:
+            # Streamed: compress incrementally, length unknown up front.
+            del headers["Content-Length"]
+            self._stream = _stream_compressor(self._encoding)
+            self._size_in = self._size_out = 0
+            await self._flush_start()
+            await self(message)
+            return
+
+        data = compress(body, self._encoding)
+        _record(self._encoding, len(body), len(data))
+        headers["Content-Length"] = str(len(data))
+        await self._flush_start()
+        await self._send({"type": "http.response.body", "body": data, "more_body": False})
+
+    async def _flush_start(self) -> None:
+        if self._start is not None:
+            start, self._start = self._start, None
+            await self._send(start)
+
+
+# ── Precompressed payloads ──────────────────────────────────────────────
+
+_payloads: OrderedDict[tuple[Hashable, str], bytes] = OrderedDict()
+
+
+def precompressed(request: Request, key: Hashable, response: Response) -> Response:
+    """
+    Return *response* compressed for *request*, reusing cached bytes.
+
+    *key* must identify the uncompressed body exactly (e.g. a content
+    version); the middleware passes the already-encoded response through.
+    """
+    settings = get_settings()
+    encoding = negotiate(request.headers.get("accept-encoding", "")) if settings.compression_enabled else None
+    if encoding is None or len(response.body) < settings.compression_min_size:
+        return response
+
+    cache_key = (key, encoding)
+    data = _payloads.get(cache_key)
+    if data is None:
+        metrics.counter("compression.cache.misses").inc()
+        data = compress(response.body, encoding)
+        _record(encoding, len(response.body), len(data))
+        _payloads[cache_key] = data
+        while len(_payloads) > settings.compression_cache_entries:
+            _payloads.popitem(last=False)
+    else:
+        metrics.counter("compression.cache.hits").inc()
+        _payloads.move_to_end(cache_key)
+
+    response.body = data
+    _mark_encoded(response.headers, encoding)
+    response.headers["Content-Length"] = str(len(data))
+    return response
@@ -8,9 +8,13 @@ from __future__ import annotations
 
 from functools import lru_cache
 from pathlib import Path
+from typing import Literal
 
+from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+_LIMIT_PATTERN = r"^(\d+/(second|minute|hour))?$"
+
 
 class Settings(BaseSettings):
     """Centralised configuration loaded from the .env at the project root."""
@@ -19,10 +23,162 @@ class Settings(BaseSettings):
     mongodb_uri: str
     mongodb_database_name: str = "carbonq"
 
+    # Connection pool — sized per uvicorn worker process
+    mongodb_max_pool_size: int = 100
+    mongodb_min_pool_size: int = 0
+    mongodb_max_idle_time_ms: int | None = None
+    mongodb_wait_queue_timeout_ms: int | None = None
+    mongodb_server_selection_timeout_ms: int = 5000
+    # Wire compression, in order of preference ("zstd" needs pymongo[zstd],
+    # "snappy" needs pymongo[snappy]; "zlib" is always available)
+    mongodb_compressors: list[str] = []
+    mongodb_read_preference: str = "primary"
+    # Read routing for heavy analytics reads: all-time dashboard totals,
+    # exports and admin analytics. A secondary mode takes them off the
+    # primary that ingest writes to, at the cost of lagging by up to the
+    # staleness bound (at least 90 s, MongoDB's minimum; None = unbounded).
+    # Auth, ingest, the live stream and range-bucket reads use
+    # mongodb_read_preference above; keep that "primary" so they see their
+    # own writes. Secondary modes need a replica set.
+    mongodb_analytics_read_preference: Literal[
+        "primary", "primaryPreferred", "secondary", "secondaryPreferred", "nearest"
+    ] = "primary"
+    mongodb_analytics_max_staleness_seconds: int | None = Field(default=None, ge=90)
+
+    # ── Storage backend ─────────────────────────────────────────────────
+    # "mongo", or "memory" (in-process, not persisted; for tests, local
+    # load runs and benchmarks — no MongoDB needed)
+    storage_backend: Literal["mongo", "memory"] = "mongo"
+
+    # ── Query storage ───────────────────────────────────────────────────
+    # "standard" (flat documents in `queries`) or "timeseries" (MongoDB
+    # time-series collection `queries_ts`; migrate with
+    # `python -m app.jobs.migrate_timeseries` before switching)
+    queries_storage: Literal["standard", "timeseries"] = "standard"
+
+    # ── Aggregates ──────────────────────────────────────────────────────
+    # "inline": ingest updates range buckets and org rollups itself.
+    # "stream": ingest is a single insert and `python -m app.jobs.aggregates`
+    # applies the increments from the change stream, in batches of up to
+    # `aggregates_batch_size` events gathered for `aggregates_batch_ms`.
+    # Needs a replica set and the "standard" query storage (time-series
+    # collections have no change streams); bucket-backed views then trail
+    # ingest by about one batch.
+    aggregates_mode: Literal["inline", "stream"] = "inline"
+    aggregates_batch_size: int = Field(default=500, ge=1)
+    aggregates_batch_ms: int = Field(default=1000, ge=10)
+
+    # ── Retention ───────────────────────────────────────────────────────
+    # Raw events older than this many days are compacted into per-user,
+    # per-platform summaries by `python -m app.jobs.retention` (None keeps
+    # raw events forever). Must cover the 14-day dashboard windows.
+    retention_raw_days: int | None = Field(default=None, ge=14)
+    retention_summary_period: Literal["day", "month"] = "day"
+
+    # ── Indexes ─────────────────────────────────────────────────────────
+    # Build missing indexes in the background at startup (behind a leader
+    # lock). Disable when indexes are managed by `python -m app.jobs.build_indexes`.
+    index_build_on_startup: bool = True
+    index_lock_ttl_seconds: int = 600
+
+    # ── Carbon factors ──────────────────────────────────────────────────
+    # How long each worker caches the latest factor version (also the
+    # Cache-Control max-age of GET /factors); reprice after that has passed
+    factors_cache_seconds: float = 300.0
+
+    # ── Range queries ───────────────────────────────────────────────────
+    # Hour/day buckets get their prefix sums this long after they end, which
+    # covers queries still being written when the hour turns over
+    range_bucket_grace_seconds: int = 300
+    # Most points one /dashboard/range series may hold
+    range_max_points: int = 1000
+
+    # ── Dashboard stream (SSE) ──────────────────────────────────────────
+    # Events buffered per open stream before it is told to resync
+    stream_queue_size: int = 64
+    # Comment line sent when nothing happened, keeps proxies from timing out
+    stream_heartbeat_seconds: float = 15.0
+    # Close streams that delivered no event for this long (clients reconnect)
+    stream_idle_timeout_seconds: float = 300.0
+    # With several workers, how often a stream reads the queries ingested by
+    # the other workers (events are only published within a worker)
+    stream_catch_up_seconds: float = 5.0
+
+    # ── Response compression ────────────────────────────────────────────
+    # Negotiated from Accept-Encoding: zstd and br when the `zstandard` /
+    # `brotli` packages are installed, gzip always
+    compression_enabled: bool = True
+    # Bodies smaller than this go out as-is (streamed bodies are always compressed)
+    compression_min_size: int = 1024
+    compression_gzip_level: int = 6
+    compression_brotli_quality: int = 5
+    compression_zstd_level: int = 3
+    # Compressed copies of cacheable payloads kept per worker
+    compression_cache_entries: int = 256
+
+    # ── Rate limiting ───────────────────────────────────────────────────
+    # Token buckets, "<count>/<second|minute|hour>"; an empty string disables
+    # a limit. "memory" buckets are per worker process; "redis" shares them
+    # between workers (the `redis` package is in requirements.txt).
+    rate_limit_enabled: bool = True
+    rate_limit_backend: Literal["memory", "redis"] = "memory"
+    rate_limit_redis_url: str = "redis://localhost:6379/0"
+    # Per client (session user, else IP address)
+    rate_limit_login: str = Field(default="10/minute", pattern=_LIMIT_PATTERN)
+    rate_limit_register: str = Field(default="5/minute", pattern=_LIMIT_PATTERN)
+    rate_limit_submit_query: str = Field(default="120/minute", pattern=_LIMIT_PATTERN)
+    # Shared by all clients of login + register, caps total bcrypt work
+    rate_limit_auth_total: str = Field(default="20/second", pattern=_LIMIT_PATTERN)
+    # Proxies in front of the app that append the caller's address to
+    # X-Forwarded-For (Heroku's router: 1). Anonymous callers are keyed by
+    # the entry this many places from the right — the one the nearest proxy
+    # saw, which clients cannot forge; 0 uses the connection's peer address.
+    rate_limit_proxy_hops: int = Field(default=0, ge=0)
+
+    # ── Account deletion (python -m app.jobs.deletions) ─────────────────
+    # Raw events deleted per batch, and the rate batches are paced to so a
+    # heavy user's history does not cause replication lag for everyone else
+    # (also paces retention's deletes of compacted events)
+    deletion_batch_size: int = 1000
+    deletion_max_docs_per_second: float = 5000.0
+
+    # ── Workload pools ──────────────────────────────────────────────────
+    # Threads per workload class, callers allowed to wait for one, and how
+    # long they may wait before getting 503 (see app/executors.py)
+    pool_ingest_workers: int = 8
+    pool_ingest_queue: int = 256
+    pool_ingest_queue_timeout_ms: int = 1000
+    pool_analytics_workers: int = 4
+    pool_analytics_queue: int = 32
+    pool_analytics_queue_timeout_ms: int = 3000
+    pool_auth_workers: int = 2
+    pool_auth_queue: int = 16
+    pool_auth_queue_timeout_ms: int = 2000
+
+    # ── Server (python -m app.server) ───────────────────────────────────
+    # Worker processes, 0 = one per CPU core. Each worker has its own MongoDB
+    # and workload pools, caches, "memory" rate-limit buckets and (with
+    # storage_backend="memory") data, so size the pools per worker.
+    web_concurrency: int = 1
+    host: str = "0.0.0.0"
+    port: int = 8000
+    # Directory where each worker publishes its metrics for /metrics to sum
+    # up; python -m app.server uses a temporary one for several workers
+    metrics_dir: str = ""
+    metrics_flush_seconds: float = 2.0
+
     # ── Sessions ────────────────────────────────────────────────────────
     session_secret_key: str
     session_expire_hours: int = 24
 
+    # ── Admin ───────────────────────────────────────────────────────────
+    # Accounts allowed to use the /admin endpoints
+    admin_emails: list[str] = []
+    # Bulk provisioning (POST /admin/users/bulk): processes hashing
+    # passwords (0 = one per CPU core) and rows accepted per upload
+    provision_workers: int = 0
+    provision_max_rows: int = 10000
+
     # ── App ─────────────────────────────────────────────────────────────
     app_name: str = "CarbonQ API"
     debug: bool = False
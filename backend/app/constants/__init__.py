@@ -4,6 +4,7 @@ Application constants.
 
 from __future__ import annotations
 
+from app.constants.eco_score import ECO_SCORE_MIN, ECO_SCORE_THRESHOLDS
 from app.constants.platforms import (
     CARBON_PER_QUERY,
     PLATFORM_COLORS,
@@ -13,6 +14,8 @@ from app.constants.platforms import (
 
 __all__ = [
     "CARBON_PER_QUERY",
+    "ECO_SCORE_MIN",
+    "ECO_SCORE_THRESHOLDS",
     "PLATFORM_COLORS",
     "PLATFORM_ICONS",
     "PLATFORM_NAMES",
@@ -0,0 +1,18 @@
+"""
+Eco-score constants — average grams of CO₂ per query → score (5 is best).
+
+Mirrors the thresholds the dashboard UI uses for its eco-score dots.
+"""
+
+from __future__ import annotations
+
+# (upper bound on average grams per query, score), checked in order;
+# anything above the last bound scores 1.
+ECO_SCORE_THRESHOLDS: list[tuple[float, int]] = [
+    (0.3, 5),
+    (0.8, 4),
+    (2.0, 3),
+    (5.0, 2),
+]
+
+ECO_SCORE_MIN = 1
@@ -3,37 +3,167 @@ MongoDB connection management — singleton client via @lru_cache.
 
 Provides:
 - get_mongodb_client() → MongoDB client instance
+- connect_mongodb() / close_mongodb_client() → lifespan hooks
+- ping_mongodb() → readiness check
 - get_database() → MongoDB database instance
-- Collections: users, queries
+- get_analytics_database() → the same database, reading with the analytics
+  read preference (secondaries, within a staleness bound)
+- Collections: users, queries (in the configured storage layout), summaries
+
+MongoClient is not fork-safe: a forked worker drops the inherited client
+(without closing the parent's sockets) and creates its own on first use.
 """
 
 from __future__ import annotations
 
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from functools import lru_cache
 
 from loguru import logger
-from pymongo import MongoClient
-from pymongo.errors import ConnectionFailure
+from pymongo import MongoClient, monitoring
+from pymongo.database import Database
+from pymongo.errors import CollectionInvalid, ConnectionFailure
+from pymongo.read_preferences import Nearest, Primary, PrimaryPreferred, Secondary, SecondaryPreferred
 
+from app import metrics
 from app.config import get_settings
+from app.models.query import QUERY_LAYOUTS, TIMESERIES_LAYOUT, QueryLayout
+
+
+class PoolMetricsListener(monitoring.ConnectionPoolListener):
+    """
+    Export connection-pool checkout wait times and pool occupancy.
+
+    Checkout start and completion are reported on the same thread, so the
+    start time is kept in a thread-local.
+    """
+
+    def __init__(self) -> None:
+        self._local = threading.local()
+        self._checkout_wait = metrics.summary("mongodb.pool.checkout_wait_ms")
+        self._checkout_failed = metrics.counter("mongodb.pool.checkout_failed")
+        self._checked_out = metrics.gauge("mongodb.pool.checked_out")
+        self._connections = metrics.gauge("mongodb.pool.connections")
+
+    def connection_check_out_started(self, event) -> None:
+        self._local.started = time.perf_counter()
+
+    def connection_checked_out(self, event) -> None:
+        started = getattr(self._local, "started", None)
+        if started is not None:
+            self._checkout_wait.observe((time.perf_counter() - started) * 1000)
+            self._local.started = None
+        self._checked_out.inc()
+
+    def connection_check_out_failed(self, event) -> None:
+        self._local.started = None
+        self._checkout_failed.inc()
+
+    def connection_checked_in(self, event) -> None:
+        self._checked_out.dec()
+
+    def connection_created(self, event) -> None:
+        self._connections.inc()
+
+    def connection_closed(self, event) -> None:
+        self._connections.dec()
+
+    def connection_ready(self, event) -> None:
+        pass
+
+    def pool_created(self, event) -> None:
+        pass
+
+    def pool_ready(self, event) -> None:
+        pass
+
+    def pool_cleared(self, event) -> None:
+        pass
+
+    def pool_closed(self, event) -> None:
+        pass
 
 
 @lru_cache(maxsize=1)
 def get_mongodb_client() -> MongoClient:
-    """Return the single MongoDB client instance."""
+    """
+    Return the single MongoDB client instance.
+
+    Creating the client does not block: connections are opened lazily, or
+    eagerly by ``connect_mongodb()`` during application startup.
+    """
     settings = get_settings()
+    options: dict = {
+        "serverSelectionTimeoutMS": settings.mongodb_server_selection_timeout_ms,
+        "maxPoolSize": settings.mongodb_max_pool_size,
+        "minPoolSize": settings.mongodb_min_pool_size,
+        "readPreference": settings.mongodb_read_preference,
+        "event_listeners": [PoolMetricsListener()],
+    }
+    if settings.mongodb_max_idle_time_ms is not None:
+        options["maxIdleTimeMS"] = settings.mongodb_max_idle_time_ms
+    if settings.mongodb_wait_queue_timeout_ms is not None:
+        options["waitQueueTimeoutMS"] = settings.mongodb_wait_queue_timeout_ms
+    if settings.mongodb_compressors:
+        options["compressors"] = ",".join(settings.mongodb_compressors)
+
+    return MongoClient(settings.mongodb_uri, **options)
+
+
+def connect_mongodb() -> MongoClient:
+    """
+    Verify connectivity and warm the connection pool.
+
+    Opens ``mongodb_min_pool_size`` connections up front (at least one) by
+    issuing concurrent pings, so the first requests do not pay for TCP/TLS
+    handshakes and authentication.
+    """
+    client = get_mongodb_client()
+    settings = get_settings()
+    warm = max(1, settings.mongodb_min_pool_size)
     try:
-        client = MongoClient(
-            settings.mongodb_uri,
-            serverSelectionTimeoutMS=5000,
-        )
-        # Verify connection
-        client.admin.command("ping")
-        logger.info("MongoDB client connected successfully")
-        return client
+        with ThreadPoolExecutor(max_workers=warm, thread_name_prefix="mongo-warmup") as pool:
+            list(pool.map(lambda _: client.admin.command("ping"), range(warm)))
     except ConnectionFailure as exc:
         logger.error("Failed to connect to MongoDB: {}", exc)
         raise
+    logger.info("MongoDB client connected successfully (warmed {} connections)", warm)
+    return client
+
+
+def ping_mongodb() -> bool:
+    """
+    Return True if MongoDB answers a ping.
+
+    Bounded by ``mongodb_server_selection_timeout_ms`` when no server is
+    reachable.
+    """
+    try:
+        client = get_mongodb_client()
+        client.admin.command("ping")
+        return True
+    except Exception as exc:
+        logger.debug("MongoDB ping failed: {}", exc)
+        return False
+
+
+def close_mongodb_client() -> None:
+    """Close the client (if one was created) and drop the cached singletons."""
+    if get_mongodb_client.cache_info().currsize:
+        get_mongodb_client().close()
+        logger.info("MongoDB client closed")
+    get_analytics_database.cache_clear()
+    get_database.cache_clear()
+    get_mongodb_client.cache_clear()
+
+
+def _forget_client_after_fork() -> None:
+    get_analytics_database.cache_clear()
+    get_database.cache_clear()
+    get_mongodb_client.cache_clear()
 
 
 @lru_cache(maxsize=1)
@@ -46,13 +176,74 @@ def get_database():
     return client[db_name]
 
 
+_SECONDARY_MODES = {
+    "primaryPreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondaryPreferred": SecondaryPreferred,
+    "nearest": Nearest,
+}
+
+
+@lru_cache(maxsize=1)
+def get_analytics_database() -> Database:
+    """
+    Return the database handle for heavy analytics reads.
+
+    Same client as ``get_database()``, reading with
+    ``mongodb_analytics_read_preference`` and skipping secondaries that lag
+    more than ``mongodb_analytics_max_staleness_seconds``. Writes made
+    through it still go to the primary.
+    """
+    settings = get_settings()
+    mode = settings.mongodb_analytics_read_preference
+    if mode == "primary":
+        read_preference = Primary()
+    else:
+        read_preference = _SECONDARY_MODES[mode](max_staleness=settings.mongodb_analytics_max_staleness_seconds or -1)
+    logger.info("Analytics reads use read preference {}", read_preference)
+    return get_database().with_options(read_preference=read_preference)
+
+
+os.register_at_fork(after_in_child=_forget_client_after_fork)
+
+
 def get_users_collection():
     """Return the users collection."""
     db = get_database()
     return db.users
 
 
+def get_query_layout() -> QueryLayout:
+    """Return the storage layout selected by ``Settings.queries_storage``."""
+    return QUERY_LAYOUTS[get_settings().queries_storage]
+
+
 def get_queries_collection():
-    """Return the queries collection."""
+    """Return the collection holding query events in the active layout."""
     db = get_database()
-    return db.queries
+    return db[get_query_layout().collection]
+
+
+def get_summaries_collection():
+    """Return the collection of compacted per-day/per-month query summaries."""
+    db = get_database()
+    return db.query_summaries
+
+
+def create_timeseries_collection(db: Database) -> None:
+    """Create the time-series collection for query events if it is missing."""
+    layout = TIMESERIES_LAYOUT
+    try:
+        db.create_collection(
+            layout.collection,
+            timeseries={
+                "timeField": "timestamp",
+                "metaField": layout.meta_field,
+                # Users emit a handful of events per hour per platform, so
+                # hour-wide buckets keep each bucket well filled.
+                "granularity": "hours",
+            },
+        )
+        logger.info("Created time-series collection {}", layout.collection)
+    except CollectionInvalid:
+        pass  # already exists
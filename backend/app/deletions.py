@@ -0,0 +1,247 @@
+"""
+Account deletion and data purges — throttled, resumable background deletes.
+
+A deletion is a job document in ``deletion_jobs``:
+
+- ``account`` — the user and everything derived from their queries. The
+  request itself deletes the user document (sessions stop working, the email
+  can register again) and takes them out of their organization;
+- ``purge``   — the user's history up to the request; the account stays.
+
+``python -m app.jobs.deletions`` works through pending jobs, oldest first.
+Raw events go ``deletion_batch_size`` at a time: each batch's ids are read
+through the (user, timestamp) index and deleted by user and ``_id``, and the job
+pauses between batches to stay under ``deletion_max_docs_per_second``, so
+a heavy user's history drains without a burst of replication lag. Then the
+derived data goes: compacted summaries, range buckets (rebuilt for a
+purge), the user's analytics totals and org leaderboard row (rebuilt from
+the remaining events for a purge).
+
+With ``aggregates_mode="stream"`` the derived data is only touched once the
+aggregate worker has applied every event up to the request
+(``aggregates.applied_through``): otherwise the worker would count events
+the rebuild already counted, or re-create the rows of a deleted account.
+Until then the job is left running, its raw events deleted, and is picked
+up again by the next run.
+
+Every step is idempotent and counts are saved on the job after each batch,
+so a job interrupted by a crash is simply run again. Org buckets are
+anonymous totals and keep the user's past contribution. Deleting from a
+time-series collection by ``_id`` requires MongoDB 7.0+.
+"""
+
+from __future__ import annotations
+
+import time
+from collections.abc import Callable
+from datetime import datetime
+from typing import Any
+
+from bson import ObjectId
+from loguru import logger
+from pymongo.database import Database
+from pymongo.errors import PyMongoError
+
+from app import buckets, orgs
+from app.aggregates import applied_through
+from app.analytics import USER_TOTALS
+from app.config import get_settings
+from app.models.query import QueryLayout
+
+DELETIONS_COLLECTION = "deletion_jobs"
+
+DELETION_KINDS = ("account", "purge")
+PENDING = ("queued", "running")
+
+
+def new_job(user: dict[str, Any], kind: str, requested_by: str) -> dict[str, Any]:
+    """A queued deletion of *user* (a document with ``_id`` and ``email``)."""
+    return {
+        "user_id": user["_id"],
+        "email": user["email"],
+        "kind": kind,
+        "status": "queued",
+        "requested_by": requested_by,
+        "requested_at": datetime.utcnow(),
+        "total_queries": None,
+        "deleted": {},
+        "attempts": 0,
+    }
+
+
+def enqueue(db: Database, user: dict[str, Any], kind: str, requested_by: str) -> dict[str, Any]:
+    """Queue a deletion of *user*; a pending one of the same kind is returned instead."""
+    jobs = db[DELETIONS_COLLECTION]
+    pending = jobs.find_one({"user_id": user["_id"], "kind": kind, "status": {"$in": PENDING}})
+    if pending is not None:
+        return pending
+    job = new_job(user, kind, requested_by)
+    result = jobs.insert_one(job)
+    return {**job, "_id": result.inserted_id}
+
+
+def remove_account(db: Database, user_id: ObjectId) -> bool:
+    """Delete the user document and leave their organization; False if already gone."""
+    user = db.users.find_one_and_delete({"_id": user_id}, {"org_id": 1})
+    if user is None:
+        return False
+    if user.get("org_id") is not None:
+        db[orgs.ORGS_COLLECTION].update_one({"_id": user["org_id"]}, {"$inc": {"member_count": -1}})
+    return True
+
+
+def delete_in_batches(
+    db: Database,
+    layout: QueryLayout,
+    query: dict[str, Any],
+    *,
+    batch_size: int,
+    max_per_second: float,
+    sleep: Callable[[float], None] = time.sleep,
+    on_batch: Callable[[int], None] | None = None,
+) -> int:
+    """
+    Delete the raw events matching *query* in throttled batches; return how many.
+
+    *on_batch* is called with each batch's count once it is deleted. Also
+    used by ``app.jobs.retention`` for compacted events.
+    """
+    collection = db[layout.collection]
+    deleted = 0
+    while True:
+        started = time.monotonic()
+        ids = [doc["_id"] for doc in collection.find(query, {"_id": 1}).limit(batch_size)]
+        if not ids:
+            return deleted
+        count = collection.delete_many({**query, "_id": {"$in": ids}}).deleted_count
+        deleted += count
+        if on_batch is not None:
+            on_batch(count)
+        pause = len(ids) / max_per_second - (time.monotonic() - started)
+        if pause > 0:
+            sleep(pause)
+
+
+def _delete_events(
+    db: Database,
+    layout: QueryLayout,
+    job: dict[str, Any],
+    batch_size: int,
+    max_per_second: float,
+    sleep: Callable[[float], None],
+) -> int:
+    """Delete the job's raw events in throttled batches, counting them on the job; return how many."""
+    until = job["requested_at"] if job["kind"] == "purge" else None
+
+    def record(count: int) -> None:
+        db[DELETIONS_COLLECTION].update_one(
+            {"_id": job["_id"]},
+            {"$inc": {"deleted.queries": count}, "$set": {"updated_at": datetime.utcnow()}},
+        )
+
+    return delete_in_batches(
+        db,
+        layout,
+        layout.user_filter(job["user_id"], until=until),
+        batch_size=batch_size,
+        max_per_second=max_per_second,
+        sleep=sleep,
+        on_batch=record,
+    )
+
+
+def _aggregates_caught_up(db: Database, job: dict[str, Any]) -> bool:
+    """Whether the job's derived data can be cleaned up: no event before the request is still to be applied."""
+    if get_settings().aggregates_mode != "stream":
+        return True
+    applied = applied_through(db)
+    return applied is not None and applied >= job["requested_at"]
+
+
+def run_job(
+    db: Database,
+    layout: QueryLayout,
+    job: dict[str, Any],
+    *,
+    batch_size: int,
+    max_per_second: float,
+    sleep: Callable[[float], None] = time.sleep,
+) -> dict[str, int] | None:
+    """
+    Carry out one deletion job, or finish an interrupted one; return what it deleted.
+
+    Returns None, with the raw events deleted, while the aggregate worker has
+    yet to catch up with the request.
+    """
+    jobs = db[DELETIONS_COLLECTION]
+    user_id = job["user_id"]
+    purge = job["kind"] == "purge"
+
+    if job.get("total_queries") is None:
+        until = job["requested_at"] if purge else None
+        total = db[layout.collection].count_documents(layout.user_filter(user_id, until=until))
+        jobs.update_one(
+            {"_id": job["_id"]},
+            {"$set": {"status": "running", "started_at": datetime.utcnow(), "total_queries": total}},
+        )
+        logger.info("Deleting {} queries of {} ({})", total, job["email"], job["kind"])
+
+    deleted = {"queries": _delete_events(db, layout, job, batch_size, max_per_second, sleep)}
+    if not _aggregates_caught_up(db, job):
+        logger.info("Deletion {}: waiting for the aggregate worker to reach {}", job["_id"], job["requested_at"])
+        return None
+    deleted["summaries"] = db.query_summaries.delete_many({"user_id": user_id}).deleted_count
+    deleted["buckets"] = db[buckets.BUCKETS_COLLECTION].delete_many({"user_id": user_id}).deleted_count
+    deleted["analytics"] = db[USER_TOTALS].delete_many({"_id": user_id}).deleted_count
+    deleted["member_totals"] = db[orgs.MEMBER_TOTALS_COLLECTION].delete_many({"user_id": user_id}).deleted_count
+    if purge:
+        # What was compacted is gone; buckets and the member's leaderboard
+        # row are rebuilt from the events left.
+        user = db.users.find_one_and_update(
+            {"_id": user_id}, {"$unset": {"compacted_until": ""}}, {"org_id": 1}
+        )
+        buckets.rebuild_user(db, layout, user_id)
+        if user is not None and user.get("org_id") is not None:
+            orgs.rebuild_member(db, layout, user["org_id"], user_id)
+    else:
+        remove_account(db, user_id)
+
+    jobs.update_one(
+        {"_id": job["_id"]},
+        {
+            "$inc": {f"deleted.{name}": count for name, count in deleted.items() if name != "queries"},
+            "$set": {"status": "done", "finished_at": datetime.utcnow(), "error": None},
+        },
+    )
+    return deleted
+
+
+def run_pending(
+    db: Database,
+    layout: QueryLayout,
+    *,
+    batch_size: int,
+    max_per_second: float,
+) -> dict[str, int]:
+    """Run every pending job, oldest first; return totals."""
+    totals = {"jobs": 0, "waiting": 0, "failed": 0, "queries": 0}
+    # Read up front: a cursor left idle while a long job runs would time out.
+    pending = list(db[DELETIONS_COLLECTION].find({"status": {"$in": PENDING}}).sort("requested_at", 1))
+    for job in pending:
+        try:
+            deleted = run_job(db, layout, job, batch_size=batch_size, max_per_second=max_per_second)
+        except PyMongoError as exc:
+            # Left pending: the next run resumes it.
+            logger.exception("Deletion {} failed", job["_id"])
+            db[DELETIONS_COLLECTION].update_one(
+                {"_id": job["_id"]}, {"$inc": {"attempts": 1}, "$set": {"error": str(exc)}}
+            )
+            totals["failed"] += 1
+            continue
+        if deleted is None:
+            totals["waiting"] += 1
+            continue
+        totals["jobs"] += 1
+        totals["queries"] += deleted["queries"]
+        logger.info("Deletion {} of {} done: {}", job["_id"], job["email"], deleted)
+    return totals
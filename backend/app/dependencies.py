@@ -4,12 +4,12 @@ FastAPI dependencies — reusable across routers.
 
 from __future__ import annotations
 
-from bson import ObjectId
-from fastapi import Cookie, HTTPException, status
+from fastapi import Cookie, Depends, HTTPException, status
 from loguru import logger
 
-from app.database import get_users_collection
+from app.config import get_settings
 from app.models.user import User
+from app.repositories import get_repository
 from app.utils import verify_session
 
 
@@ -33,10 +33,9 @@ async def get_current_user(session: str | None = Cookie(None)) -> User:
             detail="Invalid or expired session. Please log in again.",
         )
 
-    # Get user from database
+    # Get user from storage
     try:
-        users_collection = get_users_collection()
-        user_doc = users_collection.find_one({"_id": ObjectId(user_id)})
+        user_doc = get_repository().get_user(user_id)
 
         if not user_doc:
             logger.warning("User not found for session: {}", user_id)
@@ -53,3 +52,45 @@ async def get_current_user(session: str | None = Cookie(None)) -> User:
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Authentication error. Please log in again.",
         )
+
+
+async def get_admin_user(user: User = Depends(get_current_user)) -> User:
+    """
+    Return the authenticated user if listed in ``Settings.admin_emails``.
+
+    Raises 403 for any other authenticated user.
+    """
+    if user.email.lower() not in {email.lower() for email in get_settings().admin_emails}:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required.",
+        )
+    return user
+
+
+async def get_org_member(user: User = Depends(get_current_user)) -> User:
+    """
+    Return the authenticated user if they belong to an organization.
+
+    Raises 404 for users without one.
+    """
+    if user.org_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="You are not a member of an organization.",
+        )
+    return user
+
+
+async def get_org_admin(user: User = Depends(get_org_member)) -> User:
+    """
+    Return the authenticated user if they are an admin of their organization.
+
+    Raises 403 for other members.
+    """
+    if user.org_role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Organization admin access required.",
+        )
+    return user
@@ -0,0 +1,84 @@
+"""
+In-process pub/sub for per-user dashboard events.
+
+``publish()`` fans an event out to every open subscription of a user (e.g.
+the SSE dashboard stream). Each subscription owns a bounded queue; when a
+slow consumer lets it fill up, the queued events are discarded and replaced
+by a single ``RESYNC`` marker so the consumer rebuilds its state instead of
+silently missing deltas.
+
+Events only reach subscribers connected to the same worker process.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Any
+
+from app import metrics
+
+# Queued in place of the events dropped from an overflowing subscription.
+RESYNC: dict[str, Any] = {"type": "resync"}
+
+
+class Subscription:
+    """One consumer's bounded queue of events for a single user."""
+
+    def __init__(self, user_id: str, maxsize: int) -> None:
+        self.user_id = user_id
+        self.queue: asyncio.Queue[dict[str, Any]] = asyncio.Queue(maxsize=maxsize)
+
+    def offer(self, event: dict[str, Any]) -> bool:
+        """Enqueue *event*; on overflow replace the backlog with ``RESYNC``."""
+        try:
+            self.queue.put_nowait(event)
+            return True
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+            return False
+
+
+class EventBus:
+    """Fan out events to subscriptions keyed by user id."""
+
+    def __init__(self, name: str, queue_size: int = 64) -> None:
+        self._queue_size = queue_size
+        self._subscriptions: dict[str, set[Subscription]] = {}
+        self._subscribers = metrics.gauge(f"events.{name}.subscribers")
+        self._published = metrics.counter(f"events.{name}.published")
+        self._overflows = metrics.counter(f"events.{name}.overflows")
+
+    @contextmanager
+    def subscribe(self, user_id: str) -> Iterator[Subscription]:
+        """Register a subscription for *user_id* for the duration of the block."""
+        subscription = Subscription(user_id, self._queue_size)
+        self._subscriptions.setdefault(user_id, set()).add(subscription)
+        self._subscribers.inc()
+        try:
+            yield subscription
+        finally:
+            subscribers = self._subscriptions.get(user_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscriptions[user_id]
+            self._subscribers.dec()
+
+    def publish(self, user_id: str, event: dict[str, Any]) -> int:
+        """
+        Deliver *event* to every subscription of *user_id*; return how many.
+
+        Must be called from the event loop thread. Never blocks.
+        """
+        subscribers = self._subscriptions.get(user_id)
+        if not subscribers:
+            return 0
+        self._published.inc()
+        for subscription in subscribers:
+            if not subscription.offer(event):
+                self._overflows.inc()
+        return len(subscribers)
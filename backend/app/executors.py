@@ -0,0 +1,179 @@
+"""
+Workload pools — bounded concurrency and load shedding for blocking work.
+
+Blocking calls (pymongo, bcrypt) run in a dedicated thread pool per workload
+class instead of the shared default executor, so a burst of heavy analytics
+reads cannot delay query ingestion from the extension:
+
+- ``ingest``    — ``POST /dashboard/query`` inserts
+- ``analytics`` — dashboard aggregations and the live-stream snapshot
+- ``auth``      — login / register lookups and bcrypt
+
+Each pool runs at most ``workers`` calls at once. Up to ``queue`` further
+callers wait for a slot, for at most the pool's queue-time budget; callers
+beyond the queue, or waiting longer than the budget, get 503 straight away.
+A streamed response ``reserve()``s one slot for all its calls instead, so it
+is shed before it starts, never halfway through.
+
+Pools are per worker process; a forked worker starts with none, since the
+parent's threads do not survive the fork.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Literal, TypeVar
+
+from fastapi import HTTPException, status
+from loguru import logger
+
+from app import metrics
+from app.config import get_settings
+
+T = TypeVar("T")
+
+Workload = Literal["ingest", "analytics", "auth"]
+
+
+class WorkloadPool:
+    """A thread pool with admission control and a queue-time budget."""
+
+    def __init__(self, name: str, workers: int, queue: int, queue_timeout_ms: int) -> None:
+        self.name = name
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"pool-{name}")
+        self._slots = asyncio.Semaphore(workers)
+        self._max_waiting = queue
+        self._queue_timeout = queue_timeout_ms / 1000
+        self._waiting = 0
+        self._queue_ms = metrics.summary(f"pool.{name}.queue_ms")
+        self._active = metrics.gauge(f"pool.{name}.active")
+        self._rejected = metrics.counter(f"pool.{name}.rejected")
+
+    def _reject(self, reason: str) -> HTTPException:
+        self._rejected.inc()
+        logger.warning("Shedding {} work: {}", self.name, reason)
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is busy. Please retry shortly.",
+            headers={"Retry-After": "1"},
+        )
+
+    async def _admit(self) -> None:
+        """Take a slot, waiting in the queue if need be, or raise 503."""
+        if self._slots.locked():
+            if self._waiting >= self._max_waiting:
+                raise self._reject("queue full")
+            self._waiting += 1
+            started = time.perf_counter()
+            try:
+                await asyncio.wait_for(self._slots.acquire(), self._queue_timeout)
+            except asyncio.TimeoutError:
+                raise self._reject("queue-time budget exceeded") from None
+            finally:
+                self._waiting -= 1
+            self._queue_ms.observe((time.perf_counter() - started) * 1000)
+        else:
+            await self._slots.acquire()
+            self._queue_ms.observe(0.0)
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        """Run ``fn(*args)`` in this pool once a slot frees up, or raise 503."""
+        await self._admit()
+        # The slot is released when the thread finishes, not when the caller
+        # goes away, so a cancelled request cannot oversubscribe the pool.
+        loop = asyncio.get_running_loop()
+        self._active.inc()
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._active.dec()
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._release_from_thread(loop))
+        return await asyncio.wrap_future(future)
+
+    async def reserve(self) -> Reservation:
+        """Take a slot for a series of calls, or raise 503; ``release()`` it when done."""
+        await self._admit()
+        self._active.inc()
+        return Reservation(self)
+
+    def _release_from_thread(self, loop: asyncio.AbstractEventLoop) -> None:
+        try:
+            loop.call_soon_threadsafe(self._release)
+        except RuntimeError:
+            pass  # loop already closed (shutdown)
+
+    def _release(self) -> None:
+        self._active.dec()
+        self._slots.release()
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class Reservation:
+    """A slot held in a pool: its calls run one at a time, with no further admission."""
+
+    def __init__(self, pool: WorkloadPool) -> None:
+        self._pool = pool
+        self._running: Future | None = None
+        self._released = False
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        """Run ``fn(*args)`` in the reserved slot."""
+        if self._released:
+            raise RuntimeError(f"Reservation in pool {self._pool.name!r} already released")
+        self._running = self._pool._executor.submit(fn, *args)
+        return await asyncio.wrap_future(self._running)
+
+    def release(self) -> None:
+        """Give the slot back, once the call in it (if any) has finished."""
+        if self._released:
+            return
+        self._released = True
+        if self._running is None or self._running.done():
+            self._pool._release()
+        else:
+            loop = asyncio.get_running_loop()
+            self._running.add_done_callback(lambda _: self._pool._release_from_thread(loop))
+
+
+_pools: dict[str, WorkloadPool] = {}
+
+
+def get_pool(workload: Workload) -> WorkloadPool:
+    """Return the pool for *workload*, created from ``Settings`` on first use."""
+    pool = _pools.get(workload)
+    if pool is None:
+        settings = get_settings()
+        pool = _pools[workload] = WorkloadPool(
+            workload,
+            workers=getattr(settings, f"pool_{workload}_workers"),
+            queue=getattr(settings, f"pool_{workload}_queue"),
+            queue_timeout_ms=getattr(settings, f"pool_{workload}_queue_timeout_ms"),
+        )
+    return pool
+
+
+async def run_in_pool(workload: Workload, fn: Callable[..., T], *args: Any) -> T:
+    """Run the blocking ``fn(*args)`` in the *workload* pool."""
+    return await get_pool(workload).run(fn, *args)
+
+
+def shutdown_pools() -> None:
+    """Stop every pool's threads and forget the pools (lifespan hook)."""
+    for pool in _pools.values():
+        pool.shutdown()
+    _pools.clear()
+
+
+def _forget_pools_after_fork() -> None:
+    _pools.clear()
+
+
+os.register_at_fork(after_in_child=_forget_pools_after_fork)
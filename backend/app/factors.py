@@ -0,0 +1,97 @@
+"""
+Carbon factor registry — versioned per-platform estimates, cached in-process.
+
+Versions live in the ``carbon_factors`` collection and are never modified;
+a change in estimates is published as a new version and applied to stored
+events by ``python -m app.jobs.reprice``. The first lookup seeds version 1
+from ``CARBON_PER_QUERY`` when the collection is empty.
+
+The latest version is cached per process for ``factors_cache_seconds``, so
+pricing a query normally costs no database round-trip.
+"""
+
+from __future__ import annotations
+
+import time
+from datetime import datetime
+
+from loguru import logger
+from pymongo.database import Database
+from pymongo.errors import DuplicateKeyError
+
+from app.config import get_settings
+from app.constants.platforms import CARBON_PER_QUERY
+from app.executors import run_in_pool
+from app.models.factors import FactorTable
+from app.repositories import get_repository
+
+FACTORS_COLLECTION = "carbon_factors"
+
+
+def latest_factor_table(db: Database) -> FactorTable:
+    """Return the newest factor version, seeding version 1 if there is none."""
+    doc = db[FACTORS_COLLECTION].find_one({}, sort=[("_id", -1)])
+    if doc is not None:
+        return FactorTable.from_db(doc)
+
+    seed = FactorTable(
+        version=1,
+        factors=dict(CARBON_PER_QUERY),
+        created_at=datetime.utcnow(),
+        note="initial estimates",
+    )
+    try:
+        db[FACTORS_COLLECTION].insert_one(seed.to_db())
+        logger.info("Seeded carbon factors version 1")
+    except DuplicateKeyError:
+        pass  # another process seeded it first
+    return FactorTable.from_db(db[FACTORS_COLLECTION].find_one({"_id": 1}))
+
+
+def load_factor_table(db: Database, version: int) -> FactorTable | None:
+    """Return factor *version*, or None if it does not exist."""
+    doc = db[FACTORS_COLLECTION].find_one({"_id": version})
+    return FactorTable.from_db(doc) if doc else None
+
+
+def publish_factor_table(db: Database, factors: dict[str, float], note: str = "") -> FactorTable:
+    """Store *factors* as the next version and return it."""
+    while True:
+        version = latest_factor_table(db).version + 1
+        table = FactorTable(version=version, factors=factors, created_at=datetime.utcnow(), note=note)
+        try:
+            db[FACTORS_COLLECTION].insert_one(table.to_db())
+        except DuplicateKeyError:
+            continue  # raced with another publisher; take the next number
+        logger.info("Published carbon factors version {}", version)
+        return table
+
+
+# ── In-process cache ────────────────────────────────────────────────────
+
+_cached: tuple[float, FactorTable] | None = None
+
+
+def cached_factor_table() -> FactorTable | None:
+    """Return the cached latest version if it is still fresh."""
+    if _cached is None:
+        return None
+    loaded_at, table = _cached
+    if time.monotonic() - loaded_at > get_settings().factors_cache_seconds:
+        return None
+    return table
+
+
+def get_factor_table() -> FactorTable:
+    """Return the latest version, from the cache or (blocking) from storage."""
+    global _cached
+    table = cached_factor_table()
+    if table is None:
+        table = get_repository().latest_factor_table()
+        _cached = (time.monotonic(), table)
+    return table
+
+
+async def current_factor_table() -> FactorTable:
+    """Like ``get_factor_table()``, refreshing in the ingest pool when stale."""
+    return cached_factor_table() or await run_in_pool("ingest", get_factor_table)
@@ -0,0 +1,266 @@
+"""
+Index advisor — ``explain`` every query shape the routers issue.
+
+Each ``QueryShape`` mirrors a ``find`` — or a ``$match`` + ``$group``
+aggregate — in the routers/dependencies with a placeholder value for the
+user, for the configured storage layout. ``check_query_shapes()`` runs
+``explain`` on each one and reports shapes whose winning plan scans the
+whole collection, or fetches documents although the shape is expected to be
+covered by an index. Keep this list in sync when adding or changing a read
+path.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any
+
+from bson import ObjectId
+from pymongo.database import Database
+
+from app.buckets import hour_group
+from app.models.query import STANDARD_LAYOUT, QueryLayout
+
+_USER_ID = ObjectId("000000000000000000000000")
+_SINCE = datetime(2000, 1, 1)
+
+
+@dataclass(frozen=True)
+class QueryShape:
+    """One ``find`` (or, with ``group``, ``$match`` + ``$group``) issued by the API, in explain-able form."""
+
+    name: str
+    collection: str
+    filter: dict[str, Any]
+    projection: dict[str, int] | None = None
+    sort: list[tuple[str, int]] = field(default_factory=list)
+    limit: int = 0
+    covered: bool = False  # must be answered from the index alone
+    group: dict[str, Any] | None = None  # $group stage after matching ``filter``
+
+
+def query_shapes(layout: QueryLayout) -> list[QueryShape]:
+    """
+    Return every query shape the API issues against *layout*.
+
+    Time-series collections always unpack buckets, so no query-event shape
+    can be covered there; the check only guards against collection scans.
+    """
+    covered = layout is STANDARD_LAYOUT
+    return [
+        QueryShape(
+            name="auth: user by id (session)",
+            collection="users",
+            filter={"_id": _USER_ID},
+        ),
+        QueryShape(
+            name="auth: user by email",
+            collection="users",
+            filter={"email": "user@example.com"},
+        ),
+        QueryShape(
+            name="factors: latest version",
+            collection="carbon_factors",
+            filter={},
+            sort=[("_id", -1)],
+            limit=1,
+        ),
+        QueryShape(
+            name="dashboard: all queries for user (stats, platforms)",
+            collection=layout.collection,
+            filter=layout.user_filter(_USER_ID),
+            projection=layout.record_projection,
+            covered=covered,
+        ),
+        QueryShape(
+            name="dashboard: queries since (stats after compaction, today)",
+            collection=layout.collection,
+            filter=layout.user_filter(_USER_ID, _SINCE),
+            projection=layout.record_projection,
+            covered=covered,
+        ),
+        QueryShape(
+            name="dashboard: export events",
+            collection=layout.collection,
+            filter=layout.user_filter(_USER_ID, _SINCE),
+            projection=layout.record_projection,
+            sort=[("timestamp", 1)],
+            covered=covered,
+        ),
+        QueryShape(
+            name="dashboard: platform totals (stats, platforms)",
+            collection=layout.collection,
+            filter=layout.user_filter(_USER_ID, _SINCE),
+            group={
+                "_id": f"${layout.platform_field}",
+                "count": {"$sum": 1},
+                "carbon_grams": {"$sum": "$carbon_grams"},
+            },
+            covered=covered,
+        ),
+        QueryShape(
+            name="dashboard: compacted summary totals (stats)",
+            collection="query_summaries",
+            filter={"user_id": _USER_ID},
+            group={"_id": "$platform", "count": {"$sum": "$count"}, "carbon_grams": {"$sum": "$carbon_grams"}},
+            covered=True,
+        ),
+        QueryShape(
+            name="buckets: hourly groups of a user's events (rebuild, purge)",
+            collection=layout.collection,
+            filter=layout.user_filter(_USER_ID, _SINCE),
+            group=hour_group(layout),
+            covered=covered,
+        ),
+        QueryShape(
+            name="dashboard: compacted summaries (stats, export)",
+            collection="query_summaries",
+            filter={"user_id": _USER_ID},
+            sort=[("start", 1)],
+        ),
+        QueryShape(
+            name="dashboard: recent queries",
+            collection=layout.collection,
+            filter=layout.user_filter(_USER_ID),
+            projection={**layout.record_projection, "_id": 1},
+            sort=[("timestamp", -1)],
+            limit=15,
+        ),
+        QueryShape(
+            name="dashboard: range prefix sum",
+            collection="query_buckets",
+            filter={"user_id": _USER_ID, "period": "hour", "start": {"$lt": _SINCE}},
+            projection={"start": 1, "cum_count": 1, "cum_carbon": 1, "q1": 1, "q2": 1, "q3": 1},
+            sort=[("start", -1)],
+            limit=1,
+        ),
+        QueryShape(
+            name="dashboard: buckets in interval (range series, local days)",
+            collection="query_buckets",
+            filter={"user_id": _USER_ID, "period": "hour", "start": {"$gte": _SINCE, "$lt": datetime(2000, 1, 15)}},
+            projection={"_id": 0, "start": 1, "count": 1, "carbon": 1, "q1": 1, "q2": 1, "q3": 1},
+            sort=[("start", 1)],
+        ),
+        QueryShape(
+            name="orgs: members by email",
+            collection="users",
+            filter={"org_id": _USER_ID},
+            projection={"email": 1, "org_role": 1},
+            sort=[("email", 1)],
+        ),
+        QueryShape(
+            name="orgs: day series from org buckets",
+            collection="org_buckets",
+            filter={"org_id": _USER_ID, "period": "hour", "start": {"$gte": _SINCE, "$lt": datetime(2000, 1, 15)}},
+            projection={"_id": 0, "start": 1, "count": 1, "carbon": 1, "q1": 1, "q2": 1, "q3": 1},
+            sort=[("start", 1)],
+        ),
+        QueryShape(
+            name="orgs: leaderboard",
+            collection="org_member_totals",
+            filter={"org_id": _USER_ID},
+            projection={"_id": 0, "user_id": 1, "total_count": 1, "total_carbon": 1},
+            sort=[("total_carbon", -1)],
+            limit=10,
+        ),
+        QueryShape(
+            name="deletions: next batch of a user's events",
+            collection=layout.collection,
+            filter=layout.user_filter(_USER_ID),
+            projection={"_id": 1},
+            limit=1000,
+        ),
+        QueryShape(
+            name="deletions: pending deletion of a user",
+            collection="deletion_jobs",
+            filter={"user_id": _USER_ID, "kind": "account", "status": {"$in": ["queued", "running"]}},
+        ),
+        QueryShape(
+            name="admin: deletions by status",
+            collection="deletion_jobs",
+            filter={"status": "running"},
+            sort=[("requested_at", -1)],
+            limit=50,
+        ),
+        QueryShape(
+            name="admin: platform totals for a month",
+            collection="analytics_platform_daily",
+            filter={"month": "2000-01"},
+            projection={"_id": 0, "platform": 1, "count": 1, "carbon_grams": 1},
+        ),
+        QueryShape(
+            name="admin: cohorts",
+            collection="analytics_cohorts",
+            filter={},
+            sort=[("_id", 1)],
+        ),
+    ]
+
+
+def _plan_stages(plan: dict[str, Any]) -> list[str]:
+    """Flatten the stage names of an explain plan tree (classic or SBE)."""
+    stages: list[str] = []
+    stack = [plan]
+    while stack:
+        node = stack.pop()
+        if "queryPlan" in node:
+            node = node["queryPlan"]
+        if "stage" in node:
+            stages.append(node["stage"])
+        if "inputStage" in node:
+            stack.append(node["inputStage"])
+        stack.extend(node.get("inputStages", []))
+    return stages
+
+
+def _winning_plan(explain: dict[str, Any]) -> dict[str, Any]:
+    """
+    The query plan of an explain: top level, or under ``$cursor`` when only
+    the match is pushed down (also any find on a time-series collection).
+    """
+    if "queryPlanner" in explain:
+        return explain["queryPlanner"]["winningPlan"]
+    for stage in explain.get("stages", []):
+        if "$cursor" in stage:
+            return stage["$cursor"]["queryPlanner"]["winningPlan"]
+    raise ValueError("explain output has no query plan")
+
+
+def explain_shape(db: Database, shape: QueryShape) -> list[str]:
+    """Return the winning-plan stage names for *shape*."""
+    if shape.group is not None:
+        explain = db.command(
+            "explain",
+            {
+                "aggregate": shape.collection,
+                "pipeline": [{"$match": shape.filter}, {"$group": shape.group}],
+                "cursor": {},
+            },
+            verbosity="queryPlanner",
+        )
+        return _plan_stages(_winning_plan(explain))
+    cursor = db[shape.collection].find(shape.filter, shape.projection)
+    if shape.sort:
+        cursor = cursor.sort(shape.sort)
+    if shape.limit:
+        cursor = cursor.limit(shape.limit)
+    return _plan_stages(_winning_plan(cursor.explain()))
+
+
+def check_query_shapes(db: Database, shapes: list[QueryShape]) -> list[str]:
+    """
+    Explain every shape; return human-readable problems.
+
+    An empty list means every shape uses an index, and covered shapes never
+    fetch full documents.
+    """
+    problems: list[str] = []
+    for shape in shapes:
+        stages = explain_shape(db, shape)
+        plan = " → ".join(stages)
+        if "COLLSCAN" in stages:
+            problems.append(f"{shape.name}: collection scan ({plan})")
+        elif shape.covered and "FETCH" in stages:
+            problems.append(f"{shape.name}: not covered by an index ({plan})")
+    return problems
@@ -0,0 +1,194 @@
+"""
+Declared MongoDB indexes — the single source of truth for every collection.
+
+``ensure_indexes()`` compares the declared set against ``list_indexes`` and
+only builds what is missing, behind a leader lock so that a fleet of workers
+booting together issues each build once. Index names match the names MongoDB
+generates by default, so indexes created by earlier releases are recognised.
+
+Every query shape the routers issue is listed in ``app.index_advisor`` and
+checked against these indexes with ``explain``.
+"""
+
+from __future__ import annotations
+
+from loguru import logger
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.database import Database
+
+from app.database import create_timeseries_collection, get_query_layout
+from app.locks import leader_lock
+from app.models.query import QUERY_LAYOUTS, TIMESERIES_LAYOUT
+
+INDEXES: dict[str, list[IndexModel]] = {
+    "users": [
+        IndexModel([("email", ASCENDING)], name="email_1", unique=True),
+        # Organization member lists, by email; only members are indexed.
+        IndexModel(
+            [("org_id", ASCENDING), ("email", ASCENDING)],
+            name="org_id_1_email_1",
+            partialFilterExpression={"org_id": {"$exists": True}},
+        ),
+    ],
+    "queries": [
+        # Covers the dashboard aggregations: user filter, time range and the
+        # projected platform/carbon fields are all answered from the index,
+        # including the google_search exclusion in the comparison endpoint.
+        IndexModel(
+            [
+                ("user_id", ASCENDING),
+                ("timestamp", DESCENDING),
+                ("platform", ASCENDING),
+                ("carbon_grams", ASCENDING),
+            ],
+            name="user_id_1_timestamp_-1_platform_1_carbon_grams_1",
+        ),
+    ],
+    # Time-series layout: MongoDB maintains a clustered index on the bucket
+    # time range; this secondary index narrows reads to one user's buckets.
+    "queries_ts": [
+        IndexModel(
+            [("meta.user_id", ASCENDING), ("timestamp", DESCENDING)],
+            name="meta.user_id_1_timestamp_-1",
+        ),
+    ],
+    # One document per (user, period start, platform, period); the retention
+    # job upserts on this key and the dashboard reads by user.
+    "query_summaries": [
+        IndexModel(
+            [
+                ("user_id", ASCENDING),
+                ("start", ASCENDING),
+                ("platform", ASCENDING),
+                ("period", ASCENDING),
+            ],
+            name="user_id_1_start_1_platform_1_period_1",
+            unique=True,
+        ),
+        # Covers the per-platform summary totals of the stats endpoint.
+        IndexModel(
+            [
+                ("user_id", ASCENDING),
+                ("platform", ASCENDING),
+                ("count", ASCENDING),
+                ("carbon_grams", ASCENDING),
+            ],
+            name="user_id_1_platform_1_count_1_carbon_grams_1",
+        ),
+    ],
+    # Range buckets (app.buckets): ingest upserts on this key, range reads
+    # walk one user's buckets of one period by start.
+    "query_buckets": [
+        IndexModel(
+            [("user_id", ASCENDING), ("period", ASCENDING), ("start", ASCENDING)],
+            name="user_id_1_period_1_start_1",
+            unique=True,
+        ),
+    ],
+    # Organization rollups (app.orgs): the same bucket key per org, and one
+    # row per member, read as a leaderboard by total CO₂.
+    "org_buckets": [
+        IndexModel(
+            [("org_id", ASCENDING), ("period", ASCENDING), ("start", ASCENDING)],
+            name="org_id_1_period_1_start_1",
+            unique=True,
+        ),
+    ],
+    "org_member_totals": [
+        IndexModel([("org_id", ASCENDING), ("user_id", ASCENDING)], name="org_id_1_user_id_1", unique=True),
+        IndexModel([("org_id", ASCENDING), ("total_carbon", DESCENDING)], name="org_id_1_total_carbon_-1"),
+    ],
+    # Deletion queue (app.deletions): the job runs pending jobs oldest
+    # first, admins list by status, a request looks for a pending duplicate.
+    "deletion_jobs": [
+        IndexModel([("status", ASCENDING), ("requested_at", ASCENDING)], name="status_1_requested_at_1"),
+        IndexModel(
+            [("user_id", ASCENDING), ("kind", ASCENDING), ("status", ASCENDING)],
+            name="user_id_1_kind_1_status_1",
+        ),
+    ],
+    # Admin analytics: the platform endpoint reads one month of daily rows.
+    "analytics_platform_daily": [
+        IndexModel([("month", ASCENDING)], name="month_1"),
+    ],
+}
+
+# Indexes superseded by the declared set — a strict prefix of a declared
+# index only costs writes. Dropped by ``python -m app.jobs.build_indexes``
+# once the declared replacements exist, never at worker startup.
+OBSOLETE_INDEXES: dict[str, list[str]] = {
+    "queries": ["user_id_1_timestamp_-1"],
+}
+
+INDEX_LOCK_NAME = "indexes"
+
+
+def active_indexes() -> dict[str, list[IndexModel]]:
+    """
+    Return the declared indexes for the collections in use.
+
+    Only the query collection of the configured storage layout is included,
+    so building indexes never creates the other layout's collection.
+    """
+    active = get_query_layout().collection
+    inactive = {layout.collection for layout in QUERY_LAYOUTS.values()} - {active}
+    return {name: models for name, models in INDEXES.items() if name not in inactive}
+
+
+def missing_indexes(db: Database) -> dict[str, list[IndexModel]]:
+    """Return the declared indexes that do not exist yet, per collection."""
+    missing: dict[str, list[IndexModel]] = {}
+    for collection, models in active_indexes().items():
+        existing = {index["name"] for index in db[collection].list_indexes()}
+        absent = [m for m in models if m.document["name"] not in existing]
+        if absent:
+            missing[collection] = absent
+    return missing
+
+
+def ensure_indexes(db: Database, *, lock_ttl_seconds: int = 600) -> list[str]:
+    """
+    Build any missing declared indexes; return the names that were built.
+
+    Cheap when everything exists (one ``list_indexes`` per collection). When
+    builds are needed, only the process holding the leader lock runs them;
+    the others return immediately and serve with whatever indexes exist.
+    """
+    if not missing_indexes(db):
+        logger.info("All declared indexes exist")
+        return []
+
+    with leader_lock(db, INDEX_LOCK_NAME, ttl_seconds=lock_ttl_seconds) as acquired:
+        if not acquired:
+            logger.info("Index build already running in another process; skipping")
+            return []
+
+        # A time-series collection must exist before indexes are added, or
+        # create_indexes would implicitly create a regular collection.
+        if get_query_layout() is TIMESERIES_LAYOUT:
+            create_timeseries_collection(db)
+
+        # Re-check under the lock: another leader may have just finished.
+        built: list[str] = []
+        for collection, models in missing_indexes(db).items():
+            names = db[collection].create_indexes(models)
+            logger.info("Created indexes on {}: {}", collection, ", ".join(names))
+            built.extend(f"{collection}.{name}" for name in names)
+        return built
+
+
+def drop_obsolete_indexes(db: Database) -> list[str]:
+    """Drop superseded indexes whose replacements exist; return their names."""
+    if missing_indexes(db):
+        logger.warning("Declared indexes are missing; not dropping obsolete ones")
+        return []
+
+    dropped: list[str] = []
+    for collection, names in OBSOLETE_INDEXES.items():
+        existing = {index["name"] for index in db[collection].list_indexes()}
+        for name in names:
+            if name in existing:
+                db[collection].drop_index(name)
+                logger.info("Dropped obsolete index {}.{}", collection, name)
+                dropped.append(f"{collection}.{name}")
+    return dropped
@@ -0,0 +1,14 @@
+"""
+Operational jobs and migrations, runnable as modules::
+
+    python -m app.jobs.aggregates
+    python -m app.jobs.analytics
+    python -m app.jobs.build_buckets
+    python -m app.jobs.build_indexes
+    python -m app.jobs.check_query_plans
+    python -m app.jobs.check_read_routing
+    python -m app.jobs.deletions
+    python -m app.jobs.migrate_timeseries
+    python -m app.jobs.reprice
+    python -m app.jobs.retention
+"""
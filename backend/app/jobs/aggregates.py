@@ -0,0 +1,117 @@
+"""
+Maintain range buckets and org rollups from the change stream.
+
+    python -m app.jobs.aggregates [--catch-up] [--since ISO_DATETIME] [--reset]
+
+The worker for ``aggregates_mode="stream"`` (see ``app.aggregates``): runs
+until interrupted, resuming from its saved token. ``--catch-up`` applies
+what is pending and exits. ``--since`` sets where a worker without a saved
+token starts (default: now), ``--reset`` forgets the token first. Only one
+worker runs at a time. With ``metrics_dir`` set, its metrics — among them
+``aggregates.lag_seconds`` — are published there for /metrics.
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import threading
+from datetime import datetime
+
+from loguru import logger
+from pymongo.errors import OperationFailure
+
+from app import metrics
+from app.aggregates import HISTORY_LOST_CODES, JOB_NAME, LOCK_TTL_SECONDS, LeadershipLost, run
+from app.config import get_settings
+from app.database import close_mongodb_client, get_database
+from app.jobs.state import clear_checkpoint
+from app.locks import acquire_lock, owner_id, release_lock
+from app.logging_config import setup_logging
+
+
+def _publish_metrics(directory: str, interval: float, stop: threading.Event) -> None:
+    while not stop.is_set():
+        try:
+            metrics.publish(directory)
+        except OSError as exc:
+            logger.warning("Could not publish metrics: {}", exc)
+        stop.wait(interval)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Maintain range buckets and org rollups from the change stream.")
+    parser.add_argument("--catch-up", action="store_true", help="apply pending events and exit")
+    parser.add_argument(
+        "--since",
+        type=datetime.fromisoformat,
+        default=None,
+        metavar="ISO_DATETIME",
+        help="start here (UTC) when there is no saved resume token",
+    )
+    parser.add_argument("--reset", action="store_true", help="forget the saved resume token first")
+    args = parser.parse_args(argv)
+
+    settings = get_settings()
+    setup_logging(debug=settings.debug)
+    if settings.queries_storage != "standard":
+        logger.error("Change streams need the standard query storage, not {!r}", settings.queries_storage)
+        return 1
+    if settings.aggregates_mode != "stream":
+        logger.warning("aggregates_mode is {!r}: ingest is not deferring events", settings.aggregates_mode)
+
+    db = get_database()
+    owner = owner_id()
+    if not acquire_lock(db, JOB_NAME, owner, LOCK_TTL_SECONDS):
+        logger.warning("Another aggregate worker is running")
+        close_mongodb_client()
+        return 1
+    stop = threading.Event()
+    publisher = None
+    if settings.metrics_dir:
+        publisher = threading.Thread(
+            target=_publish_metrics,
+            args=(settings.metrics_dir, settings.metrics_flush_seconds, stop),
+            daemon=True,
+        )
+        publisher.start()
+    try:
+        if args.reset:
+            clear_checkpoint(db, JOB_NAME)
+        applied = run(
+            db,
+            owner,
+            batch_size=settings.aggregates_batch_size,
+            batch_ms=settings.aggregates_batch_ms,
+            since=args.since,
+            follow=not args.catch_up,
+        )
+        logger.info("Caught up: applied {} events", applied)
+        return 0
+    except OperationFailure as exc:
+        if exc.code in HISTORY_LOST_CODES:
+            logger.error(
+                "The saved resume token is no longer in the oplog; rebuild with "
+                "python -m app.jobs.build_buckets and restart with --reset: {}",
+                exc,
+            )
+        else:
+            logger.error("Change stream failed (a replica set is required): {}", exc)
+        return 1
+    except LeadershipLost as exc:
+        logger.error("{}", exc)
+        return 1
+    except KeyboardInterrupt:
+        logger.info("Stopped")
+        return 0
+    finally:
+        release_lock(db, JOB_NAME, owner)
+        if publisher is not None:
+            stop.set()
+            publisher.join()
+            metrics.unpublish(settings.metrics_dir)
+        close_mongodb_client()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,51 @@
+"""
+Refresh the platform-wide analytics served under ``/admin/analytics``.
+
+    python -m app.jobs.analytics [--workers 4] [--reset]
+
+Processes every complete UTC day since the previous run (see
+``app.analytics``); schedule it daily, shortly after midnight UTC.
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+
+from loguru import logger
+
+from app.analytics import JOB_NAME, reset_analytics, run_analytics
+from app.config import get_settings
+from app.database import close_mongodb_client, get_database, get_query_layout
+from app.locks import leader_lock
+from app.logging_config import setup_logging
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Refresh platform-wide analytics.")
+    parser.add_argument("--workers", type=int, default=4, help="user ranges aggregated in parallel")
+    parser.add_argument(
+        "--reset",
+        action="store_true",
+        help="drop computed analytics and recompute from the start",
+    )
+    args = parser.parse_args(argv)
+
+    setup_logging(debug=get_settings().debug)
+    db = get_database()
+    try:
+        with leader_lock(db, JOB_NAME, ttl_seconds=3600) as acquired:
+            if not acquired:
+                logger.warning("Another analytics run is in progress")
+                return 1
+            if args.reset:
+                reset_analytics(db)
+            totals = run_analytics(db, get_query_layout(), workers=args.workers)
+        logger.info("Analytics finished: {}", totals)
+        return 0
+    finally:
+        close_mongodb_client()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
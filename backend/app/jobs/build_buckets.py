@@ -0,0 +1,94 @@
+"""
+Build the range-query buckets from stored history.
+
+    python -m app.jobs.build_buckets [--user ID] [--workers 4]
+
+New events update ``query_buckets`` as they are ingested; this job fills
+them in for history recorded before buckets existed, and repairs them after
+manual edits of the events collection. Each user's hourly and daily buckets
+are recomputed from raw events from ``compacted_until`` on; compacted
+history is seeded from ``query_summaries`` when a user has no older buckets.
+Prefix sums are recomputed afterwards. Safe to re-run.
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from loguru import logger
+from pymongo.database import Database
+
+from app.buckets import rebuild_user
+from app.config import get_settings
+from app.database import close_mongodb_client, get_database, get_query_layout
+from app.locks import leader_lock
+from app.logging_config import setup_logging
+
+JOB_NAME = "build_buckets"
+USER_BATCH_SIZE = 500
+
+
+def build_buckets(db: Database, *, user_id: ObjectId | None = None, workers: int = 4) -> dict[str, int]:
+    """Rebuild the buckets of one user, or of every user; return totals."""
+    layout = get_query_layout()
+    totals = {"users": 0, "buckets": 0}
+
+    def rebuild(user: dict) -> int:
+        return rebuild_user(db, layout, user["_id"], user.get("compacted_until"))
+
+    last_id = None
+    with ThreadPoolExecutor(max_workers=max(workers, 1), thread_name_prefix="buckets") as pool:
+        while True:
+            if user_id is not None:
+                query = {"_id": user_id}
+            else:
+                query = {"_id": {"$gt": last_id}} if last_id is not None else {}
+            users = list(
+                db.users.find(query, {"_id": 1, "compacted_until": 1})
+                .sort("_id", 1)
+                .limit(USER_BATCH_SIZE)
+            )
+            if not users:
+                break
+            for written in pool.map(rebuild, users):
+                totals["users"] += 1
+                totals["buckets"] += written
+            logger.info("Bucket build progress: {}", totals)
+            if user_id is not None:
+                break
+            last_id = users[-1]["_id"]
+
+    return totals
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Build the range-query buckets from stored history.")
+    parser.add_argument("--user", help="only rebuild this user id")
+    parser.add_argument("--workers", type=int, default=4, help="users rebuilt in parallel")
+    args = parser.parse_args(argv)
+
+    try:
+        user_id = ObjectId(args.user) if args.user else None
+    except InvalidId:
+        parser.error(f"--user expects an ObjectId, got {args.user!r}")
+
+    setup_logging(debug=get_settings().debug)
+    db = get_database()
+    try:
+        with leader_lock(db, JOB_NAME, ttl_seconds=3600) as acquired:
+            if not acquired:
+                logger.warning("Another bucket build is in progress")
+                return 1
+            totals = build_buckets(db, user_id=user_id, workers=args.workers)
+        logger.info("Bucket build finished: {}", totals)
+        return 0
+    finally:
+        close_mongodb_client()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
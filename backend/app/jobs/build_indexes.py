@@ -0,0 +1,58 @@
+"""
+Build the declared MongoDB indexes — run once per deployment.
+
+    python -m app.jobs.build_indexes [--check] [--drop-obsolete]
+
+With ``--check`` nothing is built; the command lists missing indexes and
+exits non-zero if there are any. ``--drop-obsolete`` drops superseded
+indexes once their declared replacements exist.
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+
+from loguru import logger
+
+from app.config import get_settings
+from app.database import close_mongodb_client, get_database
+from app.indexes import drop_obsolete_indexes, ensure_indexes, missing_indexes
+from app.logging_config import setup_logging
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Build the declared MongoDB indexes.")
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="only report missing indexes; exit 1 if any are missing",
+    )
+    parser.add_argument(
+        "--drop-obsolete",
+        action="store_true",
+        help="drop superseded indexes after the declared ones are built",
+    )
+    args = parser.parse_args(argv)
+
+    setup_logging(debug=get_settings().debug)
+    db = get_database()
+    try:
+        if args.check:
+            missing = missing_indexes(db)
+            for collection, models in missing.items():
+                for model in models:
+                    logger.warning("Missing index {}.{}", collection, model.document["name"])
+            return 1 if missing else 0
+
+        built = ensure_indexes(db)
+        logger.info("Index build finished ({} created)", len(built))
+        if args.drop_obsolete:
+            drop_obsolete_indexes(db)
+        return 0
+    finally:
+        close_mongodb_client()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
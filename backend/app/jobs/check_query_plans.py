@@ -0,0 +1,41 @@
+"""
+Verify that every API query shape is served by an index.
+
+    python -m app.jobs.check_query_plans
+
+Runs ``explain`` for each shape from ``app.index_advisor.query_shapes`` and
+exits non-zero if any of them scans the collection or, for shapes expected
+to be covered, fetches documents. Intended for CI against a database that
+has the declared indexes built; ``tests/test_query_plans.py`` runs the same
+check for both storage layouts on a scratch database when
+``TEST_MONGODB_URI`` is set.
+"""
+
+from __future__ import annotations
+
+import sys
+
+from loguru import logger
+
+from app.config import get_settings
+from app.database import close_mongodb_client, get_database, get_query_layout
+from app.index_advisor import check_query_shapes, query_shapes
+from app.logging_config import setup_logging
+
+
+def main() -> int:
+    setup_logging(debug=get_settings().debug)
+    shapes = query_shapes(get_query_layout())
+    try:
+        problems = check_query_shapes(get_database(), shapes)
+    finally:
+        close_mongodb_client()
+
+    for problem in problems:
+        logger.error("Query plan check failed — {}", problem)
+    logger.info("Checked {} query shapes, {} problem(s)", len(shapes), len(problems))
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
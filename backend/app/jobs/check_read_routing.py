@@ -0,0 +1,57 @@
+"""
+Show which replica set member serves primary reads and analytics reads.
+
+    python -m app.jobs.check_read_routing
+
+Sends ``hello`` with the default and with the analytics read preference
+(``mongodb_analytics_read_preference`` / ``..._max_staleness_seconds``) and
+logs the member that answered each. Exits non-zero if analytics reads are
+configured for secondaries only but a secondary cannot be selected, e.g.
+against a standalone server or when every secondary is too stale. Run it
+against a local replica set after changing the settings.
+"""
+
+from __future__ import annotations
+
+import sys
+
+from loguru import logger
+from pymongo.errors import ServerSelectionTimeoutError
+
+from app.config import get_settings
+from app.database import close_mongodb_client, get_analytics_database, get_database
+from app.logging_config import setup_logging
+
+
+def _member(reply: dict) -> str:
+    role = "primary" if reply.get("isWritablePrimary") else "secondary" if reply.get("secondary") else "standalone"
+    return f"{reply.get('me', 'standalone server')} ({role})"
+
+
+def main() -> int:
+    settings = get_settings()
+    setup_logging(debug=settings.debug)
+    try:
+        try:
+            primary = get_database().command("hello")
+        except ServerSelectionTimeoutError as exc:
+            logger.error("Cannot reach the primary: {}", exc)
+            return 1
+        if "setName" not in primary:
+            logger.warning("Not a replica set: every read goes to the one server")
+        logger.info("Primary reads: {}", _member(primary))
+
+        analytics_db = get_analytics_database()
+        try:
+            reply = analytics_db.command("hello", read_preference=analytics_db.read_preference)
+        except ServerSelectionTimeoutError as exc:
+            logger.error("No member matches the analytics read preference {}: {}", analytics_db.read_preference, exc)
+            return 1
+        logger.info("Analytics reads ({}): {}", analytics_db.read_preference, _member(reply))
+        return 0
+    finally:
+        close_mongodb_client()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
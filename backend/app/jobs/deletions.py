@@ -0,0 +1,68 @@
+"""
+Carry out queued account deletions and data purges.
+
+    python -m app.jobs.deletions [--poll SECONDS]
+
+Runs every pending deletion oldest first, at the pace set by
+``deletion_batch_size`` and ``deletion_max_docs_per_second`` (see
+``app.deletions``), and exits; with ``--poll`` it keeps checking the queue.
+An interrupted run is resumed by the next one, and so is a job still waiting
+for the aggregate worker (``aggregates_mode="stream"``).
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+
+from loguru import logger
+
+from app.config import get_settings
+from app.database import close_mongodb_client, get_database, get_query_layout
+from app.deletions import run_pending
+from app.locks import leader_lock
+from app.logging_config import setup_logging
+
+JOB_NAME = "deletions"
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Carry out queued account deletions and data purges.")
+    parser.add_argument(
+        "--poll",
+        type=float,
+        default=None,
+        metavar="SECONDS",
+        help="keep running, checking the queue this often",
+    )
+    args = parser.parse_args(argv)
+
+    settings = get_settings()
+    setup_logging(debug=settings.debug)
+    db = get_database()
+    try:
+        while True:
+            with leader_lock(db, JOB_NAME, ttl_seconds=3600) as acquired:
+                if not acquired:
+                    logger.warning("Another deletion run is in progress")
+                    if args.poll is None:
+                        return 1
+                else:
+                    totals = run_pending(
+                        db,
+                        get_query_layout(),
+                        batch_size=settings.deletion_batch_size,
+                        max_per_second=settings.deletion_max_docs_per_second,
+                    )
+                    if totals["jobs"] or totals["failed"] or args.poll is None:
+                        logger.info("Deletions finished: {}", totals)
+            if args.poll is None:
+                return 0
+            time.sleep(args.poll)
+    finally:
+        close_mongodb_client()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+"""
+Copy query events from ``queries`` into the ``queries_ts`` time-series collection.
+
+    python -m app.jobs.migrate_timeseries [--batch-size 5000] [--restart]
+
+Events are copied in ``_id`` order, in batches, keeping their ``_id`` so
+existing ids stay valid. Progress is checkpointed after each batch, so the
+command can be interrupted and re-run; a re-run also picks up events written
+to ``queries`` since the previous run. Switching over:
+
+1. run the migration while the API still writes to ``queries``;
+2. set ``QUERIES_STORAGE=timeseries`` and redeploy;
+3. run the migration once more to copy the events written in between.
+
+The source collection is left untouched.
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+
+from loguru import logger
+
+from app.config import get_settings
+from app.database import close_mongodb_client, create_timeseries_collection, get_database
+from app.jobs.state import clear_checkpoint, load_checkpoint, save_checkpoint
+from app.logging_config import setup_logging
+from app.models.query import STANDARD_LAYOUT, TIMESERIES_LAYOUT
+
+JOB_NAME = "migrate_timeseries"
+
+
+def migrate(db, *, batch_size: int) -> int:
+    """Copy all not-yet-copied events; return how many were copied."""
+    source = db[STANDARD_LAYOUT.collection]
+    target = db[TIMESERIES_LAYOUT.collection]
+    create_timeseries_collection(db)
+
+    checkpoint = load_checkpoint(db, JOB_NAME)
+    last_id = checkpoint.get("last_id")
+    total = checkpoint.get("copied", 0)
+
+    # A crash between inserting a batch and saving the checkpoint leaves
+    # events past the checkpoint in the target; skip those on resume.
+    already_copied: set = set()
+    if last_id is not None:
+        already_copied = {
+            doc["_id"] for doc in target.find({"_id": {"$gt": last_id}}, {"_id": 1})
+        }
+        logger.info("Resuming after _id {} ({} events already copied)", last_id, len(already_copied))
+
+    copied = 0
+    while True:
+        query = {"_id": {"$gt": last_id}} if last_id is not None else {}
+        batch = list(source.find(query).sort("_id", 1).limit(batch_size))
+        if not batch:
+            break
+
+        docs = []
+        for doc in batch:
+            if doc["_id"] in already_copied:
+                continue
+            docs.append(
+                {
+                    "_id": doc["_id"],
+                    **TIMESERIES_LAYOUT.document(
+                        user_id=doc["user_id"],
+                        platform=doc.get("platform", "unknown"),
+                        carbon_grams=doc.get("carbon_grams", 0.0),
+                        timestamp=doc["timestamp"],
+                        **({"factor_version": doc["factor_version"]} if "factor_version" in doc else {}),
+                    ),
+                }
+            )
+        if docs:
+            target.insert_many(docs, ordered=False)
+
+        last_id = batch[-1]["_id"]
+        copied += len(docs)
+        total += len(docs)
+        save_checkpoint(db, JOB_NAME, last_id=last_id, copied=total)
+        logger.info("Copied {} events (up to _id {})", copied, last_id)
+
+    return copied
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Copy query events into the time-series collection.")
+    parser.add_argument("--batch-size", type=int, default=5000, help="events per batch")
+    parser.add_argument(
+        "--restart",
+        action="store_true",
+        help="ignore the saved checkpoint (only after emptying queries_ts)",
+    )
+    args = parser.parse_args(argv)
+
+    setup_logging(debug=get_settings().debug)
+    db = get_database()
+    try:
+        if args.restart:
+            clear_checkpoint(db, JOB_NAME)
+        copied = migrate(db, batch_size=args.batch_size)
+        logger.info("Time-series migration finished ({} events copied)", copied)
+        return 0
+    finally:
+        close_mongodb_client()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,226 @@
+"""
+Re-price stored query events with a carbon factor version.
+
+    python -m app.jobs.reprice [--set chatgpt=4.1 ...] [--version N]
+                               [--workers 4] [--batch-size 5000] [--restart]
+
+``--set`` first publishes a new factor version (the latest one with the
+given platforms overridden). Events whose ``factor_version`` differs from
+the target version get ``carbon_grams`` rewritten from that version; then
+the compacted ``query_summaries``, the range buckets and the organization
+leaderboards are rebuilt as ``count × factor`` and the platform-wide
+analytics are reset for ``python -m app.jobs.analytics``.
+
+The ``_id`` range of the events collection is split into ``--workers``
+partitions that are re-priced in parallel, one batch at a time. A
+time-series collection has no ``_id`` index, so there the ``timestamp``
+range is split instead (its buckets are clustered by time). Each batch only
+touches events not yet at the target version, and every partition's
+progress is checkpointed, so the job can be interrupted and re-run. Run it
+once more after ``factors_cache_seconds`` to catch events written by
+workers that still priced with the previous version.
+
+Updating measurement fields of a time-series collection requires MongoDB
+7.0+.
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any
+
+from bson import ObjectId
+from loguru import logger
+from pymongo.database import Database
+
+from app.analytics import reset_analytics
+from app.buckets import reprice_buckets
+from app.config import get_settings
+from app.database import close_mongodb_client, get_database, get_query_layout
+from app.factors import latest_factor_table, load_factor_table, publish_factor_table
+from app.jobs.state import clear_checkpoint, load_checkpoint, save_checkpoint
+from app.locks import leader_lock
+from app.logging_config import setup_logging
+from app.models.factors import FactorTable
+from app.models.query import QueryLayout
+from app.orgs import reprice_member_totals
+
+JOB_NAME = "reprice"
+
+
+def _partition_key(layout: QueryLayout) -> str:
+    """The indexed field events are partitioned and batched on for *layout*."""
+    return "timestamp" if layout.meta_field else "_id"
+
+
+def _partition_bounds(db: Database, layout: QueryLayout, workers: int) -> list[ObjectId | datetime]:
+    """Split the partition key's range into *workers* slices of equal time span."""
+    key = _partition_key(layout)
+    first = db[layout.collection].find_one({}, {key: 1}, sort=[(key, 1)])
+    last = db[layout.collection].find_one({}, {key: 1}, sort=[(key, -1)])
+    if first is None or workers < 2:
+        return []
+    if key == "timestamp":
+        start, end = first[key], last[key]
+        step = (end - start) / workers
+        return sorted({start + step * i for i in range(1, workers)})
+    start, end = first[key].generation_time, last[key].generation_time
+    step = (end - start) / workers
+    return sorted({ObjectId.from_datetime(start + step * i) for i in range(1, workers)})
+
+
+def _reprice_partition(
+    db: Database,
+    table: FactorTable,
+    index: int,
+    lower: ObjectId | datetime | None,
+    upper: ObjectId | datetime | None,
+    batch_size: int,
+) -> int:
+    """Re-price events with ``lower <= key < upper``; return how many changed."""
+    layout = get_query_layout()
+    collection = db[layout.collection]
+    key = _partition_key(layout)
+    last = load_checkpoint(db, JOB_NAME).get("partitions", {}).get(str(index))
+
+    changed = 0
+    while True:
+        key_range: dict[str, Any] = {}
+        if last is not None:
+            key_range["$gt"] = last
+        elif lower is not None:
+            key_range["$gte"] = lower
+        if upper is not None:
+            key_range["$lt"] = upper
+        query = {key: key_range} if key_range else {}
+
+        batch = list(collection.find(query, {key: 1}).sort(key, 1).limit(batch_size))
+        if not batch:
+            break
+        # Timestamps can tie: the batch runs through every event at its last one
+        batch_end = batch[-1][key]
+
+        batch_filter = {
+            key: {**key_range, "$lte": batch_end},
+            "factor_version": {"$ne": table.version},
+        }
+        for platform, grams in table.factors.items():
+            result = collection.update_many(
+                {**batch_filter, layout.platform_field: platform},
+                {"$set": {"carbon_grams": grams, "factor_version": table.version}},
+            )
+            changed += result.modified_count
+
+        last = batch_end
+        save_checkpoint(db, JOB_NAME, **{f"partitions.{index}": last})
+
+    logger.info("Partition {} done ({} events re-priced)", index, changed)
+    return changed
+
+
+def _reprice_summaries(db: Database, table: FactorTable) -> int:
+    """Rebuild compacted summaries from their counts; return how many changed."""
+    changed = 0
+    for platform, grams in table.factors.items():
+        result = db.query_summaries.update_many(
+            {"platform": platform, "factor_version": {"$ne": table.version}},
+            [{"$set": {"carbon_grams": {"$multiply": ["$count", grams]}, "factor_version": table.version}}],
+        )
+        changed += result.modified_count
+    return changed
+
+
+def reprice(db: Database, table: FactorTable, *, workers: int, batch_size: int) -> dict[str, int]:
+    """Re-price all events, summaries, buckets and leaderboards to *table*; return counts."""
+    layout = get_query_layout()
+    key = _partition_key(layout)
+    checkpoint = load_checkpoint(db, JOB_NAME)
+    if checkpoint.get("version") != table.version or checkpoint.get("key", "_id") != key or "bounds" not in checkpoint:
+        # New target version: fresh partitions, kept for the resumed runs.
+        clear_checkpoint(db, JOB_NAME)
+        bounds = _partition_bounds(db, layout, workers)
+        save_checkpoint(db, JOB_NAME, version=table.version, key=key, bounds=bounds, started_at=datetime.utcnow())
+    else:
+        bounds = checkpoint["bounds"]
+        logger.info("Resuming re-pricing to version {} ({} partitions)", table.version, len(bounds) + 1)
+
+    edges: list[ObjectId | datetime | None] = [None, *bounds, None]
+    partitions = list(zip(edges[:-1], edges[1:]))
+    with ThreadPoolExecutor(max_workers=len(partitions), thread_name_prefix="reprice") as pool:
+        futures = [
+            pool.submit(_reprice_partition, db, table, i, lower, upper, batch_size)
+            for i, (lower, upper) in enumerate(partitions)
+        ]
+        events = sum(f.result() for f in futures)
+
+    summaries = _reprice_summaries(db, table)
+    buckets = reprice_buckets(db, table.factors)
+    members = reprice_member_totals(db, table.factors)
+    # Analytics were computed from the old prices; the next run rebuilds them.
+    reset_analytics(db)
+    return {"events": events, "summaries": summaries, "buckets": buckets, "members": members}
+
+
+def _parse_overrides(values: list[str]) -> dict[str, float]:
+    overrides: dict[str, float] = {}
+    for value in values:
+        platform, _, grams = value.partition("=")
+        if not platform or not grams:
+            raise SystemExit(f"--set expects platform=grams, got {value!r}")
+        overrides[platform] = float(grams)
+    return overrides
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Re-price stored query events with a carbon factor version.")
+    parser.add_argument(
+        "--set",
+        action="append",
+        default=[],
+        metavar="PLATFORM=GRAMS",
+        help="publish a new factor version with these overrides first",
+    )
+    parser.add_argument("--version", type=int, help="factor version to apply (default: latest)")
+    parser.add_argument("--workers", type=int, default=4, help="partitions re-priced in parallel")
+    parser.add_argument("--batch-size", type=int, default=5000, help="events per batch")
+    parser.add_argument("--restart", action="store_true", help="ignore the saved checkpoint")
+    args = parser.parse_args(argv)
+
+    setup_logging(debug=get_settings().debug)
+    db = get_database()
+    try:
+        with leader_lock(db, JOB_NAME, ttl_seconds=3600) as acquired:
+            if not acquired:
+                logger.warning("Another re-pricing run is in progress")
+                return 1
+            if args.restart:
+                clear_checkpoint(db, JOB_NAME)
+
+            if args.set:
+                latest = latest_factor_table(db)
+                table = publish_factor_table(
+                    db,
+                    {**latest.factors, **_parse_overrides(args.set)},
+                    note=f"reprice: {', '.join(args.set)}",
+                )
+            elif args.version is not None:
+                table = load_factor_table(db, args.version)
+                if table is None:
+                    logger.error("Carbon factor version {} does not exist", args.version)
+                    return 1
+            else:
+                table = latest_factor_table(db)
+
+            logger.info("Re-pricing to carbon factor version {}: {}", table.version, table.factors)
+            totals = reprice(db, table, workers=args.workers, batch_size=args.batch_size)
+        logger.info("Re-pricing finished: {}", totals)
+        return 0
+    finally:
+        close_mongodb_client()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,182 @@
+"""
+Tiered retention — compact old raw events into per-day or per-month summaries.
+
+    python -m app.jobs.retention [--dry-run]
+
+For every user, raw events older than ``retention_raw_days`` (aligned to the
+start of a day, or of a month with ``retention_summary_period=month``) are
+grouped per platform and period into ``query_summaries`` documents, then
+deleted. Each user's ``compacted_until`` records how far compaction got:
+
+1. summaries for ``[compacted_until, cutoff)`` are written with ``$set`` —
+   re-running after a crash rewrites the same values;
+2. ``compacted_until`` is advanced to the cutoff;
+3. raw events before ``compacted_until`` are deleted — re-running finishes
+   an interrupted delete. They go in throttled batches, like deletion jobs
+   (``deletion_batch_size``, ``deletion_max_docs_per_second``), so a first
+   run over years of history does not flood the replicas.
+
+Dashboard reads only count raw events from ``compacted_until`` onwards and
+add the summaries, so totals stay correct at every step. Deleting from a
+time-series collection by ``timestamp`` requires MongoDB 7.0+.
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from loguru import logger
+from pymongo.database import Database
+
+from app.config import get_settings
+from app.database import close_mongodb_client, get_database, get_query_layout
+from app.deletions import delete_in_batches
+from app.locks import leader_lock
+from app.logging_config import setup_logging
+from app.models.query import QueryLayout
+from app.repositories import MongoRepository, SummaryRow
+
+JOB_NAME = "retention"
+USER_BATCH_SIZE = 500
+
+
+def retention_cutoff(now: datetime, raw_days: int, period: str) -> datetime:
+    """Return the instant before which raw events are compacted."""
+    cutoff = (now - timedelta(days=raw_days)).replace(hour=0, minute=0, second=0, microsecond=0)
+    if period == "month":
+        cutoff = cutoff.replace(day=1)
+    return cutoff
+
+
+def _summary_rows(
+    db: Database,
+    layout: QueryLayout,
+    user_id: ObjectId,
+    since: datetime | None,
+    until: datetime,
+    period: str,
+) -> list[SummaryRow]:
+    """Group a user's raw events in ``[since, until)`` into summary rows."""
+    pipeline = [
+        {"$match": layout.user_filter(user_id, since, until)},
+        {
+            "$group": {
+                "_id": {
+                    "platform": f"${layout.platform_field}",
+                    "start": {"$dateTrunc": {"date": "$timestamp", "unit": period}},
+                },
+                "count": {"$sum": 1},
+                "carbon_grams": {"$sum": "$carbon_grams"},
+            }
+        },
+    ]
+    return [
+        SummaryRow(
+            start=group["_id"]["start"],
+            platform=group["_id"]["platform"] or "unknown",
+            period=period,
+            count=group["count"],
+            carbon_grams=group["carbon_grams"],
+        )
+        for group in db[layout.collection].aggregate(pipeline)
+    ]
+
+
+def compact_user(
+    db: Database,
+    layout: QueryLayout,
+    user: dict,
+    cutoff: datetime,
+    period: str,
+    *,
+    dry_run: bool = False,
+) -> tuple[int, int]:
+    """Compact one user; return (summaries written, raw events deleted)."""
+    user_id = user["_id"]
+    compacted_until = user.get("compacted_until")
+    written = 0
+
+    if compacted_until is None or compacted_until < cutoff:
+        rows = _summary_rows(db, layout, user_id, compacted_until, cutoff, period)
+        written = len(rows)
+        if dry_run:
+            return written, 0
+        MongoRepository(db, layout).upsert_summaries(str(user_id), rows)
+        db.users.update_one({"_id": user_id}, {"$set": {"compacted_until": cutoff}})
+        compacted_until = cutoff
+
+    if dry_run:
+        return written, 0
+    settings = get_settings()
+    deleted = delete_in_batches(
+        db,
+        layout,
+        layout.user_filter(user_id, until=compacted_until),
+        batch_size=settings.deletion_batch_size,
+        max_per_second=settings.deletion_max_docs_per_second,
+    )
+    return written, deleted
+
+
+def run_retention(db: Database, *, now: datetime | None = None, dry_run: bool = False) -> dict[str, int]:
+    """Compact every user's expired raw events; return totals."""
+    settings = get_settings()
+    if settings.retention_raw_days is None:
+        logger.info("RETENTION_RAW_DAYS is not set; nothing to compact")
+        return {"users": 0, "summaries": 0, "deleted": 0}
+
+    layout = get_query_layout()
+    period = settings.retention_summary_period
+    cutoff = retention_cutoff(now or datetime.utcnow(), settings.retention_raw_days, period)
+    logger.info("Compacting raw events before {} into {} summaries", cutoff.isoformat(), period)
+
+    totals = {"users": 0, "summaries": 0, "deleted": 0}
+    last_id = None
+    while True:
+        query = {"_id": {"$gt": last_id}} if last_id is not None else {}
+        users = list(
+            db.users.find(query, {"_id": 1, "compacted_until": 1})
+            .sort("_id", 1)
+            .limit(USER_BATCH_SIZE)
+        )
+        if not users:
+            break
+        for user in users:
+            written, deleted = compact_user(db, layout, user, cutoff, period, dry_run=dry_run)
+            totals["users"] += 1
+            totals["summaries"] += written
+            totals["deleted"] += deleted
+        last_id = users[-1]["_id"]
+        logger.info("Retention progress: {}", totals)
+
+    return totals
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Compact old raw query events into summaries.")
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="report how many summaries would be written; change nothing",
+    )
+    args = parser.parse_args(argv)
+
+    setup_logging(debug=get_settings().debug)
+    db = get_database()
+    try:
+        with leader_lock(db, JOB_NAME, ttl_seconds=3600) as acquired:
+            if not acquired:
+                logger.warning("Another retention run is in progress")
+                return 1
+            totals = run_retention(db, dry_run=args.dry_run)
+        logger.info("Retention finished: {}", totals)
+        return 0
+    finally:
+        close_mongodb_client()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
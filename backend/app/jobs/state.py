@@ -0,0 +1,37 @@
+"""
+Job checkpoints — persisted progress for resumable jobs.
+
+Each job keeps one document in the ``job_state`` collection, keyed by the
+job name. Jobs save a checkpoint after every batch they finish and resume
+from it after a crash or restart.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any
+
+from pymongo.client_session import ClientSession
+from pymongo.database import Database
+
+
+def load_checkpoint(db: Database, job: str) -> dict[str, Any]:
+    """Return the saved checkpoint for *job* (empty if it never ran)."""
+    doc = db.job_state.find_one({"_id": job}) or {}
+    doc.pop("_id", None)
+    return doc
+
+
+def save_checkpoint(db: Database, job: str, *, session: ClientSession | None = None, **fields: Any) -> None:
+    """Merge *fields* into the checkpoint for *job* (within *session*'s transaction, if given)."""
+    db.job_state.update_one(
+        {"_id": job},
+        {"$set": {**fields, "updated_at": datetime.utcnow()}},
+        upsert=True,
+        session=session,
+    )
+
+
+def clear_checkpoint(db: Database, job: str) -> None:
+    """Forget the checkpoint for *job*, so the next run starts over."""
+    db.job_state.delete_one({"_id": job})
@@ -0,0 +1,63 @@
+"""
+Leader locks — best-effort mutual exclusion across workers via MongoDB.
+
+A lock is a document in the ``locks`` collection keyed by name. It is taken
+by an upsert that only matches an *expired* lock; if the lock is held, the
+upsert collides on ``_id`` and fails with ``DuplicateKeyError``. Locks carry
+an expiry so a crashed holder cannot block others forever.
+"""
+
+from __future__ import annotations
+
+import os
+import socket
+import uuid
+from collections.abc import Iterator
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from loguru import logger
+from pymongo.database import Database
+from pymongo.errors import DuplicateKeyError
+
+
+def owner_id() -> str:
+    """A lock owner name unique to this process (and call)."""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def acquire_lock(db: Database, name: str, owner: str, ttl_seconds: int) -> bool:
+    """Try to take lock *name* for *owner*; return True on success."""
+    now = datetime.utcnow()
+    try:
+        db.locks.update_one(
+            {"_id": name, "$or": [{"expires_at": {"$lt": now}}, {"owner": owner}]},
+            {"$set": {"owner": owner, "expires_at": now + timedelta(seconds=ttl_seconds)}},
+            upsert=True,
+        )
+    except DuplicateKeyError:
+        return False
+    return True
+
+
+def release_lock(db: Database, name: str, owner: str) -> None:
+    """Release lock *name* if it is still held by *owner*."""
+    db.locks.delete_one({"_id": name, "owner": owner})
+
+
+@contextmanager
+def leader_lock(db: Database, name: str, ttl_seconds: int = 600) -> Iterator[bool]:
+    """
+    Context manager yielding whether this process holds lock *name*.
+
+    The lock is released on exit only if it was acquired.
+    """
+    owner = owner_id()
+    acquired = acquire_lock(db, name, owner, ttl_seconds)
+    if not acquired:
+        logger.info("Lock {!r} is held by another process", name)
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            release_lock(db, name, owner)
@@ -1,27 +1,102 @@
 """
 CarbonQ — FastAPI Application entry point.
 
-Configures CORS, logging, Firebase singletons, and mounts routers.
+Configures CORS, response compression, logging, Firebase singletons, and mounts routers.
 """
 
 from __future__ import annotations
 
+import asyncio
+import os
 import time
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from loguru import logger
 
+from app import metrics
+from app.compression import CompressionMiddleware
 from app.config import get_settings
-from app.database import get_database, get_queries_collection, get_users_collection
+from app.database import close_mongodb_client, connect_mongodb, get_database
+from app.executors import shutdown_pools
+from app.factors import get_factor_table
+from app.indexes import ensure_indexes
 from app.logging_config import setup_logging
-from app.routers import auth, dashboard
-from app.schemas.common import HealthResponse
+from app.repositories import get_repository
+from app.responses import FastJSONResponse
+from app.routers import admin, auth, dashboard, factors, orgs
+from app.schemas.common import HealthResponse, ReadinessResponse
 
 # ── Bootstrap logging first ─────────────────────────────────────────────
 settings = get_settings()
 setup_logging(debug=settings.debug)
 
+# ── Lifespan — background warm-up: MongoDB pool, indexes, caches ──────
+
+
+def _initialise_database() -> None:
+    """Connect, warm the pool and build any missing indexes (blocking)."""
+    try:
+        connect_mongodb()
+        logger.info("MongoDB connection established")
+        if settings.index_build_on_startup:
+            ensure_indexes(get_database(), lock_ttl_seconds=settings.index_lock_ttl_seconds)
+        logger.info("MongoDB initialized successfully")
+    except Exception as exc:
+        logger.error("MongoDB initialization failed: {}", exc)
+        logger.warning(
+            "Make sure MongoDB URI is correctly set in environment: MONGODB_URI"
+        )
+
+
+def _warm_up() -> None:
+    """Prepare what the first requests would otherwise wait for (blocking)."""
+    started = time.perf_counter()
+    if settings.storage_backend == "mongo":
+        _initialise_database()
+    try:
+        get_factor_table()
+    except Exception as exc:
+        logger.warning("Could not prime the carbon factor cache: {}", exc)
+    import bcrypt  # noqa: F401 — imported lazily by app.utils.password
+
+    logger.info("Warm-up finished in {:.0f} ms", (time.perf_counter() - started) * 1000)
+
+
+async def _publish_metrics(directory: str) -> None:
+    """Keep this worker's metrics snapshot in *directory* fresh for /metrics."""
+    while True:
+        try:
+            await asyncio.to_thread(metrics.publish, directory)
+        except OSError as exc:
+            logger.warning("Could not publish worker metrics: {}", exc)
+        await asyncio.sleep(settings.metrics_flush_seconds)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    logger.info("Starting {} …", settings.app_name)
+    # Warm-up runs in the background so the worker starts accepting requests
+    # (and answering liveness probes) immediately; /health/ready reports
+    # when MongoDB is reachable.
+    init_task = asyncio.create_task(asyncio.to_thread(_warm_up))
+    metrics_task = None
+    if settings.metrics_dir:
+        metrics_task = asyncio.create_task(_publish_metrics(settings.metrics_dir))
+
+    yield
+
+    logger.info("Shutting down {} …", settings.app_name)
+    if not init_task.done():
+        init_task.cancel()
+    if metrics_task is not None:
+        metrics_task.cancel()
+        metrics.unpublish(settings.metrics_dir)
+    shutdown_pools()
+    close_mongodb_client()
+
+
 # ── Create app ──────────────────────────────────────────────────────────
 app = FastAPI(
     title=settings.app_name,
@@ -29,6 +104,8 @@ app = FastAPI(
     docs_url=f"{settings.api_prefix}/docs",
     redoc_url=f"{settings.api_prefix}/redoc",
     openapi_url=f"{settings.api_prefix}/openapi.json",
+    default_response_class=FastJSONResponse,
+    lifespan=lifespan,
 )
 
 # ── CORS ────────────────────────────────────────────────────────────────
@@ -40,6 +117,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# ── Compression ─────────────────────────────────────────────────────────
+if settings.compression_enabled:
+    app.add_middleware(CompressionMiddleware, minimum_size=settings.compression_min_size)
+
 
 # ── Request logging middleware ──────────────────────────────────────────
 
@@ -59,45 +140,53 @@ async def log_requests(request: Request, call_next):
     return response
 
 
-# ── Startup — eagerly initialise MongoDB and create indexes ─────────────
-
+# ── Routers ─────────────────────────────────────────────────────────────
+app.include_router(auth.router, prefix=settings.api_prefix)
+app.include_router(dashboard.router, prefix=settings.api_prefix)
+app.include_router(factors.router, prefix=settings.api_prefix)
+app.include_router(admin.router, prefix=settings.api_prefix)
+app.include_router(orgs.router, prefix=settings.api_prefix)
 
-@app.on_event("startup")
-async def on_startup():
-    logger.info("Starting {} …", settings.app_name)
-    try:
-        # Connect to MongoDB
-        db = get_database()
-        logger.info("MongoDB connection established")
 
-        # Create indexes
-        users_collection = get_users_collection()
-        queries_collection = get_queries_collection()
+# ── Health check ────────────────────────────────────────────────────────
 
-        # Email index (unique) for users
-        users_collection.create_index("email", unique=True)
-        logger.info("Created unique index on users.email")
 
-        # Compound index for queries: user_id + timestamp (for efficient queries)
-        queries_collection.create_index([("user_id", 1), ("timestamp", -1)])
-        logger.info("Created compound index on queries (user_id, timestamp)")
+@app.get(f"{settings.api_prefix}/health", response_model=HealthResponse)
+@app.get(f"{settings.api_prefix}/health/live", response_model=HealthResponse)
+async def health():
+    """Liveness — the process is up and serving; no dependencies are checked."""
+    return FastJSONResponse(HealthResponse(status="ok", service=settings.app_name))
 
-        logger.info("MongoDB initialized successfully")
-    except Exception as exc:
-        logger.error("MongoDB initialization failed: {}", exc)
-        logger.warning(
-            "Make sure MongoDB URI is correctly set in environment: MONGODB_URI"
-        )
 
+@app.get(
+    f"{settings.api_prefix}/health/ready",
+    response_model=ReadinessResponse,
+    responses={503: {"model": ReadinessResponse}},
+)
+async def ready():
+    """Readiness — the storage backend (MongoDB) answers a ping; 503 until it does."""
+    mongodb = await asyncio.to_thread(get_repository().ping)
+    body = ReadinessResponse(
+        status="ready" if mongodb else "starting",
+        service=settings.app_name,
+        mongodb=mongodb,
+    )
+    return FastJSONResponse(body, status_code=200 if mongodb else 503)
 
-# ── Routers ─────────────────────────────────────────────────────────────
-app.include_router(auth.router, prefix=settings.api_prefix)
-app.include_router(dashboard.router, prefix=settings.api_prefix)
 
+# ── Metrics ─────────────────────────────────────────────────────────────
 
-# ── Health check ────────────────────────────────────────────────────────
 
+@app.get(f"{settings.api_prefix}/metrics")
+async def get_metrics(worker: bool = False):
+    """
+    Return metrics (connection pool checkout waits, …).
 
-@app.get(f"{settings.api_prefix}/health", response_model=HealthResponse)
-async def health():
-    return HealthResponse(status="ok", service=settings.app_name)
+    Summed over all worker processes when running several (see
+    ``Settings.metrics_dir``); ``?worker=true`` shows only the answering one.
+    """
+    if worker:
+        return FastJSONResponse({**metrics.snapshot(), "pid": os.getpid()})
+    if not settings.metrics_dir:
+        return FastJSONResponse(metrics.snapshot())
+    return FastJSONResponse(await asyncio.to_thread(metrics.collect, settings.metrics_dir))
@@ -0,0 +1,204 @@
+"""
+In-process metrics registry — counters, gauges and timing summaries.
+
+Metrics are plain Python objects guarded by a lock, so they can be updated
+from worker threads (e.g. pymongo monitoring callbacks) as well as from the
+event loop. ``snapshot()`` returns a JSON-serialisable view that the
+``/metrics`` endpoint exposes.
+
+Metrics are per process. With several workers, each one periodically
+``publish()``-es its snapshot to a shared directory and ``collect()`` sums
+them up: counters and gauges add, summaries combine count, sum and max.
+A forked worker starts from zero rather than inheriting its parent's values.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any
+
+_lock = threading.Lock()
+
+
+class Counter:
+    """Monotonically increasing count."""
+
+    def __init__(self) -> None:
+        self.value = 0
+
+    def inc(self, amount: int = 1) -> None:
+        with _lock:
+            self.value += amount
+
+    def snapshot(self) -> int:
+        return self.value
+
+    def reset(self) -> None:
+        self.value = 0
+
+
+class Gauge:
+    """Value that can go up and down."""
+
+    def __init__(self) -> None:
+        self.value = 0.0
+
+    def inc(self, amount: float = 1) -> None:
+        with _lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1) -> None:
+        with _lock:
+            self.value -= amount
+
+    def set(self, value: float) -> None:
+        with _lock:
+            self.value = value
+
+    def snapshot(self) -> float:
+        return self.value
+
+    def reset(self) -> None:
+        self.value = 0.0
+
+
+class Summary:
+    """Count, sum and max of observed values (e.g. latencies in ms)."""
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        with _lock:
+            self.count += 1
+            self.total += value
+            if value > self.max:
+                self.max = value
+
+    def snapshot(self) -> dict[str, float]:
+        with _lock:
+            count, total, peak = self.count, self.total, self.max
+        return {
+            "count": count,
+            "sum": round(total, 3),
+            "avg": round(total / count, 3) if count else 0.0,
+            "max": round(peak, 3),
+        }
+
+    def reset(self) -> None:
+        self.count, self.total, self.max = 0, 0.0, 0.0
+
+
+_metrics: dict[str, Counter | Gauge | Summary] = {}
+
+
+def _get_or_create(name: str, kind: type) -> Any:
+    with _lock:
+        metric = _metrics.get(name)
+        if metric is None:
+            metric = _metrics[name] = kind()
+    if not isinstance(metric, kind):
+        raise TypeError(f"Metric {name!r} is already registered as {type(metric).__name__}")
+    return metric
+
+
+def counter(name: str) -> Counter:
+    """Return the counter registered under *name*, creating it on first use."""
+    return _get_or_create(name, Counter)
+
+
+def gauge(name: str) -> Gauge:
+    """Return the gauge registered under *name*, creating it on first use."""
+    return _get_or_create(name, Gauge)
+
+
+def summary(name: str) -> Summary:
+    """Return the summary registered under *name*, creating it on first use."""
+    return _get_or_create(name, Summary)
+
+
+def snapshot() -> dict[str, Any]:
+    """Return the current value of every registered metric, sorted by name."""
+    with _lock:
+        items = sorted(_metrics.items())
+    return {name: metric.snapshot() for name, metric in items}
+
+
+def _reset_after_fork() -> None:
+    global _lock
+    _lock = threading.Lock()  # may have been held by another thread at fork
+    for metric in _metrics.values():
+        metric.reset()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+# ── Cross-worker aggregation ────────────────────────────────────────────
+
+
+def publish(directory: str | Path) -> None:
+    """Write this process's snapshot to ``<directory>/<pid>.json`` (atomically)."""
+    path = Path(directory) / f"{os.getpid()}.json"
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(snapshot()))
+    tmp.replace(path)
+
+
+def unpublish(directory: str | Path) -> None:
+    """Remove this process's snapshot (clean worker shutdown)."""
+    (Path(directory) / f"{os.getpid()}.json").unlink(missing_ok=True)
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _merge(total: dict[str, Any], worker: dict[str, Any]) -> None:
+    for name, value in worker.items():
+        current = total.get(name)
+        if isinstance(value, dict):
+            current = current or {"count": 0, "sum": 0.0, "avg": 0.0, "max": 0.0}
+            count, sum_ = current["count"] + value["count"], current["sum"] + value["sum"]
+            total[name] = {
+                "count": count,
+                "sum": round(sum_, 3),
+                "avg": round(sum_ / count, 3) if count else 0.0,
+                "max": max(current["max"], value["max"]),
+            }
+        else:
+            total[name] = (current or 0) + value
+
+
+def collect(directory: str | Path) -> dict[str, Any]:
+    """
+    Sum the snapshots of every live worker in *directory*.
+
+    This process contributes its current values; other workers' are as of
+    their last ``publish()``. Snapshots left by workers that died are skipped.
+    """
+    total: dict[str, Any] = {}
+    workers = 1
+    _merge(total, snapshot())
+    for path in Path(directory).glob("*.json"):
+        pid = int(path.stem)
+        if pid == os.getpid() or not _alive(pid):
+            continue
+        try:
+            _merge(total, json.loads(path.read_text()))
+        except (OSError, ValueError):
+            continue  # being replaced or removed right now
+        workers += 1
+    total["workers"] = workers
+    return dict(sorted(total.items()))
@@ -2,7 +2,30 @@
 Database models for MongoDB documents.
 """
 
-from app.models.query import Query, QueryCreate
+from app.models.factors import FactorTable
+from app.models.query import (
+    QUERY_LAYOUTS,
+    QUERY_RECORD_PROJECTION,
+    STANDARD_LAYOUT,
+    TIMESERIES_LAYOUT,
+    Query,
+    QueryCreate,
+    QueryLayout,
+    QueryRecord,
+)
 from app.models.user import User, UserCreate, UserInDB
 
-__all__ = ["User", "UserCreate", "UserInDB", "Query", "QueryCreate"]
+__all__ = [
+    "QUERY_LAYOUTS",
+    "QUERY_RECORD_PROJECTION",
+    "STANDARD_LAYOUT",
+    "TIMESERIES_LAYOUT",
+    "FactorTable",
+    "User",
+    "UserCreate",
+    "UserInDB",
+    "Query",
+    "QueryCreate",
+    "QueryLayout",
+    "QueryRecord",
+]
@@ -0,0 +1,43 @@
+"""
+Carbon factor model — versioned per-platform carbon estimates.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any
+
+
+@dataclass(frozen=True)
+class FactorTable:
+    """
+    One immutable version of the grams-of-CO₂-per-query estimates.
+
+    Stored in the ``carbon_factors`` collection with the version as ``_id``;
+    the highest version is the one used to price new queries.
+    """
+
+    version: int
+    factors: dict[str, float] = field(default_factory=dict)
+    created_at: datetime | None = None
+    note: str = ""
+
+    @classmethod
+    def from_db(cls, doc: dict[str, Any]) -> FactorTable:
+        """Convert a ``carbon_factors`` document to a FactorTable."""
+        return cls(
+            version=doc["_id"],
+            factors={platform: float(grams) for platform, grams in doc["factors"].items()},
+            created_at=doc.get("created_at"),
+            note=doc.get("note", ""),
+        )
+
+    def to_db(self) -> dict[str, Any]:
+        """Build the ``carbon_factors`` document for this version."""
+        return {
+            "_id": self.version,
+            "factors": self.factors,
+            "created_at": self.created_at,
+            "note": self.note,
+        }
@@ -4,7 +4,9 @@ Query model — MongoDB document schemas for queries collection.
 
 from __future__ import annotations
 
+from dataclasses import dataclass
 from datetime import datetime
+from typing import Any, NamedTuple
 
 from bson import ObjectId
 from pydantic import BaseModel, Field
@@ -69,3 +71,130 @@ class Query(BaseModel):
             carbon_grams=db_query["carbon_grams"],
             timestamp=db_query["timestamp"],
         )
+
+
+# Only the fields the dashboard aggregates need; ``_id`` is left out so reads
+# can be answered from the (user_id, timestamp, …) index.
+QUERY_RECORD_PROJECTION: dict[str, int] = {
+    "_id": 0,
+    "platform": 1,
+    "carbon_grams": 1,
+    "timestamp": 1,
+}
+
+
+class QueryRecord(NamedTuple):
+    """
+    Compact read-path view of a query document.
+
+    Used by the dashboard helpers instead of per-row dicts or Pydantic
+    models; only the final response is converted to a schema.
+    """
+
+    platform: str
+    carbon_grams: float
+    timestamp: datetime | None
+
+    @classmethod
+    def from_db(cls, db_query: dict[str, Any]) -> QueryRecord:
+        """Convert a projected MongoDB document to a QueryRecord."""
+        return cls(
+            db_query.get("platform", "unknown"),
+            db_query.get("carbon_grams", 0.0),
+            db_query.get("timestamp"),
+        )
+
+
+@dataclass(frozen=True)
+class QueryLayout:
+    """
+    Where query events live and how their fields are named.
+
+    ``standard`` stores one flat document per event in ``queries``.
+    ``timeseries`` stores events in the ``queries_ts`` time-series collection
+    with ``timestamp`` as the timeField and ``{user_id, platform}`` grouped
+    under the ``meta`` metaField, so MongoDB buckets and compresses each
+    user's events per platform.
+    """
+
+    name: str
+    collection: str
+    meta_field: str | None = None
+
+    def _field(self, name: str) -> str:
+        return f"{self.meta_field}.{name}" if self.meta_field else name
+
+    @property
+    def user_field(self) -> str:
+        return self._field("user_id")
+
+    @property
+    def platform_field(self) -> str:
+        return self._field("platform")
+
+    @property
+    def record_projection(self) -> dict[str, int]:
+        """Projection decoding into a QueryRecord (no ``_id``)."""
+        if not self.meta_field:
+            return QUERY_RECORD_PROJECTION
+        return {"_id": 0, self.platform_field: 1, "carbon_grams": 1, "timestamp": 1}
+
+    def user_filter(
+        self,
+        user_id: ObjectId,
+        since: datetime | None = None,
+        until: datetime | None = None,
+    ) -> dict[str, Any]:
+        """Filter selecting a user's events in ``[since, until)`` (both optional)."""
+        query: dict[str, Any] = {self.user_field: user_id}
+        window: dict[str, datetime] = {}
+        if since is not None:
+            window["$gte"] = since
+        if until is not None:
+            window["$lt"] = until
+        if window:
+            query["timestamp"] = window
+        return query
+
+    def document(
+        self,
+        user_id: ObjectId,
+        platform: str,
+        carbon_grams: float,
+        timestamp: datetime,
+        **extra: Any,
+    ) -> dict[str, Any]:
+        """Build the document to insert for one query event."""
+        if self.meta_field:
+            return {
+                self.meta_field: {"user_id": user_id, "platform": platform},
+                "carbon_grams": carbon_grams,
+                "timestamp": timestamp,
+                **extra,
+            }
+        return {
+            "user_id": user_id,
+            "platform": platform,
+            "carbon_grams": carbon_grams,
+            "timestamp": timestamp,
+            **extra,
+        }
+
+    def record(self, db_query: dict[str, Any]) -> QueryRecord:
+        """Decode a document fetched with ``record_projection``."""
+        if self.meta_field:
+            meta = db_query.get(self.meta_field, {})
+            return QueryRecord(
+                meta.get("platform", "unknown"),
+                db_query.get("carbon_grams", 0.0),
+                db_query.get("timestamp"),
+            )
+        return QueryRecord.from_db(db_query)
+
+
+STANDARD_LAYOUT = QueryLayout(name="standard", collection="queries")
+TIMESERIES_LAYOUT = QueryLayout(name="timeseries", collection="queries_ts", meta_field="meta")
+
+QUERY_LAYOUTS: dict[str, QueryLayout] = {
+    layout.name: layout for layout in (STANDARD_LAYOUT, TIMESERIES_LAYOUT)
+}
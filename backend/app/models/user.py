@@ -5,6 +5,7 @@ User model — MongoDB document schemas for users collection.
 from __future__ import annotations
 
 from datetime import datetime
+from zoneinfo import ZoneInfo
 
 from bson import ObjectId
 from pydantic import BaseModel, EmailStr, Field
@@ -60,6 +61,17 @@ class User(UserBase):
     id: str
     created_at: datetime
     updated_at: datetime
+    # Raw events before this instant have been compacted into summaries
+    compacted_until: datetime | None = None
+    # IANA timezone name; day views are bucketed by local midnight
+    timezone: str = "UTC"
+    # Organization membership (see app.orgs)
+    org_id: str | None = None
+    org_role: str | None = None
+
+    @property
+    def zone(self) -> ZoneInfo:
+        return ZoneInfo(self.timezone)
 
     @classmethod
     def from_db(cls, db_user: dict) -> User:
@@ -69,4 +81,8 @@ class User(UserBase):
             email=db_user["email"],
             created_at=db_user["created_at"],
             updated_at=db_user["updated_at"],
+            compacted_until=db_user.get("compacted_until"),
+            timezone=db_user.get("timezone", "UTC"),
+            org_id=str(db_user["org_id"]) if db_user.get("org_id") else None,
+            org_role=db_user.get("org_role"),
         )
@@ -0,0 +1,132 @@
+"""
+Organizations — membership and pre-aggregated org rollups.
+
+A user belongs to at most one organization (``org_id`` / ``org_role`` on the
+user document). While they are a member, every query they submit is also
+counted in:
+
+- the organization's hour/day buckets in ``org_buckets`` (same layout and
+  prefix sums as the user buckets, see ``app.buckets``), which give org
+  totals, platform mix and per-day series in O(days × platforms) documents;
+- their row in ``org_member_totals`` — per-platform and overall queries and
+  CO₂ — which an index on ``(org_id, total_carbon)`` turns into a
+  leaderboard read of ``limit`` documents, whatever the headcount.
+
+Rollups start when a member joins; history from before is not copied. A
+member who leaves keeps contributing to the totals they already made, but
+drops off the leaderboard.
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.database import Database
+
+from app.models.query import QueryLayout
+
+ORGS_COLLECTION = "organizations"
+MEMBER_TOTALS_COLLECTION = "org_member_totals"
+
+ORG_ROLES = ("admin", "member")
+
+
+def member_increment(
+    org_id: ObjectId, user_id: ObjectId, platform: str, carbon_grams: float
+) -> tuple[dict[str, Any], dict[str, float]]:
+    """``(filter, $inc)`` of the leaderboard row for one new event of a member."""
+    return (
+        {"org_id": org_id, "user_id": user_id},
+        {
+            f"count.{platform}": 1,
+            f"carbon.{platform}": carbon_grams,
+            "total_count": 1,
+            "total_carbon": carbon_grams,
+        },
+    )
+
+
+def member_op(org_id: ObjectId, user_id: ObjectId, platform: str, carbon_grams: float) -> UpdateOne:
+    """Leaderboard increment for one new event of a member."""
+    filter_, inc = member_increment(org_id, user_id, platform, carbon_grams)
+    return UpdateOne(filter_, {"$inc": inc}, upsert=True)
+
+
+def rebuild_member(db: Database, layout: QueryLayout, org_id: ObjectId, user_id: ObjectId) -> bool:
+    """
+    Recompute a member's leaderboard row from their raw events (after a purge).
+
+    Returns False, leaving no row, if they have none.
+    """
+    counts: dict[str, int] = {}
+    carbon: dict[str, float] = {}
+    groups = db[layout.collection].aggregate(
+        [
+            {"$match": layout.user_filter(user_id)},
+            {
+                "$group": {
+                    "_id": f"${layout.platform_field}",
+                    "count": {"$sum": 1},
+                    "carbon_grams": {"$sum": "$carbon_grams"},
+                }
+            },
+        ]
+    )
+    for group in groups:
+        platform = group["_id"] or "unknown"
+        counts[platform], carbon[platform] = group["count"], group["carbon_grams"]
+    key = {"org_id": org_id, "user_id": user_id}
+    if not counts:
+        db[MEMBER_TOTALS_COLLECTION].delete_one(key)
+        return False
+    db[MEMBER_TOTALS_COLLECTION].replace_one(
+        key,
+        {
+            **key,
+            "count": counts,
+            "carbon": carbon,
+            "total_count": sum(counts.values()),
+            "total_carbon": sum(carbon.values()),
+        },
+        upsert=True,
+    )
+    return True
+
+
+def leaderboard(db: Database, org_id: ObjectId, limit: int, *, ascending: bool = False) -> list[dict[str, Any]]:
+    """
+    The org's member rows by total CO₂, with each member's email.
+
+    Rows of users who have since left (an ingest racing their departure can
+    re-create one) are skipped.
+    """
+    rows = list(
+        db[MEMBER_TOTALS_COLLECTION]
+        .find({"org_id": org_id}, {"_id": 0, "user_id": 1, "total_count": 1, "total_carbon": 1})
+        .sort("total_carbon", 1 if ascending else -1)
+        .limit(limit)
+    )
+    members = {
+        doc["_id"]: doc["email"]
+        for doc in db.users.find({"_id": {"$in": [row["user_id"] for row in rows]}, "org_id": org_id}, {"email": 1})
+    }
+    return [{**row, "email": members[row["user_id"]]} for row in rows if row["user_id"] in members]
+
+
+def reprice_member_totals(db: Database, factors: dict[str, float]) -> int:
+    """Set member carbon to ``count × factor`` and re-sum it; return how many changed."""
+    collection = db[MEMBER_TOTALS_COLLECTION]
+    changed = 0
+    for platform, grams in factors.items():
+        result = collection.update_many(
+            {f"count.{platform}": {"$exists": True}},
+            [{"$set": {f"carbon.{platform}": {"$multiply": [f"$count.{platform}", grams]}}}],
+        )
+        changed += result.modified_count
+    collection.update_many(
+        {},
+        [{"$set": {"total_carbon": {"$sum": {"$map": {"input": {"$objectToArray": "$carbon"}, "in": "$$this.v"}}}}}],
+    )
+    return changed
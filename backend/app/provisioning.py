@@ -0,0 +1,168 @@
+"""
+Bulk provisioning — create many accounts from one CSV or NDJSON upload.
+
+Registering users one ``/auth/register`` call at a time costs a duplicate
+lookup, a bcrypt hash on the auth pool and an insert per account. Here rows
+are validated like a registration, hashed across a pool of processes, and
+inserted ``BATCH_SIZE`` at a time with one unordered ``insert_many``; the
+unique email index reports accounts that already exist, so nothing is looked
+up first. While a batch is inserted the next one is already being hashed.
+
+``provision`` yields one result per row and a progress record per batch, so
+callers can stream them back as they happen.
+"""
+
+from __future__ import annotations
+
+import csv
+import io
+import multiprocessing
+import os
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, NamedTuple
+
+import orjson
+from pydantic import ValidationError
+
+from app.orgs import ORG_ROLES
+from app.repositories import Repository
+from app.schemas.auth import AuthRequest
+from app.utils import hash_password
+
+BATCH_SIZE = 500
+
+CSV_TYPES = ("text/csv",)
+NDJSON_TYPES = ("application/x-ndjson", "application/jsonl", "application/json-seq")
+
+
+class _Row(NamedTuple):
+    number: int
+    email: str
+    password: str
+    role: str
+
+
+def parse(body: bytes, content_type: str) -> list[dict[str, Any] | str]:
+    """
+    Split an upload into row objects; a row that cannot be read becomes its error message.
+
+    CSV needs a header with ``email`` and ``password`` columns; NDJSON one
+    object per line. ``role`` is optional in both. Raises ``ValueError``
+    for an unknown content type or a CSV without the required columns.
+    """
+    media_type = content_type.split(";")[0].strip().lower()
+    text = body.decode("utf-8-sig")
+    if media_type in CSV_TYPES:
+        reader = csv.DictReader(io.StringIO(text))
+        missing = {"email", "password"} - set(reader.fieldnames or ())
+        if missing:
+            raise ValueError(f"CSV header is missing: {', '.join(sorted(missing))}")
+        return [dict(row) for row in reader]
+    if media_type in NDJSON_TYPES:
+        rows: list[dict[str, Any] | str] = []
+        for line in text.splitlines():
+            if not line.strip():
+                continue
+            try:
+                row = orjson.loads(line)
+            except orjson.JSONDecodeError:
+                rows.append("Malformed JSON")
+                continue
+            rows.append(row if isinstance(row, dict) else "Expected a JSON object")
+        return rows
+    raise ValueError(f"Unsupported content type: {media_type or 'none'} (use text/csv or application/x-ndjson)")
+
+
+def _validate(number: int, row: dict[str, Any] | str, with_role: bool) -> _Row | str:
+    """The row as registered, or why it cannot be."""
+    if isinstance(row, str):
+        return row
+    try:
+        request = AuthRequest.model_validate({"email": row.get("email"), "password": row.get("password")})
+    except ValidationError as exc:
+        return exc.errors()[0]["msg"].removeprefix("Value error, ")
+    role = row.get("role") or "member"
+    if with_role and role not in ORG_ROLES:
+        return f"Unknown role: {role}"
+    return _Row(number, request.email, request.password, role)
+
+
+def provision(
+    repository: Repository,
+    rows: list[dict[str, Any] | str],
+    *,
+    org_id: str | None = None,
+    workers: int = 0,
+) -> Iterator[dict[str, Any]]:
+    """
+    Create an account per row; yield results and progress as batches finish.
+
+    Yields ``{"event": "row", "row": n, "email", "status", ...}`` with status
+    "created" (and the new ``id``), "exists" or "invalid" (and ``error``),
+    a ``{"event": "progress", ...}`` count after each batch, and a final
+    ``{"event": "done", ...}``. With *org_id* the accounts join that
+    organization with the row's ``role``. *workers* hashing processes,
+    0 = one per CPU core.
+    """
+    counts = {"total": len(rows), "processed": 0, "created": 0, "exists": 0, "invalid": 0}
+
+    def progress(event: str) -> dict[str, Any]:
+        return {"event": event, **counts}
+
+    valid: list[_Row] = []
+    for number, row in enumerate(rows, start=1):
+        checked = _validate(number, row, org_id is not None)
+        if isinstance(checked, str):
+            counts["invalid"] += 1
+            counts["processed"] += 1
+            email = row.get("email") if isinstance(row, dict) else None
+            yield {"event": "row", "row": number, "email": email, "status": "invalid", "error": checked}
+        else:
+            valid.append(checked)
+    if counts["invalid"]:
+        yield progress("progress")
+
+    batches = [valid[i : i + BATCH_SIZE] for i in range(0, len(valid), BATCH_SIZE)]
+    if batches:
+        workers = min(workers or os.cpu_count() or 1, len(valid))
+        # Spawned, not forked: the API process runs threads that a fork
+        # would copy mid-flight.
+        with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+
+            def hash_batch(batch: list[_Row]) -> Iterator[str]:
+                chunksize = max(1, len(batch) // (workers * 4))
+                return executor.map(hash_password, [row.password for row in batch], chunksize=chunksize)
+
+            pending = hash_batch(batches[0])
+            for i, batch in enumerate(batches):
+                hashes = list(pending)
+                if i + 1 < len(batches):
+                    pending = hash_batch(batches[i + 1])
+
+                now = datetime.utcnow()
+                docs = [
+                    {"email": row.email, "password_hash": password_hash, "created_at": now, "updated_at": now}
+                    for row, password_hash in zip(batch, hashes)
+                ]
+                if org_id is not None:
+                    for doc, row in zip(docs, batch):
+                        doc["org_role"] = row.role
+                for row, doc in zip(batch, repository.insert_users(docs, org_id=org_id)):
+                    counts["processed"] += 1
+                    if doc is None:
+                        counts["exists"] += 1
+                        yield {"event": "row", "row": row.number, "email": row.email, "status": "exists"}
+                    else:
+                        counts["created"] += 1
+                        yield {
+                            "event": "row",
+                            "row": row.number,
+                            "email": row.email,
+                            "status": "created",
+                            "id": str(doc["_id"]),
+                        }
+                yield progress("progress")
+
+    yield progress("done")
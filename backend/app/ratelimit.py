@@ -0,0 +1,233 @@
+"""
+Token-bucket rate limiting — per client and global, per route.
+
+Each limited route declares ``Depends(rate_limit("name"))`` in its
+``dependencies``, so the check runs before the route's own dependencies
+(session lookup, request body) and before any database or bcrypt work.
+Clients are identified by the signed session cookie when present (checked
+without touching the database) and by IP address otherwise — behind proxies,
+the address ``rate_limit_proxy_hops`` entries from the right of
+``X-Forwarded-For``.
+
+Limits are written ``"<count>/<second|minute|hour>"``: a bucket holds up to
+``count`` tokens and refills evenly over the period. Buckets live in process
+memory, or in Redis so that every worker shares them.
+"""
+
+from __future__ import annotations
+
+import math
+import os
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Protocol
+
+from fastapi import HTTPException, Request, status
+from loguru import logger
+
+from app import metrics
+from app.config import get_settings
+from app.utils import verify_session
+
+_PERIODS = {"second": 1, "minute": 60, "hour": 3600}
+
+
+@dataclass(frozen=True)
+class Limit:
+    """Bucket capacity and refill rate (tokens per second)."""
+
+    capacity: int
+    rate: float
+
+    @classmethod
+    def parse(cls, spec: str) -> Limit:
+        """Parse ``"10/minute"`` style limits."""
+        try:
+            count, period = spec.split("/")
+            return cls(capacity=int(count), rate=int(count) / _PERIODS[period.strip()])
+        except (ValueError, KeyError):
+            raise ValueError(f"Invalid rate limit {spec!r}, expected '<count>/<second|minute|hour>'")
+
+
+class RateLimitBackend(Protocol):
+    async def take(self, key: str, limit: Limit) -> float:
+        """Take one token from *key*; return 0 if allowed, else seconds until one is available."""
+        ...
+
+    async def refund(self, key: str, limit: Limit) -> None:
+        """Give back a token taken from *key* for a request that was rejected after all."""
+        ...
+
+
+class MemoryBackend:
+    """Buckets in a dict; only consistent within one worker process."""
+
+    def __init__(self, max_keys: int = 100_000) -> None:
+        self._buckets: dict[str, tuple[float, float]] = {}
+        self._max_keys = max_keys
+
+    async def take(self, key: str, limit: Limit) -> float:
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(key, (limit.capacity, now))
+        tokens = min(limit.capacity, tokens + (now - updated) * limit.rate)
+        if tokens >= 1:
+            self._buckets[key] = (tokens - 1, now)
+            if len(self._buckets) > self._max_keys:
+                self._sweep(now)
+            return 0.0
+        self._buckets[key] = (tokens, now)
+        return (1 - tokens) / limit.rate
+
+    async def refund(self, key: str, limit: Limit) -> None:
+        if key in self._buckets:
+            tokens, updated = self._buckets[key]
+            self._buckets[key] = (min(limit.capacity, tokens + 1), updated)
+
+    def _sweep(self, now: float) -> None:
+        """Forget buckets idle for an hour or more (full again for any sane limit)."""
+        self._buckets = {k: v for k, v in self._buckets.items() if now - v[1] < 3600}
+
+
+# Refill and take atomically, timed by the Redis server clock so that all
+# workers agree. Returns the wait in seconds as a string (Lua numbers are
+# truncated to integers on the way out).
+_TAKE_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens >= 1 then
+  tokens = tokens - 1
+else
+  wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000))
+return tostring(wait)
+"""
+
+_REFUND_SCRIPT = """
+local tokens = tonumber(redis.call('HGET', KEYS[1], 'tokens'))
+if tokens then
+  redis.call('HSET', KEYS[1], 'tokens', tostring(math.min(tonumber(ARGV[1]), tokens + 1)))
+end
+return 1
+"""
+
+
+class RedisBackend:
+    """Buckets in Redis (or any server speaking its protocol and Lua), shared by all workers."""
+
+    def __init__(self, url: str) -> None:
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise RuntimeError("rate_limit_backend='redis' needs the 'redis' package") from None
+        self._client = redis.from_url(url)
+        self._script = self._client.register_script(_TAKE_SCRIPT)
+        self._refund_script = self._client.register_script(_REFUND_SCRIPT)
+
+    async def take(self, key: str, limit: Limit) -> float:
+        wait = await self._script(keys=[f"ratelimit:{key}"], args=[limit.capacity, limit.rate])
+        return float(wait)
+
+    async def refund(self, key: str, limit: Limit) -> None:
+        await self._refund_script(keys=[f"ratelimit:{key}"], args=[limit.capacity])
+
+
+@lru_cache(maxsize=1)
+def get_backend() -> RateLimitBackend:
+    """Return the single backend selected by ``Settings.rate_limit_backend``."""
+    settings = get_settings()
+    if settings.rate_limit_backend == "redis":
+        return RedisBackend(settings.rate_limit_redis_url)
+    return MemoryBackend()
+
+
+# A forked worker opens its own Redis connections (and memory buckets).
+os.register_at_fork(after_in_child=get_backend.cache_clear)
+
+
+def client_key(request: Request) -> str:
+    """Identify the caller: the session's user id if signed and valid, else the (proxied) IP."""
+    session = request.cookies.get("session")
+    if session:
+        user_id = verify_session(session)
+        if user_id:
+            return f"user:{user_id}"
+    hops = get_settings().rate_limit_proxy_hops
+    if hops:
+        forwarded = [
+            host.strip()
+            for header in request.headers.getlist("x-forwarded-for")
+            for host in header.split(",")
+            if host.strip()
+        ]
+        if len(forwarded) >= hops:
+            return f"ip:{forwarded[-hops]}"
+    host = request.client.host if request.client else "unknown"
+    return f"ip:{host}"
+
+
+def rate_limit(name: str, per_client: str | None = None, total: str | None = None) -> Any:
+    """
+    Return a dependency enforcing the ``per_client`` and ``total`` limits of *name*.
+
+    Arguments name ``Settings`` fields holding the limit strings, so limits
+    can be changed through the environment; an empty value disables that
+    limit. ``total`` is shared by every client (and every route using the
+    same field).
+    """
+    limited = metrics.counter(f"ratelimit.{name}.limited")
+    errors = metrics.counter(f"ratelimit.{name}.errors")
+
+    async def dependency(request: Request) -> None:
+        settings = get_settings()
+        if not settings.rate_limit_enabled:
+            return
+
+        checks = []
+        if per_client and getattr(settings, per_client):
+            checks.append((f"{name}:{client_key(request)}", getattr(settings, per_client)))
+        if total and getattr(settings, total):
+            checks.append((f"{total}:*", getattr(settings, total)))
+
+        backend = get_backend()
+        taken: list[tuple[str, Limit]] = []
+        for key, spec in checks:
+            limit = _parse(spec)
+            try:
+                wait = await backend.take(key, limit)
+            except Exception as exc:
+                # Fail open: an unreachable limiter must not take the API down.
+                errors.inc()
+                logger.warning("Rate limiter unavailable, allowing request: {}", exc)
+                return
+            if wait > 0:
+                # A rejected request must not use up the buckets it passed.
+                for taken_key, taken_limit in taken:
+                    try:
+                        await backend.refund(taken_key, taken_limit)
+                    except Exception as exc:
+                        errors.inc()
+                        logger.warning("Rate limiter unavailable, token not refunded: {}", exc)
+                limited.inc()
+                raise HTTPException(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    detail="Too many requests. Please slow down.",
+                    headers={"Retry-After": str(math.ceil(wait))},
+                )
+            taken.append((key, limit))
+
+    return dependency
+
+
+@lru_cache(maxsize=64)
+def _parse(spec: str) -> Limit:
+    return Limit.parse(spec)
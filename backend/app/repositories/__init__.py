@@ -0,0 +1,40 @@
+"""
+Storage repositories — the API's view of users, organizations, query
+events and rollups.
+
+``get_repository()`` returns the backend selected by
+``Settings.storage_backend``:
+
+- ``mongo``  — MongoDB (production);
+- ``memory`` — in-process, for tests, local load runs and benchmarks.
+
+Operational jobs (``app.jobs``) work on MongoDB directly.
+"""
+
+from __future__ import annotations
+
+from functools import lru_cache
+
+from app.config import get_settings
+from app.repositories.base import MemberTotals, PlatformTotals, Repository, SummaryRow
+from app.repositories.memory import MemoryRepository
+from app.repositories.mongo import MongoRepository
+
+
+@lru_cache(maxsize=1)
+def get_repository() -> Repository:
+    """Return the **single** repository for the entire process."""
+    if get_settings().storage_backend == "memory":
+        return MemoryRepository()
+    return MongoRepository()
+
+
+__all__ = [
+    "MemberTotals",
+    "MemoryRepository",
+    "MongoRepository",
+    "PlatformTotals",
+    "Repository",
+    "SummaryRow",
+    "get_repository",
+]
@@ -0,0 +1,227 @@
+"""
+Storage repository interface — everything the request path reads and writes.
+
+Routers and dependencies go through a ``Repository`` instead of touching
+collections, so the API can run on MongoDB or on the in-memory engine.
+All methods are blocking; call them from a workload pool (see
+``app.executors``). User ids are passed as strings, as in the routers.
+
+Reads marked ``stale_ok`` may be served by a secondary and lag recent
+writes (see ``Settings.mongodb_analytics_read_preference``); every other
+read sees the caller's own writes.
+"""
+
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from collections.abc import Iterator
+from datetime import datetime
+from typing import Any, TypedDict
+
+from app.models.factors import FactorTable
+from app.models.query import QueryRecord
+
+
+class SummaryRow(TypedDict):
+    """One compacted (period, platform) total of a user's events."""
+
+    start: datetime
+    platform: str
+    period: str  # "day" | "month"
+    count: int
+    carbon_grams: float
+
+
+class MemberTotals(TypedDict):
+    """One organization member's leaderboard row."""
+
+    user_id: str
+    email: str
+    queries: int
+    carbon_grams: float
+
+
+# platform → (queries, grams of CO₂)
+PlatformTotals = dict[str, tuple[int, float]]
+
+
+class Repository(ABC):
+    """Storage operations used by the API."""
+
+    name: str
+
+    # ── Users ───────────────────────────────────────────────────────────
+
+    @abstractmethod
+    def get_user(self, user_id: str) -> dict[str, Any] | None:
+        """Return the user document with this id."""
+
+    @abstractmethod
+    def get_user_by_email(self, email: str) -> dict[str, Any] | None:
+        """Return the user document with this email."""
+
+    @abstractmethod
+    def insert_user(self, doc: dict[str, Any]) -> dict[str, Any]:
+        """Insert a user document; return it with its ``_id`` set."""
+
+    @abstractmethod
+    def insert_users(
+        self, docs: list[dict[str, Any]], *, org_id: str | None = None
+    ) -> list[dict[str, Any] | None]:
+        """
+        Insert user documents in any order, in as few round trips as possible.
+
+        Returns each document with its ``_id`` set, or None where the email
+        is already taken. With *org_id*, the users join that organization
+        (``org_role`` from the document, default "member").
+        """
+
+    @abstractmethod
+    def update_user(self, user_id: str, fields: dict[str, Any]) -> dict[str, Any] | None:
+        """Set *fields* on a user; return the updated document (None if missing)."""
+
+    # ── Query events ────────────────────────────────────────────────────
+
+    @abstractmethod
+    def insert_query(
+        self,
+        user_id: str,
+        platform: str,
+        carbon_grams: float,
+        timestamp: datetime,
+        *,
+        org_id: str | None = None,
+        **extra: Any,
+    ) -> str:
+        """
+        Store one query event and count it in the range buckets; return its id.
+
+        With *org_id* it is also counted in that organization's rollups.
+        """
+
+    @abstractmethod
+    def fetch_queries(
+        self,
+        user_id: str,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        *,
+        stale_ok: bool = False,
+    ) -> list[QueryRecord]:
+        """Return a user's events in ``[since, until)``, in no particular order."""
+
+    @abstractmethod
+    def fetch_recent(
+        self,
+        user_id: str,
+        limit: int | None = None,
+        since: datetime | None = None,
+    ) -> list[tuple[str, QueryRecord]]:
+        """Return a user's newest events (from *since*) as (id, record), newest first."""
+
+    @abstractmethod
+    def iter_queries(
+        self, user_id: str, since: datetime | None = None, *, stale_ok: bool = False
+    ) -> Iterator[QueryRecord]:
+        """Yield a user's events from *since*, oldest first."""
+
+    @abstractmethod
+    def platform_totals(
+        self, user_id: str, since: datetime | None = None, *, stale_ok: bool = False
+    ) -> PlatformTotals:
+        """Sum a user's events from *since* per platform."""
+
+    # ── Range buckets (see app.buckets) ─────────────────────────────────
+
+    @abstractmethod
+    def bucket_prefix(self, user_id: str, period: str, at: datetime) -> PlatformTotals:
+        """
+        Sum a user's *period* buckets before *at*, per platform.
+
+        For hour buckets *at* may be a quarter hour inside a bucket.
+        """
+
+    @abstractmethod
+    def bucket_series(self, user_id: str, period: str, boundaries: list[datetime]) -> list[PlatformTotals]:
+        """
+        Sum a user's *period* buckets per interval between consecutive *boundaries*.
+
+        For hour buckets the boundaries may be quarter hours, at most one per hour.
+        """
+
+    # ── Organizations (see app.orgs) ────────────────────────────────────
+
+    @abstractmethod
+    def insert_org(self, doc: dict[str, Any]) -> dict[str, Any]:
+        """Insert an organization document; return it with its ``_id`` set."""
+
+    @abstractmethod
+    def get_org(self, org_id: str) -> dict[str, Any] | None:
+        """Return the organization document with this id."""
+
+    @abstractmethod
+    def join_org(self, user_id: str, org_id: str, role: str) -> dict[str, Any] | None:
+        """Make a user a member unless they already belong to an org; return the updated user or None."""
+
+    @abstractmethod
+    def leave_org(self, user_id: str, org_id: str) -> bool:
+        """Remove a member from the org and its leaderboard; False if they were not a member."""
+
+    @abstractmethod
+    def org_members(self, org_id: str) -> list[dict[str, Any]]:
+        """Return the org's member user documents, by email."""
+
+    @abstractmethod
+    def org_leaderboard(self, org_id: str, limit: int, ascending: bool = False) -> list[MemberTotals]:
+        """Return up to *limit* members by total CO₂ (highest first unless *ascending*)."""
+
+    @abstractmethod
+    def org_bucket_prefix(self, org_id: str, period: str, at: datetime) -> PlatformTotals:
+        """Like ``bucket_prefix``, over the organization's buckets."""
+
+    @abstractmethod
+    def org_bucket_series(self, org_id: str, period: str, boundaries: list[datetime]) -> list[PlatformTotals]:
+        """Like ``bucket_series``, over the organization's buckets."""
+
+    # ── Deletions (see app.deletions) ───────────────────────────────────
+
+    @abstractmethod
+    def request_deletion(self, user_id: str, kind: str, requested_by: str) -> dict[str, Any] | None:
+        """
+        Queue the deletion of a user's account or history; return the job (None if no such user).
+
+        An ``account`` deletion deletes the user document and leaves their
+        organization right away; their data follows in the background.
+        """
+
+    @abstractmethod
+    def get_deletion(self, job_id: str) -> dict[str, Any] | None:
+        """Return the deletion job with this id."""
+
+    @abstractmethod
+    def list_deletions(self, limit: int, status: str | None = None) -> list[dict[str, Any]]:
+        """Return up to *limit* deletion jobs, newest first."""
+
+    # ── Rollups (compacted summaries) ───────────────────────────────────
+
+    @abstractmethod
+    def summary_totals(self, user_id: str, *, stale_ok: bool = False) -> PlatformTotals:
+        """Sum a user's compacted summaries per platform."""
+
+    @abstractmethod
+    def iter_summaries(self, user_id: str, *, stale_ok: bool = False) -> Iterator[SummaryRow]:
+        """Yield a user's compacted summaries, oldest period first."""
+
+    @abstractmethod
+    def upsert_summaries(self, user_id: str, rows: list[SummaryRow]) -> int:
+        """Write (replace) summaries keyed by (start, platform, period); return how many."""
+
+    # ── Reference data and health ───────────────────────────────────────
+
+    @abstractmethod
+    def latest_factor_table(self) -> FactorTable:
+        """Return the carbon factor version used to price new queries."""
+
+    @abstractmethod
+    def ping(self) -> bool:
+        """Return True if the storage answers."""
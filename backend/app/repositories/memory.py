@@ -0,0 +1,405 @@
+"""
+In-memory repository — for tests, local load runs and benchmarks.
+
+Each user's events are kept in parallel arrays sorted by timestamp, so a
+time-range read is two ``bisect`` lookups plus a slice, and inserts keep the
+order with ``bisect.insort``-style placement. Range buckets are sorted the
+same way, with prefix sums extended on demand and truncated when an older
+bucket changes; hour buckets keep their quarter hours apart for splitting. Nothing is persisted; data lives as long as the process.
+"""
+
+from __future__ import annotations
+
+import bisect
+import threading
+from collections.abc import Iterator
+from datetime import datetime, timezone
+from typing import Any
+
+from bson import ObjectId
+
+from app import deletions
+from app.buckets import PERIODS, QUARTERS, bucket_start, merge, quarter_of, subtract
+from app.constants.platforms import CARBON_PER_QUERY
+from app.models.factors import FactorTable
+from app.models.query import QueryRecord
+from app.repositories.base import MemberTotals, PlatformTotals, Repository, SummaryRow
+
+
+def _naive_utc(ts: datetime | None) -> datetime | None:
+    """Stored timestamps are naive UTC (as pymongo returns them)."""
+    if ts is not None and ts.tzinfo is not None:
+        return ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return ts
+
+
+class _UserEvents:
+    """One user's events, sorted by timestamp."""
+
+    __slots__ = ("timestamps", "records", "ids")
+
+    def __init__(self) -> None:
+        self.timestamps: list[datetime] = []
+        self.records: list[QueryRecord] = []
+        self.ids: list[str] = []
+
+    def insert(self, query_id: str, record: QueryRecord) -> None:
+        i = bisect.bisect_right(self.timestamps, record.timestamp)
+        self.timestamps.insert(i, record.timestamp)
+        self.records.insert(i, record)
+        self.ids.insert(i, query_id)
+
+    def span(self, since: datetime | None, until: datetime | None) -> slice:
+        """Index range of the events in ``[since, until)``."""
+        lo = 0 if since is None else bisect.bisect_left(self.timestamps, since)
+        hi = len(self.timestamps) if until is None else bisect.bisect_left(self.timestamps, until)
+        return slice(lo, hi)
+
+
+class _Buckets:
+    """One user's buckets of one period, sorted by start."""
+
+    __slots__ = ("starts", "totals", "quarters", "cumulative")
+
+    def __init__(self) -> None:
+        self.starts: list[datetime] = []
+        self.totals: list[PlatformTotals] = []
+        # quarters[i][q] = totals of quarter hour q (1–3) of bucket i
+        self.quarters: list[dict[int, PlatformTotals]] = []
+        # cumulative[i] = totals of buckets 0..i; valid for the first len() buckets
+        self.cumulative: list[PlatformTotals] = []
+
+    def add(self, start: datetime, platform: str, carbon_grams: float, quarter: int = 0) -> None:
+        i = bisect.bisect_left(self.starts, start)
+        if i == len(self.starts) or self.starts[i] != start:
+            self.starts.insert(i, start)
+            self.totals.insert(i, {})
+            self.quarters.insert(i, {})
+        self.totals[i] = merge(self.totals[i], {platform: (1, carbon_grams)})
+        if quarter:
+            self.quarters[i][quarter] = merge(self.quarters[i].get(quarter, {}), {platform: (1, carbon_grams)})
+        del self.cumulative[i:]
+
+    def prefix(self, at: datetime) -> PlatformTotals:
+        i = bisect.bisect_left(self.starts, at)
+        while len(self.cumulative) < i:
+            j = len(self.cumulative)
+            self.cumulative.append(merge(self.cumulative[j - 1], self.totals[j]) if j else self.totals[j])
+        if not i:
+            return {}
+        totals = self.cumulative[i - 1]
+        if self.starts[i - 1] == bucket_start(at, "hour"):
+            # *at* is a quarter hour inside the last bucket: drop the rest of it
+            for quarter in QUARTERS:
+                if quarter >= quarter_of(at):
+                    totals = subtract(totals, self.quarters[i - 1].get(quarter, {}))
+        return totals
+
+
+class MemoryRepository(Repository):
+    """Repository keeping everything in process memory."""
+
+    name = "memory"
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._users: dict[str, dict[str, Any]] = {}
+        self._users_by_email: dict[str, str] = {}
+        self._events: dict[str, _UserEvents] = {}
+        # (user or org id, period) → buckets; ObjectIds never collide
+        self._buckets: dict[tuple[str, str], _Buckets] = {}
+        self._orgs: dict[str, dict[str, Any]] = {}
+        # org id → user id → (queries, carbon)
+        self._member_totals: dict[str, dict[str, tuple[int, float]]] = {}
+        # user id → {(start, platform, period): (count, carbon)}
+        self._summaries: dict[str, dict[tuple[datetime, str, str], tuple[int, float]]] = {}
+        self._deletions: dict[str, dict[str, Any]] = {}
+        self._factors = FactorTable(version=1, factors=dict(CARBON_PER_QUERY), note="initial estimates")
+
+    # ── Users ───────────────────────────────────────────────────────────
+
+    def get_user(self, user_id: str) -> dict[str, Any] | None:
+        doc = self._users.get(user_id)
+        return dict(doc) if doc else None
+
+    def get_user_by_email(self, email: str) -> dict[str, Any] | None:
+        user_id = self._users_by_email.get(email)
+        return self.get_user(user_id) if user_id else None
+
+    def insert_user(self, doc: dict[str, Any]) -> dict[str, Any]:
+        with self._lock:
+            if doc["email"] in self._users_by_email:
+                raise ValueError(f"Duplicate email: {doc['email']}")
+            stored = {**doc, "_id": ObjectId()}
+            user_id = str(stored["_id"])
+            self._users[user_id] = stored
+            self._users_by_email[doc["email"]] = user_id
+        return dict(stored)
+
+    def insert_users(
+        self, docs: list[dict[str, Any]], *, org_id: str | None = None
+    ) -> list[dict[str, Any] | None]:
+        inserted: list[dict[str, Any] | None] = []
+        with self._lock:
+            for doc in docs:
+                if doc["email"] in self._users_by_email:
+                    inserted.append(None)
+                    continue
+                if org_id is not None:
+                    doc = {**doc, "org_id": ObjectId(org_id), "org_role": doc.get("org_role", "member")}
+                    org = self._orgs[org_id]
+                    org["member_count"] = org.get("member_count", 0) + 1
+                stored = {**doc, "_id": ObjectId()}
+                self._users[str(stored["_id"])] = stored
+                self._users_by_email[doc["email"]] = str(stored["_id"])
+                inserted.append(dict(stored))
+        return inserted
+
+    def update_user(self, user_id: str, fields: dict[str, Any]) -> dict[str, Any] | None:
+        with self._lock:
+            doc = self._users.get(user_id)
+            if doc is None:
+                return None
+            doc.update(fields)
+            return dict(doc)
+
+    # ── Query events ────────────────────────────────────────────────────
+
+    def insert_query(
+        self,
+        user_id: str,
+        platform: str,
+        carbon_grams: float,
+        timestamp: datetime,
+        *,
+        org_id: str | None = None,
+        **extra: Any,
+    ) -> str:
+        query_id = str(ObjectId())
+        record = QueryRecord(platform, carbon_grams, _naive_utc(timestamp))
+        owners = [user_id] if org_id is None else [user_id, org_id]
+        with self._lock:
+            self._events.setdefault(user_id, _UserEvents()).insert(query_id, record)
+            for owner in owners:
+                for period in PERIODS:
+                    self._buckets.setdefault((owner, period), _Buckets()).add(
+                        bucket_start(record.timestamp, period),
+                        platform,
+                        carbon_grams,
+                        quarter_of(record.timestamp) if period == "hour" else 0,
+                    )
+            if org_id is not None:
+                members = self._member_totals.setdefault(org_id, {})
+                count, carbon = members.get(user_id, (0, 0.0))
+                members[user_id] = (count + 1, carbon + carbon_grams)
+        return query_id
+
+    def _window(
+        self,
+        user_id: str,
+        since: datetime | None,
+        until: datetime | None = None,
+    ) -> tuple[list[str], list[QueryRecord]]:
+        events = self._events.get(user_id)
+        if events is None:
+            return [], []
+        with self._lock:
+            span = events.span(_naive_utc(since), _naive_utc(until))
+            return events.ids[span], events.records[span]
+
+    def fetch_queries(
+        self,
+        user_id: str,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        *,
+        stale_ok: bool = False,
+    ) -> list[QueryRecord]:
+        return self._window(user_id, since, until)[1]
+
+    def fetch_recent(
+        self,
+        user_id: str,
+        limit: int | None = None,
+        since: datetime | None = None,
+    ) -> list[tuple[str, QueryRecord]]:
+        ids, records = self._window(user_id, since)
+        if limit:
+            ids, records = ids[-limit:], records[-limit:]
+        return list(zip(reversed(ids), reversed(records)))
+
+    def iter_queries(
+        self, user_id: str, since: datetime | None = None, *, stale_ok: bool = False
+    ) -> Iterator[QueryRecord]:
+        return iter(self._window(user_id, since)[1])
+
+    def platform_totals(
+        self, user_id: str, since: datetime | None = None, *, stale_ok: bool = False
+    ) -> PlatformTotals:
+        totals: dict[str, tuple[int, float]] = {}
+        for platform, carbon_grams, _ in self._window(user_id, since)[1]:
+            count, carbon = totals.get(platform, (0, 0.0))
+            totals[platform] = (count + 1, carbon + carbon_grams)
+        return totals
+
+    # ── Range buckets (see app.buckets) ─────────────────────────────────
+
+    def bucket_prefix(self, user_id: str, period: str, at: datetime) -> PlatformTotals:
+        # Also serves org buckets: they are keyed by org id the same way.
+        buckets = self._buckets.get((user_id, period))
+        if buckets is None:
+            return {}
+        with self._lock:
+            return buckets.prefix(_naive_utc(at))
+
+    def bucket_series(self, user_id: str, period: str, boundaries: list[datetime]) -> list[PlatformTotals]:
+        buckets = self._buckets.get((user_id, period))
+        if buckets is None:
+            return [{} for _ in boundaries[:-1]]
+        with self._lock:
+            prefixes = [buckets.prefix(_naive_utc(edge)) for edge in boundaries]
+        return [subtract(after, before) for before, after in zip(prefixes, prefixes[1:])]
+
+    # ── Organizations (see app.orgs) ────────────────────────────────────
+
+    def insert_org(self, doc: dict[str, Any]) -> dict[str, Any]:
+        stored = {**doc, "_id": ObjectId()}
+        with self._lock:
+            self._orgs[str(stored["_id"])] = stored
+        return dict(stored)
+
+    def get_org(self, org_id: str) -> dict[str, Any] | None:
+        doc = self._orgs.get(org_id)
+        return dict(doc) if doc else None
+
+    def join_org(self, user_id: str, org_id: str, role: str) -> dict[str, Any] | None:
+        with self._lock:
+            doc = self._users.get(user_id)
+            if doc is None or doc.get("org_id") is not None:
+                return None
+            doc.update(org_id=ObjectId(org_id), org_role=role, updated_at=datetime.utcnow())
+            org = self._orgs[org_id]
+            org["member_count"] = org.get("member_count", 0) + 1
+            return dict(doc)
+
+    def leave_org(self, user_id: str, org_id: str) -> bool:
+        with self._lock:
+            doc = self._users.get(user_id)
+            if doc is None or doc.get("org_id") != ObjectId(org_id):
+                return False
+            del doc["org_id"], doc["org_role"]
+            doc["updated_at"] = datetime.utcnow()
+            self._orgs[org_id]["member_count"] -= 1
+            self._member_totals.get(org_id, {}).pop(user_id, None)
+            return True
+
+    def org_members(self, org_id: str) -> list[dict[str, Any]]:
+        with self._lock:
+            members = [dict(doc) for doc in self._users.values() if doc.get("org_id") == ObjectId(org_id)]
+        return sorted(members, key=lambda doc: doc["email"])
+
+    def org_leaderboard(self, org_id: str, limit: int, ascending: bool = False) -> list[MemberTotals]:
+        with self._lock:
+            rows = sorted(
+                self._member_totals.get(org_id, {}).items(),
+                key=lambda item: item[1][1],
+                reverse=not ascending,
+            )[:limit]
+            return [
+                MemberTotals(user_id=user_id, email=self._users[user_id]["email"], queries=count, carbon_grams=carbon)
+                for user_id, (count, carbon) in rows
+            ]
+
+    def org_bucket_prefix(self, org_id: str, period: str, at: datetime) -> PlatformTotals:
+        return self.bucket_prefix(org_id, period, at)
+
+    def org_bucket_series(self, org_id: str, period: str, boundaries: list[datetime]) -> list[PlatformTotals]:
+        return self.bucket_series(org_id, period, boundaries)
+
+    # ── Deletions (see app.deletions) ───────────────────────────────────
+
+    def request_deletion(self, user_id: str, kind: str, requested_by: str) -> dict[str, Any] | None:
+        # Nothing to throttle in memory: the job is carried out at once.
+        with self._lock:
+            user = self._users.get(user_id)
+            if user is None:
+                return None
+            job = {**deletions.new_job(user, kind, requested_by), "_id": ObjectId()}
+
+            events = self._events.pop(user_id, _UserEvents())
+            kept = _UserEvents()
+            if kind == "purge":
+                span = events.span(job["requested_at"], None)
+                kept.timestamps, kept.records, kept.ids = events.timestamps[span], events.records[span], events.ids[span]
+                self._events[user_id] = kept
+            deleted = {"queries": len(events.ids) - len(kept.ids), "summaries": len(self._summaries.pop(user_id, {}))}
+            deleted["buckets"] = sum(len(self._buckets.pop((user_id, period), _Buckets()).starts) for period in PERIODS)
+            for record in kept.records:
+                for period in PERIODS:
+                    self._buckets.setdefault((user_id, period), _Buckets()).add(
+                        bucket_start(record.timestamp, period),
+                        record.platform,
+                        record.carbon_grams,
+                        quarter_of(record.timestamp) if period == "hour" else 0,
+                    )
+            deleted["member_totals"] = sum(
+                members.pop(user_id, None) is not None for members in self._member_totals.values()
+            )
+            if kind == "purge" and kept.records and user.get("org_id") is not None:
+                self._member_totals.setdefault(str(user["org_id"]), {})[user_id] = (
+                    len(kept.records),
+                    sum(record.carbon_grams for record in kept.records),
+                )
+
+            if kind == "purge":
+                user.pop("compacted_until", None)
+            else:
+                del self._users[user_id], self._users_by_email[user["email"]]
+                if user.get("org_id") is not None:
+                    self._orgs[str(user["org_id"])]["member_count"] -= 1
+
+            now = datetime.utcnow()
+            job.update(
+                status="done", started_at=now, finished_at=now, total_queries=deleted["queries"], deleted=deleted
+            )
+            self._deletions[str(job["_id"])] = job
+            return dict(job)
+
+    def get_deletion(self, job_id: str) -> dict[str, Any] | None:
+        job = self._deletions.get(job_id)
+        return dict(job) if job else None
+
+    def list_deletions(self, limit: int, status: str | None = None) -> list[dict[str, Any]]:
+        with self._lock:
+            jobs = [dict(job) for job in self._deletions.values() if status is None or job["status"] == status]
+        return sorted(jobs, key=lambda job: job["requested_at"], reverse=True)[:limit]
+
+    # ── Rollups (compacted summaries) ───────────────────────────────────
+
+    def summary_totals(self, user_id: str, *, stale_ok: bool = False) -> PlatformTotals:
+        totals: dict[str, tuple[int, float]] = {}
+        for (_, platform, _), (count, carbon) in self._summaries.get(user_id, {}).items():
+            total_count, total_carbon = totals.get(platform, (0, 0.0))
+            totals[platform] = (total_count + count, total_carbon + carbon)
+        return totals
+
+    def iter_summaries(self, user_id: str, *, stale_ok: bool = False) -> Iterator[SummaryRow]:
+        with self._lock:
+            items = sorted(self._summaries.get(user_id, {}).items())
+        for (start, platform, period), (count, carbon) in items:
+            yield SummaryRow(start=start, platform=platform, period=period, count=count, carbon_grams=carbon)
+
+    def upsert_summaries(self, user_id: str, rows: list[SummaryRow]) -> int:
+        with self._lock:
+            summaries = self._summaries.setdefault(user_id, {})
+            for row in rows:
+                summaries[(row["start"], row["platform"], row["period"])] = (row["count"], row["carbon_grams"])
+        return len(rows)
+
+    # ── Reference data and health ───────────────────────────────────────
+
+    def latest_factor_table(self) -> FactorTable:
+        return self._factors
+
+    def ping(self) -> bool:
+        return True
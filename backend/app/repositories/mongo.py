@@ -0,0 +1,339 @@
+"""
+MongoDB repository — the production storage backend.
+
+Query events are read and written in the configured storage layout
+(``Settings.queries_storage``); compacted summaries live in
+``query_summaries`` and range buckets in ``query_buckets``. Organizations
+are in ``organizations``, their rollups in ``org_buckets`` and
+``org_member_totals``; queued deletions in ``deletion_jobs``. With
+``aggregates_mode="stream"`` ingest only inserts the event and the
+aggregate worker maintains the buckets and rollups (see ``app.aggregates``).
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterator
+from datetime import datetime
+from typing import Any
+
+from bson import ObjectId
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.database import Database
+from pymongo.errors import BulkWriteError
+
+from app import buckets, deletions, orgs
+from app.config import get_settings
+from app.database import get_analytics_database, get_database, get_query_layout, ping_mongodb
+from app.models.factors import FactorTable
+from app.models.query import QueryLayout, QueryRecord
+from app.repositories.base import MemberTotals, PlatformTotals, Repository, SummaryRow
+
+_DUPLICATE_KEY = 11000
+
+
+class MongoRepository(Repository):
+    """Repository backed by MongoDB collections."""
+
+    name = "mongo"
+
+    def __init__(
+        self,
+        db: Database | None = None,
+        layout: QueryLayout | None = None,
+        analytics_db: Database | None = None,
+    ) -> None:
+        # Resolved lazily so that creating the repository never connects.
+        self._db = db
+        self._layout = layout
+        self._analytics_db = analytics_db
+
+    @property
+    def db(self) -> Database:
+        return self._db if self._db is not None else get_database()
+
+    def _reader(self, stale_ok: bool) -> Database:
+        """The database to read from; ``stale_ok`` reads follow the analytics read preference."""
+        if not stale_ok:
+            return self.db
+        if self._analytics_db is not None:
+            return self._analytics_db
+        return self._db if self._db is not None else get_analytics_database()
+
+    @property
+    def layout(self) -> QueryLayout:
+        return self._layout or get_query_layout()
+
+    @property
+    def _queries(self):
+        return self.db[self.layout.collection]
+
+    def _read_queries(self, stale_ok: bool):
+        return self._reader(stale_ok)[self.layout.collection]
+
+    # ── Users ───────────────────────────────────────────────────────────
+
+    def get_user(self, user_id: str) -> dict[str, Any] | None:
+        return self.db.users.find_one({"_id": ObjectId(user_id)})
+
+    def get_user_by_email(self, email: str) -> dict[str, Any] | None:
+        return self.db.users.find_one({"email": email})
+
+    def insert_user(self, doc: dict[str, Any]) -> dict[str, Any]:
+        result = self.db.users.insert_one(doc)
+        return {**doc, "_id": result.inserted_id}
+
+    def insert_users(
+        self, docs: list[dict[str, Any]], *, org_id: str | None = None
+    ) -> list[dict[str, Any] | None]:
+        if org_id is not None:
+            docs = [{**doc, "org_id": ObjectId(org_id), "org_role": doc.get("org_role", "member")} for doc in docs]
+        else:
+            docs = [dict(doc) for doc in docs]  # insert_many sets "_id" on them
+        if not docs:
+            return []
+        # Unordered: the server keeps going past duplicates, which the
+        # unique email index reports per document.
+        taken: set[int] = set()
+        try:
+            self.db.users.insert_many(docs, ordered=False)
+        except BulkWriteError as exc:
+            for error in exc.details["writeErrors"]:
+                if error["code"] != _DUPLICATE_KEY:
+                    raise
+                taken.add(error["index"])
+        if org_id is not None and len(docs) > len(taken):
+            self.db[orgs.ORGS_COLLECTION].update_one(
+                {"_id": ObjectId(org_id)}, {"$inc": {"member_count": len(docs) - len(taken)}}
+            )
+        return [None if i in taken else doc for i, doc in enumerate(docs)]
+
+    def update_user(self, user_id: str, fields: dict[str, Any]) -> dict[str, Any] | None:
+        return self.db.users.find_one_and_update(
+            {"_id": ObjectId(user_id)}, {"$set": fields}, return_document=ReturnDocument.AFTER
+        )
+
+    # ── Query events ────────────────────────────────────────────────────
+
+    def insert_query(
+        self,
+        user_id: str,
+        platform: str,
+        carbon_grams: float,
+        timestamp: datetime,
+        *,
+        org_id: str | None = None,
+        **extra: Any,
+    ) -> str:
+        stream = get_settings().aggregates_mode == "stream"
+        if stream:
+            extra["deferred"] = True  # counted by the aggregate worker
+            if org_id is not None:
+                extra["org_id"] = ObjectId(org_id)
+        doc = self.layout.document(
+            user_id=ObjectId(user_id),
+            platform=platform,
+            carbon_grams=carbon_grams,
+            timestamp=timestamp,
+            **extra,
+        )
+        query_id = self._queries.insert_one(doc).inserted_id
+        if stream:
+            return str(query_id)
+        self.db[buckets.BUCKETS_COLLECTION].bulk_write(
+            buckets.record_ops(ObjectId(user_id), platform, carbon_grams, timestamp), ordered=False
+        )
+        if org_id is not None:
+            org = ObjectId(org_id)
+            self.db[buckets.ORG_BUCKETS.collection].bulk_write(
+                buckets.record_ops(org, platform, carbon_grams, timestamp, buckets.ORG_BUCKETS), ordered=False
+            )
+            self.db[orgs.MEMBER_TOTALS_COLLECTION].bulk_write(
+                [orgs.member_op(org, ObjectId(user_id), platform, carbon_grams)]
+            )
+        return str(query_id)
+
+    def fetch_queries(
+        self,
+        user_id: str,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        *,
+        stale_ok: bool = False,
+    ) -> list[QueryRecord]:
+        layout = self.layout
+        queries = self._read_queries(stale_ok).find(
+            layout.user_filter(ObjectId(user_id), since, until), layout.record_projection
+        )
+        return [layout.record(q) for q in queries]
+
+    def fetch_recent(
+        self,
+        user_id: str,
+        limit: int | None = None,
+        since: datetime | None = None,
+    ) -> list[tuple[str, QueryRecord]]:
+        layout = self.layout
+        cursor = self._queries.find(
+            layout.user_filter(ObjectId(user_id), since),
+            {**layout.record_projection, "_id": 1},
+        ).sort("timestamp", -1)
+        if limit:
+            cursor = cursor.limit(limit)
+        return [(str(q["_id"]), layout.record(q)) for q in cursor]
+
+    def iter_queries(
+        self, user_id: str, since: datetime | None = None, *, stale_ok: bool = False
+    ) -> Iterator[QueryRecord]:
+        layout = self.layout
+        events = self._read_queries(stale_ok).find(
+            layout.user_filter(ObjectId(user_id), since), layout.record_projection
+        ).sort("timestamp", 1)
+        return map(layout.record, events)
+
+    def platform_totals(
+        self, user_id: str, since: datetime | None = None, *, stale_ok: bool = False
+    ) -> PlatformTotals:
+        layout = self.layout
+        groups = self._read_queries(stale_ok).aggregate(
+            [
+                {"$match": layout.user_filter(ObjectId(user_id), since)},
+                {
+                    "$group": {
+                        "_id": f"${layout.platform_field}",
+                        "count": {"$sum": 1},
+                        "carbon_grams": {"$sum": "$carbon_grams"},
+                    }
+                },
+            ]
+        )
+        return {(g["_id"] or "unknown"): (g["count"], g["carbon_grams"]) for g in groups}
+
+    # ── Range buckets (see app.buckets) ─────────────────────────────────
+
+    def bucket_prefix(self, user_id: str, period: str, at: datetime) -> PlatformTotals:
+        return buckets.prefix(self.db, ObjectId(user_id), period, at)
+
+    def bucket_series(self, user_id: str, period: str, boundaries: list[datetime]) -> list[PlatformTotals]:
+        return buckets.series(self.db, ObjectId(user_id), period, boundaries)
+
+    # ── Organizations (see app.orgs) ────────────────────────────────────
+
+    def insert_org(self, doc: dict[str, Any]) -> dict[str, Any]:
+        result = self.db[orgs.ORGS_COLLECTION].insert_one(doc)
+        return {**doc, "_id": result.inserted_id}
+
+    def get_org(self, org_id: str) -> dict[str, Any] | None:
+        return self.db[orgs.ORGS_COLLECTION].find_one({"_id": ObjectId(org_id)})
+
+    def join_org(self, user_id: str, org_id: str, role: str) -> dict[str, Any] | None:
+        user = self.db.users.find_one_and_update(
+            {"_id": ObjectId(user_id), "org_id": None},
+            {"$set": {"org_id": ObjectId(org_id), "org_role": role, "updated_at": datetime.utcnow()}},
+            return_document=ReturnDocument.AFTER,
+        )
+        if user is not None:
+            self.db[orgs.ORGS_COLLECTION].update_one({"_id": ObjectId(org_id)}, {"$inc": {"member_count": 1}})
+        return user
+
+    def leave_org(self, user_id: str, org_id: str) -> bool:
+        member = {"_id": ObjectId(user_id), "org_id": ObjectId(org_id)}
+        result = self.db.users.update_one(
+            member, {"$unset": {"org_id": "", "org_role": ""}, "$set": {"updated_at": datetime.utcnow()}}
+        )
+        if not result.modified_count:
+            return False
+        self.db[orgs.ORGS_COLLECTION].update_one({"_id": ObjectId(org_id)}, {"$inc": {"member_count": -1}})
+        self.db[orgs.MEMBER_TOTALS_COLLECTION].delete_one({"org_id": ObjectId(org_id), "user_id": ObjectId(user_id)})
+        return True
+
+    def org_members(self, org_id: str) -> list[dict[str, Any]]:
+        return list(
+            self.db.users.find({"org_id": ObjectId(org_id)}, {"email": 1, "org_role": 1}).sort("email", 1)
+        )
+
+    def org_leaderboard(self, org_id: str, limit: int, ascending: bool = False) -> list[MemberTotals]:
+        return [
+            MemberTotals(
+                user_id=str(row["user_id"]),
+                email=row["email"],
+                queries=row["total_count"],
+                carbon_grams=row["total_carbon"],
+            )
+            for row in orgs.leaderboard(self.db, ObjectId(org_id), limit, ascending=ascending)
+        ]
+
+    def org_bucket_prefix(self, org_id: str, period: str, at: datetime) -> PlatformTotals:
+        return buckets.prefix(self.db, ObjectId(org_id), period, at, store=buckets.ORG_BUCKETS)
+
+    def org_bucket_series(self, org_id: str, period: str, boundaries: list[datetime]) -> list[PlatformTotals]:
+        return buckets.series(self.db, ObjectId(org_id), period, boundaries, store=buckets.ORG_BUCKETS)
+
+    # ── Deletions (see app.deletions) ───────────────────────────────────
+
+    def request_deletion(self, user_id: str, kind: str, requested_by: str) -> dict[str, Any] | None:
+        user = self.db.users.find_one({"_id": ObjectId(user_id)}, {"email": 1})
+        if user is None:
+            return None
+        # Queued first: if the account removal below is cut short, the job finishes it.
+        job = deletions.enqueue(self.db, user, kind, requested_by)
+        if kind == "account":
+            deletions.remove_account(self.db, user["_id"])
+        return job
+
+    def get_deletion(self, job_id: str) -> dict[str, Any] | None:
+        return self.db[deletions.DELETIONS_COLLECTION].find_one({"_id": ObjectId(job_id)})
+
+    def list_deletions(self, limit: int, status: str | None = None) -> list[dict[str, Any]]:
+        query = {"status": status} if status else {}
+        return list(self.db[deletions.DELETIONS_COLLECTION].find(query).sort("requested_at", -1).limit(limit))
+
+    # ── Rollups (compacted summaries) ───────────────────────────────────
+
+    def summary_totals(self, user_id: str, *, stale_ok: bool = False) -> PlatformTotals:
+        groups = self._reader(stale_ok).query_summaries.aggregate(
+            [
+                {"$match": {"user_id": ObjectId(user_id)}},
+                {
+                    "$group": {
+                        "_id": "$platform",
+                        "count": {"$sum": "$count"},
+                        "carbon_grams": {"$sum": "$carbon_grams"},
+                    }
+                },
+            ]
+        )
+        return {g["_id"]: (g["count"], g["carbon_grams"]) for g in groups}
+
+    def iter_summaries(self, user_id: str, *, stale_ok: bool = False) -> Iterator[SummaryRow]:
+        return self._reader(stale_ok).query_summaries.find(
+            {"user_id": ObjectId(user_id)},
+            {"_id": 0, "start": 1, "platform": 1, "period": 1, "count": 1, "carbon_grams": 1},
+        ).sort("start", 1)
+
+    def upsert_summaries(self, user_id: str, rows: list[SummaryRow]) -> int:
+        ops = [
+            UpdateOne(
+                {
+                    "user_id": ObjectId(user_id),
+                    "start": row["start"],
+                    "platform": row["platform"],
+                    "period": row["period"],
+                },
+                {"$set": {"count": row["count"], "carbon_grams": row["carbon_grams"]}},
+                upsert=True,
+            )
+            for row in rows
+        ]
+        if ops:
+            self.db.query_summaries.bulk_write(ops, ordered=False)
+        return len(ops)
+
+    # ── Reference data and health ───────────────────────────────────────
+
+    def latest_factor_table(self) -> FactorTable:
+        from app.factors import latest_factor_table  # app.factors uses the repository
+
+        return latest_factor_table(self.db)
+
+    def ping(self) -> bool:
+        return ping_mongodb()
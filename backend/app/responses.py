@@ -0,0 +1,39 @@
+"""
+Fast JSON responses — orjson-backed default response class.
+
+FastAPI's stock ``JSONResponse`` runs ``jsonable_encoder`` and the stdlib
+``json`` module. ``FastJSONResponse`` renders with pydantic-core (for
+models) or orjson (for plain data) instead.
+
+Endpoints that build their response models from trusted, already-typed data
+return ``FastJSONResponse(model)`` directly. FastAPI then hands the response
+through untouched, so ``response_model`` is only used for the OpenAPI schema
+and the model is not validated a second time.
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from pydantic_core import to_json
+
+
+def _default(obj: Any) -> Any:
+    """orjson fallback for types it does not know natively."""
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered with pydantic-core / orjson."""
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, BaseModel):
+            return content.__pydantic_serializer__.to_json(content)
+        if isinstance(content, list) and content and isinstance(content[0], BaseModel):
+            return to_json(content)
+        return orjson.dumps(content, default=_default)
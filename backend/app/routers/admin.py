@@ -0,0 +1,209 @@
+"""
+Admin router — platform-wide analytics across all users, bulk account
+provisioning, and account deletions.
+
+Analytics are served from the partial results written by
+``python -m app.jobs.analytics``, so requests never scan the query events;
+deletions are carried out by ``python -m app.jobs.deletions``. All
+endpoints require an account listed in ``Settings.admin_emails``.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterator
+from datetime import datetime, timezone
+from typing import Any, Literal
+
+import orjson
+from bson import ObjectId
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from loguru import logger
+
+from app.analytics import cohort_rows, computed_through, platform_month
+from app.config import get_settings
+from app.constants.platforms import PLATFORM_NAMES
+from app.database import get_analytics_database
+from app.dependencies import get_admin_user
+from app.executors import run_in_pool
+from app.models.user import User
+from app.provisioning import parse, provision
+from app.repositories import get_repository
+from app.responses import FastJSONResponse
+from app.schemas.admin import (
+    CohortResponse,
+    CohortStat,
+    DeletionCreate,
+    DeletionJobResponse,
+    DeletionJobsResponse,
+    PlatformMonthResponse,
+    PlatformTotal,
+)
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+
+def _load_platform_month(month: str) -> tuple[list[dict[str, Any]], datetime | None]:
+    db = get_analytics_database()
+    return platform_month(db, month), computed_through(db)
+
+
+def _deletion_response(job: dict[str, Any]) -> DeletionJobResponse:
+    total, deleted = job.get("total_queries"), job.get("deleted", {})
+    return DeletionJobResponse.model_construct(
+        id=str(job["_id"]),
+        user_id=str(job["user_id"]),
+        email=job["email"],
+        kind=job["kind"],
+        status=job["status"],
+        requested_by=job["requested_by"],
+        requested_at=job["requested_at"],
+        started_at=job.get("started_at"),
+        finished_at=job.get("finished_at"),
+        total_queries=total,
+        deleted=deleted,
+        progress=min(1.0, round(deleted.get("queries", 0) / total, 4)) if total else None,
+        attempts=job.get("attempts", 0),
+        error=job.get("error"),
+    )
+
+
+def _provision_lines(rows: list[dict[str, Any] | str], org_id: str | None, workers: int) -> Iterator[bytes]:
+    for record in provision(get_repository(), rows, org_id=org_id, workers=workers):
+        yield orjson.dumps(record) + b"\n"
+
+
+def _load_cohorts() -> tuple[list[dict[str, Any]], datetime | None]:
+    db = get_analytics_database()
+    return cohort_rows(db), computed_through(db)
+
+
+@router.get("/analytics/platforms", response_model=PlatformMonthResponse)
+async def get_platform_totals(
+    month: str | None = Query(default=None, pattern=r"^\d{4}-\d{2}$", description="YYYY-MM, default current month"),
+    admin: User = Depends(get_admin_user),
+):
+    """Return queries and CO₂ per platform across all users for one month."""
+    month = month or datetime.now(timezone.utc).strftime("%Y-%m")
+    logger.info("Admin {} fetching platform totals for {}", admin.email, month)
+
+    rows, through = await run_in_pool("analytics", _load_platform_month, month)
+    platforms = [
+        PlatformTotal.model_construct(
+            key=row["platform"],
+            name=PLATFORM_NAMES.get(row["platform"], row["platform"]),
+            count=row["count"],
+            carbon=round(row["carbon_grams"], 2),
+        )
+        for row in rows
+    ]
+    return FastJSONResponse(
+        PlatformMonthResponse.model_construct(
+            month=month,
+            platforms=platforms,
+            total_queries=sum(row["count"] for row in rows),
+            total_carbon=round(sum(row["carbon_grams"] for row in rows), 2),
+            computed_through=through,
+        )
+    )
+
+
+@router.get("/analytics/cohorts", response_model=CohortResponse)
+async def get_cohorts(admin: User = Depends(get_admin_user)):
+    """Return average eco-score and totals per signup-month cohort."""
+    logger.info("Admin {} fetching cohort analytics", admin.email)
+
+    rows, through = await run_in_pool("analytics", _load_cohorts)
+    cohorts = [
+        CohortStat.model_construct(
+            cohort=row["_id"],
+            users=row["users"],
+            active_users=row["active_users"],
+            avg_eco_score=round(row["avg_eco_score"], 2),
+            total_queries=row["queries"],
+            total_carbon=round(row["carbon_grams"], 2),
+        )
+        for row in rows
+    ]
+    return FastJSONResponse(CohortResponse.model_construct(cohorts=cohorts, computed_through=through))
+
+
+@router.post(
+    "/users/bulk",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"application/x-ndjson": {}}}},
+)
+async def bulk_provision_users(
+    request: Request,
+    org_id: str | None = Query(default=None, description="Organization the new accounts join"),
+    admin: User = Depends(get_admin_user),
+):
+    """
+    Create accounts from a CSV (``text/csv``) or NDJSON
+    (``application/x-ndjson``) body of ``email``, ``password`` and optional
+    ``role`` rows.
+
+    Streams NDJSON back: a ``row`` record per row (created, exists or
+    invalid), ``progress`` after each batch and a final ``done``.
+    """
+    settings = get_settings()
+    try:
+        rows = parse(await request.body(), request.headers.get("content-type", ""))
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(exc)) from None
+    if len(rows) > settings.provision_max_rows:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {settings.provision_max_rows} rows per upload.",
+        )
+    if org_id is not None and (
+        not ObjectId.is_valid(org_id) or await run_in_pool("auth", get_repository().get_org, org_id) is None
+    ):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Organization not found.")
+
+    logger.info("Admin {} provisioning {} accounts (org {})", admin.email, len(rows), org_id)
+    # A sync generator: Starlette iterates it in the thread pool, so hashing
+    # and inserts never block the event loop.
+    return StreamingResponse(
+        _provision_lines(rows, org_id, settings.provision_workers),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.post("/deletions", response_model=DeletionJobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def request_deletion(body: DeletionCreate, admin: User = Depends(get_admin_user)):
+    """
+    Delete a user's account, or purge their history and keep the account.
+
+    The deletion runs in the background; poll ``GET /admin/deletions/{id}``.
+    """
+    job = None
+    if ObjectId.is_valid(body.user_id):
+        job = await run_in_pool("auth", get_repository().request_deletion, body.user_id, body.kind, admin.email)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found.")
+    logger.info("Admin {} requested {} deletion of {} ({})", admin.email, body.kind, job["email"], job["_id"])
+    return FastJSONResponse(_deletion_response(job), status_code=status.HTTP_202_ACCEPTED)
+
+
+@router.get("/deletions", response_model=DeletionJobsResponse)
+async def list_deletions(
+    status_filter: Literal["queued", "running", "done"] | None = Query(default=None, alias="status"),
+    limit: int = Query(default=50, ge=1, le=500),
+    admin: User = Depends(get_admin_user),
+):
+    """List deletion jobs with their progress, newest first."""
+    jobs = await run_in_pool("auth", get_repository().list_deletions, limit, status_filter)
+    return FastJSONResponse(
+        DeletionJobsResponse.model_construct(jobs=[_deletion_response(job) for job in jobs], count=len(jobs))
+    )
+
+
+@router.get("/deletions/{job_id}", response_model=DeletionJobResponse)
+async def get_deletion(job_id: str, admin: User = Depends(get_admin_user)):
+    """Return one deletion job and its progress."""
+    job = await run_in_pool("auth", get_repository().get_deletion, job_id) if ObjectId.is_valid(job_id) else None
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Deletion not found.")
+    return FastJSONResponse(_deletion_response(job))
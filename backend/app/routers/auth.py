@@ -1,5 +1,6 @@
 """
-Authentication router — register, login, logout, current user.
+Authentication router — register, login, logout, current user, settings and
+account deletion.
 
 Uses MongoDB for user storage and session-based authentication with
 secure httpOnly cookies.
@@ -14,47 +15,90 @@ from fastapi import APIRouter, Depends, HTTPException, Response, status
 from loguru import logger
 
 from app.config import get_settings
-from app.database import get_users_collection
 from app.dependencies import get_current_user
+from app.executors import run_in_pool
 from app.models.user import User
-from app.schemas.auth import AuthRequest, AuthResponse, MessageResponse, UserResponse
+from app.ratelimit import rate_limit
+from app.repositories import get_repository
+from app.responses import FastJSONResponse
+from app.schemas.auth import AuthRequest, AuthResponse, MessageResponse, UserResponse, UserUpdate
 from app.utils import create_session, hash_password, verify_password
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 
-# ── Endpoints ───────────────────────────────────────────────────────────
-
+# ── Internal helpers ────────────────────────────────────────────────────
 
-@router.post("/register", response_model=AuthResponse, status_code=status.HTTP_201_CREATED)
-async def register(body: AuthRequest, response: Response):
-    """Create a new user account and return session cookie."""
-    logger.info("Register attempt: {}", body.email)
 
-    users_collection = get_users_collection()
+def _create_user(email: str, password: str) -> dict | None:
+    """Synchronously hash the password and insert a user; None if the email is taken."""
+    repository = get_repository()
 
     # Check if user already exists
-    existing_user = users_collection.find_one({"email": body.email})
-    if existing_user:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="An account with this email already exists.",
-        )
+    if repository.get_user_by_email(email):
+        return None
 
     # Hash password
-    password_hash = hash_password(body.password)
+    password_hash = hash_password(password)
 
     # Create user document
     now = datetime.utcnow()
     user_doc = {
-        "email": body.email,
+        "email": email,
         "password_hash": password_hash,
         "created_at": now,
         "updated_at": now,
     }
 
-    result = users_collection.insert_one(user_doc)
-    user_id = str(result.inserted_id)
+    return repository.insert_user(user_doc)
+
+
+def _authenticate(email: str, password: str) -> dict | None:
+    """Synchronously look up a user and verify the password; None on mismatch."""
+    # Find user by email
+    user_doc = get_repository().get_user_by_email(email)
+    if not user_doc:
+        return None
+
+    # Verify password
+    if not verify_password(password, user_doc["password_hash"]):
+        return None
+    return user_doc
+
+
+def _user_response(user: User) -> UserResponse:
+    """The public fields of *user*."""
+    return UserResponse(
+        id=user.id,
+        email=user.email,
+        created_at=user.created_at,
+        updated_at=user.updated_at,
+        timezone=user.timezone,
+        org_id=user.org_id,
+        org_role=user.org_role,
+    )
+
+
+# ── Endpoints ───────────────────────────────────────────────────────────
+
+
+@router.post(
+    "/register",
+    response_model=AuthResponse,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(rate_limit("register", "rate_limit_register", "rate_limit_auth_total"))],
+)
+async def register(body: AuthRequest, response: Response):
+    """Create a new user account and return session cookie."""
+    logger.info("Register attempt: {}", body.email)
+
+    user_doc = await run_in_pool("auth", _create_user, body.email, body.password)
+    if user_doc is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="An account with this email already exists.",
+        )
+    user_id = str(user_doc["_id"])
 
     logger.info("User created: {} ({})", body.email, user_id)
 
@@ -73,36 +117,22 @@ async def register(body: AuthRequest, response: Response):
     )
 
     # Return user info
-    user_doc["_id"] = result.inserted_id
     user = User.from_db(user_doc)
 
-    return AuthResponse(
-        user=UserResponse(
-            id=user.id,
-            email=user.email,
-            created_at=user.created_at,
-            updated_at=user.updated_at,
-        )
-    )
+    return AuthResponse(user=_user_response(user))
 
 
-@router.post("/login", response_model=AuthResponse)
+@router.post(
+    "/login",
+    response_model=AuthResponse,
+    dependencies=[Depends(rate_limit("login", "rate_limit_login", "rate_limit_auth_total"))],
+)
 async def login(body: AuthRequest, response: Response):
     """Sign in with email & password and return session cookie."""
     logger.info("Login attempt: {}", body.email)
 
-    users_collection = get_users_collection()
-
-    # Find user by email
-    user_doc = users_collection.find_one({"email": body.email})
+    user_doc = await run_in_pool("auth", _authenticate, body.email, body.password)
     if not user_doc:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid email or password.",
-        )
-
-    # Verify password
-    if not verify_password(body.password, user_doc["password_hash"]):
         logger.warning("Failed login attempt for {}", body.email)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -129,14 +159,7 @@ async def login(body: AuthRequest, response: Response):
     # Return user info
     user = User.from_db(user_doc)
 
-    return AuthResponse(
-        user=UserResponse(
-            id=user.id,
-            email=user.email,
-            created_at=user.created_at,
-            updated_at=user.updated_at,
-        )
-    )
+    return AuthResponse(user=_user_response(user))
 
 
 @router.post("/logout", response_model=MessageResponse)
@@ -153,9 +176,40 @@ async def logout(response: Response):
 @router.get("/me", response_model=UserResponse)
 async def me(user: User = Depends(get_current_user)):
     """Return the currently authenticated user's info."""
-    return UserResponse(
-        id=user.id,
-        email=user.email,
-        created_at=user.created_at,
-        updated_at=user.updated_at,
-    )
+    return FastJSONResponse(_user_response(user))
+
+
+@router.patch("/me", response_model=UserResponse)
+async def update_me(body: UserUpdate, user: User = Depends(get_current_user)):
+    """Update the current user's settings (the timezone day views use)."""
+    fields = {"timezone": body.timezone, "updated_at": datetime.utcnow()}
+    user_doc = await run_in_pool("auth", get_repository().update_user, user.id, fields)
+    if user_doc is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User not found. Please log in again.",
+        )
+    logger.info("User {} set timezone {}", user.id, body.timezone)
+
+    user = User.from_db(user_doc)
+    return FastJSONResponse(_user_response(user))
+
+
+@router.delete("/me", response_model=MessageResponse, status_code=status.HTTP_202_ACCEPTED)
+async def delete_me(response: Response, user: User = Depends(get_current_user)):
+    """
+    Delete the current user's account and sign out.
+
+    The account is gone at once; its query history is deleted in the
+    background (see ``app.deletions``).
+    """
+    job = await run_in_pool("auth", get_repository().request_deletion, user.id, "account", user.email)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User not found. Please log in again.",
+        )
+    logger.info("User {} deleted their account (deletion {})", user.id, job["_id"])
+
+    response.delete_cookie(key="session")
+    return MessageResponse(message="Account deleted")
@@ -1,6 +1,7 @@
 """
 Dashboard router — aggregated stats, platform breakdown, recent queries,
-and 7-day time-series data.
+7-day time-series data, date ranges, what-if scenarios, CSV export and a
+live update stream (SSE).
 
 All endpoints require a valid session cookie.
 """
@@ -8,70 +9,221 @@ All endpoints require a valid session cookie.
 from __future__ import annotations
 
 import asyncio
-from datetime import datetime, timedelta, timezone
-from typing import Any
-
-from bson import ObjectId
-from fastapi import APIRouter, Depends, Query, status
+import csv
+import io
+from collections.abc import AsyncIterator, Callable, Iterator
+from datetime import date, datetime, timedelta, timezone
+from functools import partial
+from typing import Any, TypeVar
+from zoneinfo import ZoneInfo
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+from pydantic_core import to_json
 from loguru import logger
 
+from app import scenarios
+from app.buckets import (
+    Granularity,
+    bucket_end,
+    bucket_start,
+    local_day_edges,
+    merge,
+    naive_utc,
+    pick,
+    range_boundaries,
+    subtract,
+)
 from app.constants.platforms import PLATFORM_COLORS, PLATFORM_ICONS, PLATFORM_NAMES
-from app.database import get_queries_collection
+from app.config import get_settings
 from app.dependencies import get_current_user
+from app.events import RESYNC, EventBus
+from app.executors import get_pool, run_in_pool
+from app.factors import current_factor_table
+from app.models.query import QueryRecord
 from app.models.user import User
+from app.ratelimit import rate_limit
+from app.repositories import get_repository
+from app.responses import FastJSONResponse
 from app.schemas.dashboard import (
     DayData,
     GoogleSearchComparisonResponse,
     PlatformStat,
+    RangePoint,
+    RangeResponse,
     RecentQuery,
     RecentResponse,
+    ScenarioPlatform,
+    ScenarioRequest,
+    ScenarioResponse,
+    ScenarioResult,
     StatsResponse,
     TrendResponse,
     WeeklyResponse,
 )
+from app.singleflight import SingleFlight
+
+T = TypeVar("T")
 
 router = APIRouter(prefix="/dashboard", tags=["dashboard"])
 
+# Identical reads for the same user (several tabs, popup + dashboard) share
+# one Mongo round-trip while it is in flight.
+_singleflight = SingleFlight("dashboard")
+
+# New queries are pushed to the user's open dashboard streams.
+_events = EventBus("dashboard", queue_size=get_settings().stream_queue_size)
+
 # ── Internal helpers ────────────────────────────────────────────────────
 
 
-def _fetch_all_queries(user_id: str) -> list[dict]:
-    """Synchronously fetch all queries for a user from MongoDB."""
-    collection = get_queries_collection()
-    queries = collection.find(
-        {"user_id": ObjectId(user_id)}
-    ).sort("timestamp", -1)
-    return [{"id": str(q["_id"]), **q} for q in queries]
+def _platform_totals(user: User, *, stale_ok: bool = False) -> dict[str, tuple[int, float]]:
+    """
+    Synchronously sum a user's all-time queries and carbon per platform.
+
+    Events before ``compacted_until`` are represented by summaries and
+    skipped, even if the retention job has not finished deleting them yet.
+    With *stale_ok* the scan may run on a secondary.
+    """
+    repository = get_repository()
+    totals = repository.summary_totals(user.id, stale_ok=stale_ok) if user.compacted_until else {}
+    platforms = repository.platform_totals(user.id, user.compacted_until, stale_ok=stale_ok)
+    for platform, (count, carbon) in platforms.items():
+        total_count, total_carbon = totals.get(platform, (0, 0.0))
+        totals[platform] = (total_count + count, total_carbon + carbon)
+    return totals
+
+
+def _compute_stats(user: User) -> dict[str, Any]:
+    """Synchronously aggregate a user's all-time stats (summaries + raw events)."""
+    return _aggregate([], _platform_totals(user, stale_ok=True))
+
+
+# Weekly, trend and comparison all read the same window of local days, so
+# the dashboard's parallel requests share one read.
+_HISTORY_DAYS = 14
+
+
+def _fetch_local_days(user_id: str, tz_name: str, first_day: date) -> list[dict[str, tuple[int, float]]]:
+    """Synchronously total a user's queries per local day, assembled from hour buckets."""
+    edges = local_day_edges(ZoneInfo(tz_name), first_day, _HISTORY_DAYS)
+    return get_repository().bucket_series(user_id, "hour", edges)
+
+
+async def _local_days(user: User) -> list[tuple[date, dict[str, tuple[int, float]]]]:
+    """The user's last ``_HISTORY_DAYS`` local days (oldest → newest) with per-platform totals."""
+    first_day = datetime.now(user.zone).date() - timedelta(days=_HISTORY_DAYS - 1)
+    daily = await _coalesced(
+        (user.id, "days", user.timezone, first_day), _fetch_local_days, user.id, user.timezone, first_day
+    )
+    return [(first_day + timedelta(days=i), totals) for i, totals in enumerate(daily)]
+
+
+def _fetch_recent_queries(user_id: str, limit: int) -> list[tuple[str, QueryRecord]]:
+    """Synchronously fetch the *limit* newest queries for a user as (id, record)."""
+    return get_repository().fetch_recent(user_id, limit)
 
 
-def _fetch_queries_since(user_id: str, since: datetime) -> list[dict]:
-    """Synchronously fetch queries newer than *since* for a user."""
-    collection = get_queries_collection()
-    queries = collection.find(
-        {"user_id": ObjectId(user_id), "timestamp": {"$gte": since}}
-    ).sort("timestamp", -1)
-    return [{"id": str(q["_id"]), **q} for q in queries]
+_EXPORT_CHUNK_ROWS = 500
 
 
-def _aggregate(queries: list[dict]) -> dict[str, Any]:
-    """Compute totals and per-platform breakdown from a list of queries."""
+def _export_rows(user_id: str, compacted_until: datetime | None) -> Iterator[str]:
+    """
+    Yield a user's history as CSV text, a few hundred rows per chunk.
+
+    Compacted summaries come first (one row per period and platform), then
+    raw events oldest → newest with ``queries`` = 1.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["timestamp", "platform", "queries", "carbon_grams", "resolution"])
+
+    def rows() -> Iterator[list]:
+        repository = get_repository()
+        if compacted_until is not None:
+            for s in repository.iter_summaries(user_id, stale_ok=True):
+                yield [s["start"].isoformat(), s["platform"], s["count"], round(s["carbon_grams"], 4), s["period"]]
+
+        for platform, carbon_grams, ts in repository.iter_queries(user_id, compacted_until, stale_ok=True):
+            yield [ts.isoformat() if ts else "", platform, 1, carbon_grams, "event"]
+
+    for i, row in enumerate(rows(), start=1):
+        writer.writerow(row)
+        if i % _EXPORT_CHUNK_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+async def _pooled_chunks(user_id: str, compacted_until: datetime | None) -> AsyncIterator[str]:
+    """
+    Yield the CSV chunks of ``_export_rows``, each read in the analytics pool.
+
+    One slot is reserved before the first chunk and held until the last, so
+    the export is never shed once the response has started.
+    """
+    chunks = _export_rows(user_id, compacted_until)
+    reservation = await get_pool("analytics").reserve()
+    try:
+        while (chunk := await reservation.run(next, chunks, None)) is not None:
+            yield chunk
+    finally:
+        reservation.release()
+        try:
+            chunks.close()  # closes the Mongo cursor
+        except ValueError:
+            pass  # still running in the pool (client went away); the cursor is closed when it finishes
+
+
+async def _resumed(first: str, rest: AsyncIterator[str]) -> AsyncIterator[str]:
+    """Yield *first*, then the rest of the async generator it came from."""
+    try:
+        yield first
+        async for chunk in rest:
+            yield chunk
+    finally:
+        await rest.aclose()
+
+
+async def _coalesced(key: tuple, fn: Callable[..., T], *args: Any) -> T:
+    """Run the blocking helper *fn* in the analytics pool, coalescing concurrent calls by *key*."""
+    return await _singleflight.do(key, lambda: run_in_pool("analytics", fn, *args))
+
+
+def _aggregate(
+    queries: list[QueryRecord],
+    summaries: dict[str, tuple[int, float]] | None = None,
+) -> dict[str, Any]:
+    """
+    Compute totals and per-platform breakdown from a list of queries.
+
+    *summaries* maps platform → (count, carbon) for compacted history and is
+    added on top of the raw queries.
+    """
     platform_counts: dict[str, int] = {}
     platform_carbon: dict[str, float] = {}
     total_queries = 0
     total_carbon = 0.0
 
-    for q in queries:
-        p = q.get("platform", "unknown")
-        cg = q.get("carbon_grams", 0.0)  # Updated field name
+    for p, (count, carbon) in (summaries or {}).items():
+        total_queries += count
+        total_carbon += carbon
+        platform_counts[p] = count
+        platform_carbon[p] = carbon
+
+    for p, cg, _ in queries:
         total_queries += 1
         total_carbon += cg
         platform_counts[p] = platform_counts.get(p, 0) + 1
         platform_carbon[p] = platform_carbon.get(p, 0.0) + cg
 
+    # Values are computed here from typed fields, so the models are built
+    # without re-running validation.
     platforms = sorted(
         [
-            PlatformStat(
+            PlatformStat.model_construct(
                 key=p,
                 name=PLATFORM_NAMES.get(p, p),
                 color=PLATFORM_COLORS.get(p, "#6b7280"),
@@ -126,17 +278,21 @@ def _detect_trend(smoothed: list[float], threshold_g: float = 1.0) -> str:
     return "stable"
 
 
-def _calculate_google_search_comparison(queries: list[dict]) -> dict[str, Any]:
+def _calculate_google_search_comparison(
+    totals: dict[str, tuple[int, float]],
+    factors: dict[str, float],
+) -> dict[str, Any]:
     """
     Calculate emissions comparison: actual LLM vs 35% replaced with Google.
 
-    Excludes google_search platform queries.
+    Takes per-platform (queries, carbon) totals and excludes google_search.
     Returns actual emission, forecasted emission, and comparison metrics.
     """
     # Filter out google_search queries
-    llm_queries = [q for q in queries if q.get("platform") != "google_search"]
+    llm_totals = {platform: total for platform, total in totals.items() if platform != scenarios.GOOGLE_SEARCH_PLATFORM}
+    num_queries = sum(count for count, _ in llm_totals.values())
 
-    if not llm_queries:
+    if not num_queries:
         return {
             "actual_emission": 0.0,
             "forecasted_emission": 0.0,
@@ -145,14 +301,12 @@ def _calculate_google_search_comparison(queries: list[dict]) -> dict[str, Any]:
         }
 
     # Calculate actual emission
-    actual_emission = sum(q.get("carbon_grams", 0.0) for q in llm_queries)
+    actual_emission = sum(carbon for _, carbon in llm_totals.values())
 
-    # Calculate forecasted emission (35% as Google search)
-    num_queries = len(llm_queries)
-    google_search_emission_per_query = 0.2  # From CARBON_PER_QUERY
-
-    # 65% remain as LLM, 35% become Google searches
-    forecasted_emission = (0.65 * actual_emission) + (0.35 * num_queries * google_search_emission_per_query)
+    # Calculate forecasted emission: 65% remain as LLM, 35% become Google searches
+    _, forecasted_emission = scenarios.total(
+        scenarios.evaluate(llm_totals, factors, replacement_ratio=scenarios.GOOGLE_SEARCH_RATIO)
+    )
 
     # Calculate multiplier
     times_more = actual_emission / forecasted_emission if forecasted_emission > 0 else 0.0
@@ -165,6 +319,177 @@ def _calculate_google_search_comparison(queries: list[dict]) -> dict[str, Any]:
     }
 
 
+# ── Live stream ─────────────────────────────────────────────────────────
+
+
+class _LiveTotals:
+    """
+    A stream's running totals, seeded once and then updated from events.
+
+    ``seen`` maps the ids of the queries counted so far (today's from the
+    snapshot, then every applied event) to their timestamps, so a query
+    reported twice — by the snapshot and an event, or by an event and a
+    catch-up read — counts once. When the day rolls over it is cut down to
+    the last two catch-up intervals, the only queries a read can still
+    return, so a long-lived stream keeps at most a day's ids. "Today" is the
+    user's local day.
+    """
+
+    def __init__(
+        self,
+        platforms: dict[str, tuple[int, float]],
+        zone: ZoneInfo,
+        day: date,
+        today: list[tuple[str, float, datetime]],
+    ) -> None:
+        self.platforms = platforms
+        self.zone = zone
+        self.day = day
+        self.today_queries = len(today)
+        self.today_carbon = sum(carbon for _, carbon, _ in today)
+        self.seen = {query_id: ts for query_id, _, ts in today}
+        self.horizon = timedelta(seconds=2 * get_settings().stream_catch_up_seconds)
+
+    def apply(self, event: dict[str, Any]) -> bool:
+        """Add a new query to the totals; False if it was already counted."""
+        if event["id"] in self.seen:
+            return False
+        self.seen[event["id"]] = event["timestamp"]
+        platform, carbon = event["platform"], event["carbon_grams"]
+        count, total = self.platforms.get(platform, (0, 0.0))
+        self.platforms[platform] = (count + 1, total + carbon)
+
+        day = event["timestamp"].replace(tzinfo=timezone.utc).astimezone(self.zone).date()
+        if day > self.day:
+            self.day, self.today_queries, self.today_carbon = day, 0, 0.0
+            oldest = event["timestamp"] - self.horizon
+            self.seen = {query_id: ts for query_id, ts in self.seen.items() if ts >= oldest}
+        if day == self.day:  # a late catch-up read may still bring yesterday's
+            self.today_queries += 1
+            self.today_carbon += carbon
+        return True
+
+    def stats(self) -> StatsResponse:
+        return StatsResponse.model_construct(**_aggregate([], self.platforms))
+
+    def today(self) -> DayData:
+        return DayData.model_construct(
+            date=self.day.isoformat(),
+            label=self.day.strftime("%a"),
+            queries=self.today_queries,
+            carbon=round(self.today_carbon, 2),
+        )
+
+
+def _load_live_totals(user: User) -> _LiveTotals:
+    """Synchronously read a user's per-platform totals and today's queries."""
+    # From the primary: a lagging total would miss queries already in ``seen``.
+    totals = _platform_totals(user)
+
+    # Read after the totals: anything counted above is also in ``seen``.
+    day = datetime.now(user.zone).date()
+    midnight = local_day_edges(user.zone, day, 1)[0]
+    today = get_repository().fetch_recent(user.id, since=midnight)
+    return _LiveTotals(
+        totals, user.zone, day, [(query_id, record.carbon_grams, record.timestamp) for query_id, record in today]
+    )
+
+
+def _sse(event: str, data: Any) -> str:
+    """Format one Server-Sent Event."""
+    return f"event: {event}\ndata: {to_json(data).decode()}\n\n"
+
+
+def _query_sse(event: dict[str, Any], live: _LiveTotals) -> str:
+    query = RecentQuery.model_construct(
+        id=event["id"],
+        platform=event["platform"],
+        platform_name=PLATFORM_NAMES.get(event["platform"], event["platform"]),
+        carbon_grams=round(event["carbon_grams"], 2),
+        timestamp=event["timestamp"].isoformat(),
+    )
+    return _sse("query", {"query": query, "stats": live.stats(), "today": live.today()})
+
+
+def _fetch_new_events(user_id: str, since: datetime) -> list[dict[str, Any]]:
+    """Synchronously read a user's queries since *since* as events, oldest first."""
+    return [
+        {"type": "query", "id": query_id, "platform": platform, "carbon_grams": carbon_grams, "timestamp": ts}
+        for query_id, (platform, carbon_grams, ts) in reversed(get_repository().fetch_recent(user_id, since=since))
+    ]
+
+
+async def _stream_events(user: User) -> AsyncIterator[str]:
+    """
+    Yield a ``snapshot`` event, then one ``query`` event per new query.
+
+    Totals are updated in memory from each event, never re-aggregated — except
+    after a ``RESYNC``, when the stream fell behind and starts over.
+
+    Events are published by the worker that ingested the query. With several
+    workers the stream also reads recent queries every
+    ``stream_catch_up_seconds`` to pick up those ingested elsewhere.
+    """
+    settings = get_settings()
+    loop = asyncio.get_running_loop()
+    heartbeat = settings.stream_heartbeat_seconds
+    catch_up = settings.stream_catch_up_seconds if settings.web_concurrency != 1 else None
+
+    # Subscribe before reading, so no query lands between snapshot and stream.
+    with _events.subscribe(user.id) as subscription:
+        # Catch-up reads overlap by one interval for inserts still in flight.
+        cursor = datetime.utcnow() - timedelta(seconds=catch_up or 0)
+        live = await run_in_pool("analytics", _load_live_totals, user)
+        yield _sse("snapshot", {"stats": live.stats(), "today": live.today()})
+
+        now = loop.time()
+        idle_deadline = now + settings.stream_idle_timeout_seconds
+        next_heartbeat = now + heartbeat
+        next_catch_up = now + catch_up if catch_up else float("inf")
+        # Starlette cancels this generator when the client disconnects.
+        while True:
+            now = loop.time()
+            if now >= idle_deadline:
+                logger.debug("Closing idle dashboard stream for user {}", user.id)
+                return
+            if now >= next_catch_up:
+                read_at = datetime.utcnow()
+                try:
+                    events = await run_in_pool("analytics", _fetch_new_events, user.id, cursor)
+                except HTTPException:
+                    # Shed: skip this poll rather than drop the stream (a
+                    # reconnect costs a full snapshot); the next one reads
+                    # from the same cursor
+                    next_catch_up = loop.time() + catch_up
+                    continue
+                cursor = read_at - timedelta(seconds=catch_up)
+                next_catch_up = loop.time() + catch_up
+                for event in events:
+                    if live.apply(event):
+                        yield _query_sse(event, live)
+                        idle_deadline = loop.time() + settings.stream_idle_timeout_seconds
+                        next_heartbeat = loop.time() + heartbeat
+                continue
+            if now >= next_heartbeat:
+                yield ": heartbeat\n\n"
+                next_heartbeat = now + heartbeat
+                continue
+            try:
+                event = await asyncio.wait_for(
+                    subscription.queue.get(), min(idle_deadline, next_heartbeat, next_catch_up) - now
+                )
+            except asyncio.TimeoutError:
+                continue
+
+            idle_deadline = loop.time() + settings.stream_idle_timeout_seconds
+            next_heartbeat = loop.time() + heartbeat
+            if event is RESYNC:
+                live = await run_in_pool("analytics", _load_live_totals, user)
+                yield _sse("snapshot", {"stats": live.stats(), "today": live.today()})
+            elif live.apply(event):
+                yield _query_sse(event, live)
+
+
 # ── Endpoints ───────────────────────────────────────────────────────────
 
 
@@ -173,16 +498,15 @@ async def get_stats(user: User = Depends(get_current_user)):
     """Return overall aggregated statistics."""
     logger.info("Fetching stats for user {}", user.id)
 
-    queries = await asyncio.to_thread(_fetch_all_queries, user.id)
-    return _aggregate(queries)
+    stats = await _coalesced((user.id, "stats", user.compacted_until), _compute_stats, user)
+    return FastJSONResponse(StatsResponse.model_construct(**stats))
 
 
 @router.get("/platforms", response_model=list[PlatformStat])
 async def get_platforms(user: User = Depends(get_current_user)):
     """Return per-platform breakdown sorted by query count."""
-    queries = await asyncio.to_thread(_fetch_all_queries, user.id)
-    agg = _aggregate(queries)
-    return agg["platforms"]
+    agg = await _coalesced((user.id, "stats", user.compacted_until), _compute_stats, user)
+    return FastJSONResponse(agg["platforms"])
 
 
 @router.get("/recent", response_model=RecentResponse)
@@ -193,27 +517,25 @@ async def get_recent(
     """Return the most recent queries (default 15)."""
     logger.info("Fetching {} recent queries for user {}", limit, user.id)
 
-    all_queries = await asyncio.to_thread(_fetch_all_queries, user.id)
-    recent = all_queries[:limit]
+    recent = await _coalesced((user.id, "recent", limit), _fetch_recent_queries, user.id, limit)
 
     items = []
-    for q in recent:
-        ts = q.get("timestamp")
+    for query_id, (platform, carbon_grams, ts) in recent:
         ts_str = None
         if ts and hasattr(ts, "isoformat"):
             ts_str = ts.isoformat()
 
         items.append(
-            RecentQuery(
-                id=q["id"],
-                platform=q.get("platform", "unknown"),
-                platform_name=PLATFORM_NAMES.get(q.get("platform", ""), q.get("platform", "unknown")),
-                carbon_grams=round(q.get("carbon_grams", 0.0), 2),  # Updated field name
+            RecentQuery.model_construct(
+                id=query_id,
+                platform=platform,
+                platform_name=PLATFORM_NAMES.get(platform, platform),
+                carbon_grams=round(carbon_grams, 2),
                 timestamp=ts_str,
             )
         )
 
-    return RecentResponse(queries=items, count=len(items))
+    return FastJSONResponse(RecentResponse.model_construct(queries=items, count=len(items)))
 
 
 @router.get("/weekly", response_model=WeeklyResponse)
@@ -221,33 +543,11 @@ async def get_weekly(user: User = Depends(get_current_user)):
     """
     Return per-day aggregated data for the last 7 days.
 
-    Each day includes the count of queries and total carbon emitted.
-    Days with no activity are included with zero values.
+    Days run from local midnight in the user's timezone. Each day includes
+    the count of queries and total carbon emitted. Days with no activity are
+    included with zero values.
     """
-    now = datetime.now(timezone.utc)
-    seven_days_ago = now - timedelta(days=6)
-    # Start of that day
-    start = seven_days_ago.replace(hour=0, minute=0, second=0, microsecond=0)
-
-    logger.info("Fetching weekly data for user {} (since {})", user.id, start.isoformat())
-
-    queries = await asyncio.to_thread(_fetch_queries_since, user.id, start)
-
-    # Group by date
-    daily: dict[str, dict] = {}
-    for q in queries:
-        ts = q.get("timestamp")
-        if ts is None:
-            continue
-        if hasattr(ts, "date"):
-            day_key = ts.strftime("%Y-%m-%d")
-        else:
-            continue
-
-        if day_key not in daily:
-            daily[day_key] = {"queries": 0, "carbon": 0.0}
-        daily[day_key]["queries"] += 1
-        daily[day_key]["carbon"] += q.get("carbon_grams", 0.0)  # Updated field name
+    logger.info("Fetching weekly data for user {} ({})", user.id, user.timezone)
 
     # Build complete 7-day array (oldest → newest)
     day_names = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
@@ -255,22 +555,24 @@ async def get_weekly(user: User = Depends(get_current_user)):
     total_q = 0
     total_c = 0.0
 
-    for i in range(7):
-        d = start + timedelta(days=i)
-        key = d.strftime("%Y-%m-%d")
-        entry = daily.get(key, {"queries": 0, "carbon": 0.0})
-        total_q += entry["queries"]
-        total_c += entry["carbon"]
+    for day, totals in (await _local_days(user))[-7:]:
+        queries, carbon = pick(totals, None)
+        total_q += queries
+        total_c += carbon
         days.append(
-            DayData(
-                date=key,
-                label=day_names[d.weekday()],
-                queries=entry["queries"],
-                carbon=round(entry["carbon"], 2),
+            DayData.model_construct(
+                date=day.isoformat(),
+                label=day_names[day.weekday()],
+                queries=queries,
+                carbon=round(carbon, 2),
             )
         )
 
-    return WeeklyResponse(days=days, total_queries=total_q, total_carbon=round(total_c, 2))
+    return FastJSONResponse(
+        WeeklyResponse.model_construct(
+            days=days, total_queries=total_q, total_carbon=round(total_c, 2), timezone=user.timezone
+        )
+    )
 
 
 @router.get("/trend", response_model=TrendResponse)
@@ -278,46 +580,26 @@ async def get_trend(user: User = Depends(get_current_user)):
     """
     Predict upcoming trend and estimated total emission for next week.
 
-    Uses 7–14 days of emission data with exponential smoothing (alpha=0.35).
+    Uses 7–14 local days of emission data with exponential smoothing (alpha=0.35).
     Returns trend direction, estimated total for next 7 days, and metadata.
     """
-    now = datetime.now(timezone.utc)
-    fourteen_days_ago = now - timedelta(days=13)
-    start = fourteen_days_ago.replace(hour=0, minute=0, second=0, microsecond=0)
-
-    logger.info("Fetching trend data for user {} (since {})", user.id, start.isoformat())
-
-    queries = await asyncio.to_thread(_fetch_queries_since, user.id, start)
-
-    # Group by date
-    daily: dict[str, float] = {}
-    for q in queries:
-        ts = q.get("timestamp")
-        if ts is None or not hasattr(ts, "date"):
-            continue
-        day_key = ts.strftime("%Y-%m-%d")
-        daily[day_key] = daily.get(day_key, 0.0) + q.get("carbon_grams", 0.0)  # Updated field name
-
-    # Build 14-day carbon series (oldest → newest)
-    carbon_series: list[float] = []
-    days_with_data = 0
-    for i in range(14):
-        d = start + timedelta(days=i)
-        key = d.strftime("%Y-%m-%d")
-        carbon = daily.get(key, 0.0)
-        carbon_series.append(carbon)
-        if carbon > 0:
-            days_with_data += 1
+    logger.info("Fetching trend data for user {} ({})", user.id, user.timezone)
+
+    # 14-day carbon series (oldest → newest)
+    carbon_series = [pick(totals, None)[1] for _, totals in await _local_days(user)]
+    days_with_data = sum(1 for carbon in carbon_series if carbon > 0)
 
     sufficient_data = days_with_data >= 7
 
     if not sufficient_data:
-        return TrendResponse(
-            trend="stable",
-            estimated_total_next_week=0.0,
-            last_smoothed_value=0.0,
-            days_used=len(carbon_series),
-            sufficient_data=False,
+        return FastJSONResponse(
+            TrendResponse(
+                trend="stable",
+                estimated_total_next_week=0.0,
+                last_smoothed_value=0.0,
+                days_used=len(carbon_series),
+                sufficient_data=False,
+            )
         )
 
     smoothed = _apply_exponential_smoothing(carbon_series, alpha=0.35)
@@ -325,12 +607,14 @@ async def get_trend(user: User = Depends(get_current_user)):
     estimated_total = 7.0 * last_smoothed
     trend = _detect_trend(smoothed)
 
-    return TrendResponse(
-        trend=trend,
-        estimated_total_next_week=round(estimated_total, 2),
-        last_smoothed_value=round(last_smoothed, 2),
-        days_used=14,
-        sufficient_data=True,
+    return FastJSONResponse(
+        TrendResponse(
+            trend=trend,
+            estimated_total_next_week=round(estimated_total, 2),
+            last_smoothed_value=round(last_smoothed, 2),
+            days_used=_HISTORY_DAYS,
+            sufficient_data=True,
+        )
     )
 
 
@@ -339,73 +623,303 @@ async def get_google_search_comparison(user: User = Depends(get_current_user)):
     """
     Compare actual LLM emissions vs forecasted if 35% were Google searches.
 
-    Uses 7-14 days of historical data, excludes google_search platform.
+    Uses 7-14 local days of historical data, excludes google_search platform.
     Returns actual emission, forecasted emission, and times_more multiplier.
     """
-    now = datetime.now(timezone.utc)
-    fourteen_days_ago = now - timedelta(days=13)
-    start = fourteen_days_ago.replace(hour=0, minute=0, second=0, microsecond=0)
-
-    logger.info("Fetching Google Search comparison for user {} (since {})", user.id, start.isoformat())
+    logger.info("Fetching Google Search comparison for user {} ({})", user.id, user.timezone)
 
-    queries = await asyncio.to_thread(_fetch_queries_since, user.id, start)
+    daily = [totals for _, totals in await _local_days(user)]
 
     # Check if we have sufficient data (at least 7 days with activity)
     # Similar logic to /trend endpoint
-    daily_activity = {}
-    for q in queries:
-        ts = q.get("timestamp")
-        if ts and hasattr(ts, "date"):
-            day_key = ts.strftime("%Y-%m-%d")
-            daily_activity[day_key] = True
-
-    days_with_data = len(daily_activity)
+    days_with_data = sum(1 for totals in daily if totals)
     sufficient_data = days_with_data >= 7
 
     if not sufficient_data:
-        return GoogleSearchComparisonResponse(
-            actual_emission=0.0,
-            forecasted_emission=0.0,
-            times_more=0.0,
-            total_llm_queries=0,
-            days_used=days_with_data,
-            sufficient_data=False,
+        return FastJSONResponse(
+            GoogleSearchComparisonResponse(
+                actual_emission=0.0,
+                forecasted_emission=0.0,
+                times_more=0.0,
+                total_llm_queries=0,
+                days_used=days_with_data,
+                sufficient_data=False,
+            )
+        )
+
+    totals: dict[str, tuple[int, float]] = {}
+    for day_totals in daily:
+        totals = merge(totals, day_totals)
+    factors = await current_factor_table()
+    comparison = _calculate_google_search_comparison(totals, factors.factors)
+
+    return FastJSONResponse(
+        GoogleSearchComparisonResponse(
+            actual_emission=comparison["actual_emission"],
+            forecasted_emission=comparison["forecasted_emission"],
+            times_more=comparison["times_more"],
+            total_llm_queries=comparison["total_llm_queries"],
+            days_used=_HISTORY_DAYS,
+            sufficient_data=True,
+        )
+    )
+
+
+def _load_range(
+    user_id: str,
+    period: str,
+    boundaries: list[datetime],
+    with_series: bool,
+) -> tuple[dict[str, tuple[int, float]], list[dict[str, tuple[int, float]]]]:
+    """Synchronously read a range total (two prefix lookups) and optionally its series."""
+    repository = get_repository()
+    total = subtract(
+        repository.bucket_prefix(user_id, period, boundaries[-1]),
+        repository.bucket_prefix(user_id, period, boundaries[0]),
+    )
+    series = repository.bucket_series(user_id, period, boundaries) if with_series else []
+    return total, series
+
+
+@router.get("/range", response_model=RangeResponse)
+async def get_range(
+    start: datetime = Query(alias="from", description="Range start (inclusive), UTC unless an offset is given"),
+    end: datetime | None = Query(default=None, alias="to", description="Range end (exclusive), default now"),
+    granularity: Granularity | None = Query(default=None, description="Return a series at this granularity"),
+    platform: str | None = Query(default=None, description="Only count this platform"),
+    user: User = Depends(get_current_user),
+):
+    """
+    Return queries and CO₂ for an arbitrary time range, optionally as a series.
+
+    Answered from the hourly/daily range buckets: the total costs two prefix
+    lookups whatever the range, a series one read per bucket in it. The range
+    is widened to whole hours (whole days for day/week/month series).
+    """
+    if platform is not None and platform not in PLATFORM_NAMES:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Unknown platform: {platform}",
+        )
+    period = "hour" if granularity in (None, "hour") else "day"
+    range_start = bucket_start(naive_utc(start), period)
+    range_end = bucket_end(naive_utc(end) if end else datetime.utcnow(), period)
+    if range_end <= range_start:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="'to' must be after 'from'",
         )
 
-    comparison = _calculate_google_search_comparison(queries)
+    boundaries = [range_start, range_end]
+    if granularity:
+        max_points = get_settings().range_max_points
+        boundaries = range_boundaries(range_start, range_end, granularity, limit=max_points)
+        if len(boundaries) - 1 > max_points:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"Range has more than {max_points} {granularity} points; use a coarser granularity",
+            )
+    logger.info("Fetching {} range {} → {} for user {}", granularity or "total", range_start, range_end, user.id)
 
-    return GoogleSearchComparisonResponse(
-        actual_emission=comparison["actual_emission"],
-        forecasted_emission=comparison["forecasted_emission"],
-        times_more=comparison["times_more"],
-        total_llm_queries=comparison["total_llm_queries"],
-        days_used=14,
-        sufficient_data=True,
+    total, series = await run_in_pool(
+        "analytics", _load_range, user.id, period, boundaries, granularity is not None
+    )
+    total_queries, total_carbon = pick(total, platform)
+    points = []
+    for edge_start, edge_end, totals in zip(boundaries, boundaries[1:], series):
+        queries, carbon = pick(totals, platform)
+        points.append(
+            RangePoint.model_construct(
+                start=edge_start.isoformat(),
+                end=edge_end.isoformat(),
+                queries=queries,
+                carbon=round(carbon, 2),
+            )
+        )
+    return FastJSONResponse(
+        RangeResponse.model_construct(
+            start=range_start.isoformat(),
+            end=range_end.isoformat(),
+            granularity=granularity,
+            platform=platform,
+            total_queries=total_queries,
+            total_carbon=round(total_carbon, 2),
+            points=points,
+        )
+    )
+
+
+@router.post("/scenarios", response_model=ScenarioResponse)
+async def evaluate_scenarios(body: ScenarioRequest, user: User = Depends(get_current_user)):
+    """
+    Evaluate what-if scenarios over the user's last ``days`` local days.
+
+    The window's per-platform totals are read once (two bucket prefix
+    lookups) and every scenario is computed from them in closed form (see
+    ``app.scenarios``). The response carries those totals and the current
+    carbon factors, so a client can re-evaluate while a slider moves.
+    """
+    factors = await current_factor_table()
+    for spec in body.scenarios:
+        named = [spec.target_platform, *(p for s in spec.shifts for p in (s.from_platform, s.to_platform))]
+        for platform in named:
+            if platform not in factors.factors:
+                raise HTTPException(
+                    status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                    detail=f"Unknown platform: {platform}",
+                )
+
+    first_day = datetime.now(user.zone).date() - timedelta(days=body.days - 1)
+    since = local_day_edges(user.zone, first_day, 0)[0]
+    until = bucket_end(datetime.utcnow(), "hour")
+    logger.info("Evaluating {} scenarios over {} days for user {}", len(body.scenarios), body.days, user.id)
+    totals, _ = await run_in_pool("analytics", _load_range, user.id, "hour", [since, until], False)
+
+    baseline_queries, baseline_carbon = pick(totals, None)
+    results = []
+    for i, spec in enumerate(body.scenarios, start=1):
+        outcome = scenarios.evaluate(
+            totals,
+            factors.factors,
+            replacement_ratio=spec.replacement_ratio,
+            target_platform=spec.target_platform,
+            shifts=[(s.from_platform, s.to_platform, s.ratio) for s in spec.shifts],
+        )
+        queries, carbon = scenarios.total(outcome)
+        change = carbon - baseline_carbon
+        results.append(
+            ScenarioResult.model_construct(
+                name=spec.name or f"Scenario {i}",
+                queries=round(queries, 2),
+                carbon=round(carbon, 2),
+                change=round(change, 2),
+                change_percent=round(change / baseline_carbon * 100, 1) if baseline_carbon else 0.0,
+                carbon_by_platform={
+                    platform: round(grams, 2) for platform, (count, grams) in sorted(outcome.items()) if count
+                },
+            )
+        )
+
+    return FastJSONResponse(
+        ScenarioResponse.model_construct(
+            start=since.isoformat(),
+            end=until.isoformat(),
+            timezone=user.timezone,
+            factor_version=factors.version,
+            baseline_queries=baseline_queries,
+            baseline_carbon=round(baseline_carbon, 2),
+            platforms=[
+                ScenarioPlatform.model_construct(
+                    platform=platform,
+                    queries=totals.get(platform, (0, 0.0))[0],
+                    carbon=round(totals.get(platform, (0, 0.0))[1], 2),
+                    factor=grams,
+                )
+                for platform, grams in sorted(factors.factors.items())
+            ],
+            scenarios=results,
+        )
+    )
+
+
+@router.get(
+    "/export",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"text/csv": {}}}},
+)
+async def export_history(user: User = Depends(get_current_user)):
+    """Stream the user's full history (summaries + raw events) as CSV."""
+    logger.info("Exporting history for user {}", user.id)
+    # Every chunk is read in the analytics pool, like any other analytics
+    # work; the first one before responding, so a busy server sheds the
+    # export with 503 rather than a truncated download.
+    chunks = _pooled_chunks(user.id, user.compacted_until)
+    first = await anext(chunks)
+    return StreamingResponse(
+        _resumed(first, chunks),
+        media_type="text/csv",
+        headers={"Content-Disposition": 'attachment; filename="carbonq-history.csv"'},
+    )
+
+
+@router.get(
+    "/stream",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"text/event-stream": {}}}},
+)
+async def stream_updates(user: User = Depends(get_current_user)):
+    """
+    Push live dashboard updates as Server-Sent Events.
+
+    ``snapshot`` carries the current stats and today's bucket; each ``query``
+    event carries the new query plus the updated stats and today's bucket.
+    A comment line is sent as heartbeat while nothing happens, and streams
+    idle for ``stream_idle_timeout_seconds`` are closed (``EventSource``
+    reconnects on its own).
+    """
+    logger.info("Opening dashboard stream for user {}", user.id)
+    return StreamingResponse(
+        _stream_events(user),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
 
 class QuerySubmit(BaseModel):
     platform: str
-    carbon_grams: float
+    # Ignored: queries are priced server-side from the carbon factor
+    # registry. Still accepted so older extension builds keep working.
+    carbon_grams: float | None = None
 
 
-@router.post("/query", status_code=status.HTTP_201_CREATED)
+@router.post(
+    "/query",
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(rate_limit("submit_query", "rate_limit_submit_query"))],
+)
 async def submit_query(
     data: QuerySubmit,
     user: User = Depends(get_current_user),
 ):
     """Submit a new query from the browser extension."""
-    logger.info("Submitting query for user {}: {} ({}g CO2)", user.id, data.platform, data.carbon_grams)
-
-    collection = get_queries_collection()
-    query_doc = {
-        "user_id": ObjectId(user.id),
-        "platform": data.platform,
-        "carbon_grams": data.carbon_grams,
-        "timestamp": datetime.utcnow(),
-    }
-
-    result = collection.insert_one(query_doc)
-    logger.info("Query submitted: {}", result.inserted_id)
+    factors = await current_factor_table()
+    carbon_grams = factors.factors.get(data.platform)
+    if carbon_grams is None:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Unknown platform: {data.platform}",
+        )
+    logger.info("Submitting query for user {}: {} ({}g CO2)", user.id, data.platform, carbon_grams)
+
+    timestamp = datetime.utcnow()
+    query_id = await run_in_pool(
+        "ingest",
+        partial(
+            get_repository().insert_query,
+            user.id,
+            data.platform,
+            carbon_grams,
+            timestamp,
+            org_id=user.org_id,
+            factor_version=factors.version,
+        ),
+    )
+    logger.info("Query submitted: {}", query_id)
+
+    _events.publish(
+        user.id,
+        {
+            "type": "query",
+            "id": query_id,
+            "platform": data.platform,
+            "carbon_grams": carbon_grams,
+            "timestamp": timestamp,
+        },
+    )
 
-    return {"id": str(result.inserted_id), "message": "Query submitted successfully"}
+    return {
+        "id": query_id,
+        "carbon_grams": carbon_grams,
+        "factor_version": factors.version,
+        "message": "Query submitted successfully",
+    }
@@ -0,0 +1,42 @@
+"""
+Carbon factors router — the current per-platform carbon estimates.
+
+Public and cacheable: responses carry ``Cache-Control`` and an ``ETag`` for
+the factor version, so the extension and any proxy revalidate cheaply. A
+body above ``compression_min_size`` is compressed once per version.
+"""
+
+from __future__ import annotations
+
+from fastapi import APIRouter, Request, Response, status
+
+from app.compression import precompressed
+from app.config import get_settings
+from app.factors import current_factor_table
+from app.responses import FastJSONResponse
+from app.schemas.factors import FactorsResponse
+
+router = APIRouter(prefix="/factors", tags=["factors"])
+
+
+@router.get("", response_model=FactorsResponse, responses={304: {"description": "Not modified"}})
+async def get_factors(request: Request):
+    """Return the latest carbon factor version."""
+    table = await current_factor_table()
+    etag = f'"factors-v{table.version}"'
+    headers = {
+        "Cache-Control": f"public, max-age={int(get_settings().factors_cache_seconds)}",
+        "ETag": etag,
+    }
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    response = FastJSONResponse(
+        FactorsResponse.model_construct(
+            version=table.version,
+            factors=table.factors,
+            created_at=table.created_at,
+        ),
+        headers=headers,
+    )
+    return precompressed(request, ("factors", table.version), response)
@@ -0,0 +1,254 @@
+"""
+Organizations router — create an organization, manage its members, and the
+org dashboard (totals, platform mix, local-day series and leaderboard).
+
+The dashboard reads the pre-aggregated org rollups (see ``app.orgs``): a few
+bucket documents per day and ``leaderboard`` member rows, whatever the
+headcount. Its members all get the same body, so its compressed bytes are
+cached by content. All endpoints require a valid session cookie; adding and removing
+other members requires the organization's admin role.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from datetime import date, datetime, timedelta
+from typing import Literal
+from zoneinfo import ZoneInfo
+
+from bson import ObjectId
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from loguru import logger
+
+from app.buckets import bucket_end, local_day_edges, pick
+from app.compression import precompressed
+from app.constants.platforms import PLATFORM_NAMES
+from app.dependencies import get_current_user, get_org_admin, get_org_member
+from app.executors import run_in_pool
+from app.models.user import User
+from app.repositories import MemberTotals, PlatformTotals, get_repository
+from app.responses import FastJSONResponse
+from app.schemas.admin import PlatformTotal
+from app.schemas.auth import MessageResponse
+from app.schemas.dashboard import DayData
+from app.schemas.orgs import (
+    LeaderboardEntry,
+    OrgCreate,
+    OrgDashboardResponse,
+    OrgMember,
+    OrgMemberAdd,
+    OrgMembersResponse,
+    OrgResponse,
+)
+from app.singleflight import SingleFlight
+
+router = APIRouter(prefix="/orgs", tags=["orgs"])
+
+# Members of one organization opening the dashboard together share a read.
+_singleflight = SingleFlight("orgs")
+
+# ── Internal helpers ────────────────────────────────────────────────────
+
+
+def _org_response(org: dict, role: str) -> OrgResponse:
+    return OrgResponse.model_construct(
+        id=str(org["_id"]),
+        name=org["name"],
+        timezone=org.get("timezone", "UTC"),
+        member_count=org.get("member_count", 0),
+        created_at=org["created_at"],
+        role=role,
+    )
+
+
+def _load_org(org_id: str) -> dict:
+    """Synchronously read the caller's organization; 404 if it is gone."""
+    org = get_repository().get_org(org_id)
+    if org is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Organization not found.")
+    return org
+
+
+def _create_org(user_id: str, name: str, timezone: str) -> dict | None:
+    """Synchronously create an organization with *user_id* as its admin; None if they joined another."""
+    repository = get_repository()
+    org = repository.insert_org(
+        {
+            "name": name,
+            "timezone": timezone,
+            "member_count": 0,
+            "created_by": ObjectId(user_id),
+            "created_at": datetime.utcnow(),
+        }
+    )
+    if repository.join_org(user_id, str(org["_id"]), "admin") is None:
+        return None
+    return repository.get_org(str(org["_id"]))
+
+
+def _add_member(org_id: str, email: str, role: str) -> dict | None:
+    """Synchronously add the user with *email*; 404 if unknown, None if already in an org."""
+    repository = get_repository()
+    user_doc = repository.get_user_by_email(email)
+    if user_doc is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"No account for {email}.")
+    return repository.join_org(str(user_doc["_id"]), org_id, role)
+
+
+def _load_dashboard(
+    org_id: str,
+    timezone: str,
+    first_day: date,
+    days: int,
+    limit: int,
+    ascending: bool,
+) -> tuple[PlatformTotals, list[PlatformTotals], list[MemberTotals]]:
+    """Synchronously read org totals, local-day series and leaderboard from the rollups."""
+    repository = get_repository()
+    totals = repository.org_bucket_prefix(org_id, "hour", bucket_end(datetime.utcnow(), "hour"))
+    daily = repository.org_bucket_series(org_id, "hour", local_day_edges(ZoneInfo(timezone), first_day, days))
+    leaderboard = repository.org_leaderboard(org_id, limit, ascending) if limit else []
+    return totals, daily, leaderboard
+
+
+# ── Endpoints ───────────────────────────────────────────────────────────
+
+
+@router.post("", response_model=OrgResponse, status_code=status.HTTP_201_CREATED)
+async def create_org(body: OrgCreate, user: User = Depends(get_current_user)):
+    """Create an organization and become its admin."""
+    if user.org_id is not None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="You already belong to an organization.",
+        )
+    org = await run_in_pool("auth", _create_org, user.id, body.name, body.timezone)
+    if org is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="You already belong to an organization.",
+        )
+    logger.info("User {} created organization {} ({})", user.id, body.name, org["_id"])
+    return FastJSONResponse(_org_response(org, "admin"), status_code=status.HTTP_201_CREATED)
+
+
+@router.get("/current", response_model=OrgResponse)
+async def get_current_org(user: User = Depends(get_org_member)):
+    """Return the caller's organization."""
+    org = await run_in_pool("auth", _load_org, user.org_id)
+    return FastJSONResponse(_org_response(org, user.org_role))
+
+
+@router.get("/current/members", response_model=OrgMembersResponse)
+async def list_members(user: User = Depends(get_org_member)):
+    """List the members of the caller's organization."""
+    docs = await run_in_pool("auth", get_repository().org_members, user.org_id)
+    members = [OrgMember.model_construct(id=str(doc["_id"]), email=doc["email"], role=doc["org_role"]) for doc in docs]
+    return FastJSONResponse(OrgMembersResponse.model_construct(members=members, count=len(members)))
+
+
+@router.post("/current/members", response_model=OrgMember, status_code=status.HTTP_201_CREATED)
+async def add_member(body: OrgMemberAdd, admin: User = Depends(get_org_admin)):
+    """Add an existing account to the organization (admins only)."""
+    user_doc = await run_in_pool("auth", _add_member, admin.org_id, body.email, body.role)
+    if user_doc is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"{body.email} already belongs to an organization.",
+        )
+    logger.info("Admin {} added {} to organization {} as {}", admin.id, body.email, admin.org_id, body.role)
+    return FastJSONResponse(
+        OrgMember.model_construct(id=str(user_doc["_id"]), email=user_doc["email"], role=body.role),
+        status_code=status.HTTP_201_CREATED,
+    )
+
+
+@router.delete("/current/members/{user_id}", response_model=MessageResponse)
+async def remove_member(user_id: str, user: User = Depends(get_org_member)):
+    """Remove a member (admins), or leave the organization (your own id)."""
+    if user_id != user.id and user.org_role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Organization admin access required.",
+        )
+    if not ObjectId.is_valid(user_id) or not await run_in_pool(
+        "auth", get_repository().leave_org, user_id, user.org_id
+    ):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not a member of this organization.")
+    logger.info("User {} removed {} from organization {}", user.id, user_id, user.org_id)
+    return MessageResponse(message="Member removed")
+
+
+@router.get("/current/dashboard", response_model=OrgDashboardResponse)
+async def get_org_dashboard(
+    request: Request,
+    days: int = Query(default=7, ge=1, le=92, description="Local days in the series, today included"),
+    leaderboard: int = Query(default=10, ge=0, le=100, description="Members on the leaderboard"),
+    order: Literal["desc", "asc"] = Query(default="desc", description="desc = highest CO₂ first"),
+    user: User = Depends(get_org_member),
+):
+    """
+    Return org totals, platform mix, per-day series and a member leaderboard.
+
+    Totals count queries made by members while they belonged to the
+    organization. Days run from local midnight in the organization's
+    timezone.
+    """
+    org = await run_in_pool("auth", _load_org, user.org_id)
+    timezone = org.get("timezone", "UTC")
+    first_day = datetime.now(ZoneInfo(timezone)).date() - timedelta(days=days - 1)
+    logger.info("Fetching org dashboard for {} ({} days)", user.org_id, days)
+
+    totals, daily, board = await _singleflight.do(
+        (user.org_id, first_day, days, leaderboard, order),
+        lambda: run_in_pool(
+            "analytics", _load_dashboard, user.org_id, timezone, first_day, days, leaderboard, order == "asc"
+        ),
+    )
+
+    total_queries, total_carbon = pick(totals, None)
+    platforms = sorted(
+        (
+            PlatformTotal.model_construct(
+                key=platform, name=PLATFORM_NAMES.get(platform, platform), count=count, carbon=round(carbon, 2)
+            )
+            for platform, (count, carbon) in totals.items()
+        ),
+        key=lambda p: p.count,
+        reverse=True,
+    )
+    day_points = []
+    for i, day_totals in enumerate(daily):
+        day = first_day + timedelta(days=i)
+        queries, carbon = pick(day_totals, None)
+        day_points.append(
+            DayData.model_construct(
+                date=day.isoformat(), label=day.strftime("%a"), queries=queries, carbon=round(carbon, 2)
+            )
+        )
+    entries = [
+        LeaderboardEntry.model_construct(
+            rank=rank,
+            user_id=row["user_id"],
+            email=row["email"],
+            queries=row["queries"],
+            carbon=round(row["carbon_grams"], 2),
+        )
+        for rank, row in enumerate(board, start=1)
+    ]
+
+    response = FastJSONResponse(
+        OrgDashboardResponse.model_construct(
+            name=org["name"],
+            timezone=timezone,
+            member_count=org.get("member_count", 0),
+            total_queries=total_queries,
+            total_carbon=round(total_carbon, 2),
+            platforms=platforms,
+            days=day_points,
+            leaderboard=entries,
+        )
+    )
+    # Unchanged until the next member query: members polling it share the bytes
+    digest = hashlib.blake2b(response.body, digest_size=16).digest()
+    return precompressed(request, ("org-dashboard", user.org_id, digest), response)
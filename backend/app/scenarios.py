@@ -0,0 +1,74 @@
+"""
+What-if scenarios — a user's emissions under hypothetical platform usage.
+
+A scenario moves shares of the user's queries between platforms: first each
+shift moves a fraction of one platform's queries to another, in order, then
+``replacement_ratio`` of every query not on the target platform is moved
+there (the Google Search comparison is 35 % → ``google_search``). Queries
+that stay keep their recorded carbon; moved ones are priced with the
+current carbon factor of the platform they land on.
+
+Everything is computed in closed form from per-platform (queries, carbon)
+totals: each platform keeps a share of its recorded queries plus a count of
+arrivals, so a scenario costs O(platforms) whatever the history size, and
+any number of scenarios share one read of the totals.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable
+
+# platform → (queries, grams of CO₂)
+Totals = dict[str, tuple[int, float]]
+
+# Share of LLM queries replaced by web searches in the headline comparison
+GOOGLE_SEARCH_RATIO = 0.35
+GOOGLE_SEARCH_PLATFORM = "google_search"
+
+
+def evaluate(
+    totals: Totals,
+    factors: dict[str, float],
+    *,
+    replacement_ratio: float = 0.0,
+    target_platform: str = GOOGLE_SEARCH_PLATFORM,
+    shifts: Iterable[tuple[str, str, float]] = (),
+) -> dict[str, tuple[float, float]]:
+    """
+    Return per-platform (queries, grams) under one scenario.
+
+    *shifts* are ``(from, to, ratio)``; ratios are fractions in ``[0, 1]`` of
+    what the source platform holds at that point. Query counts are
+    fractional once shares are moved.
+    """
+    kept = {platform: 1.0 for platform in totals}  # share of recorded queries
+    arrived: dict[str, float] = {}  # queries moved in, priced at the factor
+
+    def move(source: str, target: str, ratio: float) -> None:
+        if source == target or not ratio:
+            return
+        recorded = totals.get(source, (0, 0.0))[0] * kept.get(source, 0.0)
+        moved = ratio * (recorded + arrived.get(source, 0.0))
+        if source in kept:
+            kept[source] *= 1.0 - ratio
+        if source in arrived:
+            arrived[source] *= 1.0 - ratio
+        arrived[target] = arrived.get(target, 0.0) + moved
+
+    for source, target, ratio in shifts:
+        move(source, target, ratio)
+    if replacement_ratio:
+        for source in set(kept) | set(arrived):
+            move(source, target_platform, replacement_ratio)
+
+    result: dict[str, tuple[float, float]] = {}
+    for platform in set(kept) | set(arrived):
+        queries, carbon = totals.get(platform, (0, 0.0))
+        share, extra = kept.get(platform, 0.0), arrived.get(platform, 0.0)
+        result[platform] = (queries * share + extra, carbon * share + extra * factors.get(platform, 0.0))
+    return result
+
+
+def total(outcome: dict[str, tuple[float, float]]) -> tuple[float, float]:
+    """(queries, grams) over all platforms of an outcome."""
+    return sum(q for q, _ in outcome.values()), sum(g for _, g in outcome.values())
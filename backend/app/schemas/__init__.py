@@ -8,32 +8,85 @@ Re-export all schemas for convenient imports::
 
 from __future__ import annotations
 
+from app.schemas.admin import (
+    CohortResponse,
+    CohortStat,
+    DeletionCreate,
+    DeletionJobResponse,
+    DeletionJobsResponse,
+    PlatformMonthResponse,
+    PlatformTotal,
+)
 from app.schemas.auth import (
     AuthRequest,
     AuthResponse,
     MessageResponse,
     UserResponse,
+    UserUpdate,
 )
-from app.schemas.common import HealthResponse
+from app.schemas.common import HealthResponse, ReadinessResponse
 from app.schemas.dashboard import (
     DayData,
     PlatformStat,
+    RangePoint,
+    RangeResponse,
     RecentQuery,
     RecentResponse,
+    ScenarioPlatform,
+    ScenarioRequest,
+    ScenarioResponse,
+    ScenarioResult,
+    ScenarioShift,
+    ScenarioSpec,
     StatsResponse,
     WeeklyResponse,
 )
+from app.schemas.factors import FactorsResponse
+from app.schemas.orgs import (
+    LeaderboardEntry,
+    OrgCreate,
+    OrgDashboardResponse,
+    OrgMember,
+    OrgMemberAdd,
+    OrgMembersResponse,
+    OrgResponse,
+)
 
 __all__ = [
     "AuthRequest",
     "AuthResponse",
+    "CohortResponse",
+    "CohortStat",
     "DayData",
+    "DeletionCreate",
+    "DeletionJobResponse",
+    "DeletionJobsResponse",
+    "FactorsResponse",
     "HealthResponse",
+    "LeaderboardEntry",
     "MessageResponse",
+    "OrgCreate",
+    "OrgDashboardResponse",
+    "OrgMember",
+    "OrgMemberAdd",
+    "OrgMembersResponse",
+    "OrgResponse",
+    "PlatformMonthResponse",
     "PlatformStat",
+    "PlatformTotal",
+    "RangePoint",
+    "RangeResponse",
+    "ReadinessResponse",
     "RecentQuery",
     "RecentResponse",
+    "ScenarioPlatform",
+    "ScenarioRequest",
+    "ScenarioResponse",
+    "ScenarioResult",
+    "ScenarioShift",
+    "ScenarioSpec",
     "StatsResponse",
     "UserResponse",
+    "UserUpdate",
     "WeeklyResponse",
 ]
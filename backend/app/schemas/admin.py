@@ -0,0 +1,67 @@
+"""
+Admin schemas — request/response models for platform-wide analytics and
+account deletion endpoints.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Literal
+
+from pydantic import BaseModel
+
+
+class PlatformTotal(BaseModel):
+    key: str
+    name: str
+    count: int
+    carbon: float
+
+
+class PlatformMonthResponse(BaseModel):
+    month: str  # "YYYY-MM"
+    platforms: list[PlatformTotal]
+    total_queries: int
+    total_carbon: float
+    computed_through: datetime | None = None  # end (exclusive) of last processed day
+
+
+class CohortStat(BaseModel):
+    cohort: str  # signup month "YYYY-MM"
+    users: int
+    active_users: int
+    avg_eco_score: float
+    total_queries: int
+    total_carbon: float
+
+
+class CohortResponse(BaseModel):
+    cohorts: list[CohortStat]
+    computed_through: datetime | None = None
+
+
+class DeletionCreate(BaseModel):
+    user_id: str
+    kind: Literal["account", "purge"] = "account"
+
+
+class DeletionJobResponse(BaseModel):
+    id: str
+    user_id: str
+    email: str
+    kind: str  # "account" | "purge"
+    status: str  # "queued" | "running" | "done"
+    requested_by: str
+    requested_at: datetime
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+    total_queries: int | None = None  # raw events to delete, counted when the job starts
+    deleted: dict[str, int]  # per collection
+    progress: float | None = None  # share of total_queries deleted, 0–1
+    attempts: int = 0
+    error: str | None = None
+
+
+class DeletionJobsResponse(BaseModel):
+    jobs: list[DeletionJobResponse]
+    count: int
@@ -5,6 +5,7 @@ Auth schemas — request/response models for authentication endpoints.
 from __future__ import annotations
 
 from datetime import datetime
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
 from pydantic import BaseModel, EmailStr, field_validator
 
@@ -30,6 +31,24 @@ class AuthRequest(BaseModel):
         return v
 
 
+def check_timezone(v: str) -> str:
+    """Accept IANA timezone names only (e.g. "America/Los_Angeles")."""
+    try:
+        ZoneInfo(v)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f"Unknown timezone: {v}") from None
+    return v
+
+
+class UserUpdate(BaseModel):
+    timezone: str
+
+    @field_validator("timezone")
+    @classmethod
+    def validate_timezone(cls, v: str) -> str:
+        return check_timezone(v)
+
+
 class AuthResponse(BaseModel):
     user: UserResponse
 
@@ -39,6 +58,9 @@ class UserResponse(BaseModel):
     email: str
     created_at: datetime
     updated_at: datetime
+    timezone: str = "UTC"
+    org_id: str | None = None
+    org_role: str | None = None
 
 
 class MessageResponse(BaseModel):
@@ -10,3 +10,9 @@ from pydantic import BaseModel
 class HealthResponse(BaseModel):
     status: str
     service: str
+
+
+class ReadinessResponse(BaseModel):
+    status: str  # "ready" | "starting"
+    service: str
+    mongodb: bool
@@ -4,7 +4,7 @@ Dashboard schemas — request/response models for dashboard endpoints.
 
 from __future__ import annotations
 
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, Field
 
 
 class PlatformStat(BaseModel):
@@ -49,6 +49,7 @@ class WeeklyResponse(BaseModel):
     days: list[DayData]
     total_queries: int
     total_carbon: float
+    timezone: str = "UTC"
 
 
 class TrendResponse(BaseModel):
@@ -66,3 +67,68 @@ class GoogleSearchComparisonResponse(BaseModel):
     total_llm_queries: int  # Number of LLM queries analyzed
     days_used: int  # Number of days of data used
     sufficient_data: bool  # Whether we have at least 7 days
+
+
+class RangePoint(BaseModel):
+    start: str
+    end: str
+    queries: int
+    carbon: float
+
+
+class RangeResponse(BaseModel):
+    start: str  # effective range, widened to whole buckets
+    end: str
+    granularity: str | None = None
+    platform: str | None = None
+    total_queries: int
+    total_carbon: float
+    points: list[RangePoint]  # empty without a granularity
+
+
+class ScenarioShift(BaseModel):
+    model_config = ConfigDict(populate_by_name=True)
+
+    from_platform: str = Field(alias="from")
+    to_platform: str = Field(alias="to")
+    ratio: float = Field(ge=0.0, le=1.0)  # share of the source's queries moved
+
+
+class ScenarioSpec(BaseModel):
+    name: str | None = None
+    # Share of every query not on target_platform moved there, after the shifts
+    replacement_ratio: float = Field(default=0.0, ge=0.0, le=1.0)
+    target_platform: str = "google_search"
+    shifts: list[ScenarioShift] = Field(default_factory=list, max_length=20)
+
+
+class ScenarioRequest(BaseModel):
+    days: int = Field(default=14, ge=1, le=366)  # local days, today included
+    scenarios: list[ScenarioSpec] = Field(min_length=1, max_length=100)
+
+
+class ScenarioPlatform(BaseModel):
+    platform: str
+    queries: int
+    carbon: float
+    factor: float  # current grams per query, used for moved queries
+
+
+class ScenarioResult(BaseModel):
+    name: str
+    queries: float
+    carbon: float
+    change: float  # carbon − baseline carbon (grams)
+    change_percent: float
+    carbon_by_platform: dict[str, float]
+
+
+class ScenarioResponse(BaseModel):
+    start: str
+    end: str
+    timezone: str
+    factor_version: int
+    baseline_queries: int
+    baseline_carbon: float
+    platforms: list[ScenarioPlatform]
+    scenarios: list[ScenarioResult]
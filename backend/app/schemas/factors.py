@@ -0,0 +1,15 @@
+"""
+Carbon factor schemas — response model for the factor registry endpoint.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+
+from pydantic import BaseModel
+
+
+class FactorsResponse(BaseModel):
+    version: int
+    factors: dict[str, float]  # platform → grams of CO₂ per query
+    created_at: datetime | None = None
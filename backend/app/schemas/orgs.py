@@ -0,0 +1,68 @@
+"""
+Organization schemas — request/response models for org endpoints.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Literal
+
+from pydantic import BaseModel, EmailStr, Field, field_validator
+
+from app.schemas.admin import PlatformTotal
+from app.schemas.auth import check_timezone
+from app.schemas.dashboard import DayData
+
+
+class OrgCreate(BaseModel):
+    name: str = Field(min_length=1, max_length=100)
+    timezone: str = "UTC"  # org day views are bucketed by local midnight here
+
+    @field_validator("timezone")
+    @classmethod
+    def validate_timezone(cls, v: str) -> str:
+        return check_timezone(v)
+
+
+class OrgMemberAdd(BaseModel):
+    email: EmailStr
+    role: Literal["admin", "member"] = "member"
+
+
+class OrgResponse(BaseModel):
+    id: str
+    name: str
+    timezone: str
+    member_count: int
+    created_at: datetime
+    role: str  # the current user's role
+
+
+class OrgMember(BaseModel):
+    id: str
+    email: str
+    role: str
+
+
+class OrgMembersResponse(BaseModel):
+    members: list[OrgMember]
+    count: int
+
+
+class LeaderboardEntry(BaseModel):
+    rank: int
+    user_id: str
+    email: str
+    queries: int
+    carbon: float
+
+
+class OrgDashboardResponse(BaseModel):
+    name: str
+    timezone: str
+    member_count: int
+    total_queries: int  # since members joined
+    total_carbon: float
+    platforms: list[PlatformTotal]
+    days: list[DayData]  # oldest → newest, local days
+    leaderboard: list[LeaderboardEntry]
@@ -0,0 +1,61 @@
+"""
+Serve the API with one or more worker processes.
+
+    python -m app.server [--workers N] [--host 0.0.0.0] [--port 8000]
+
+The worker count defaults to ``Settings.web_concurrency`` (0 = one per CPU
+core). Each worker is a separate interpreter with its own GIL, MongoDB
+client, workload pools and caches (see ``app.config``); modules holding
+process-wide resources re-create them after a fork, so the app also runs
+under forking process managers.
+
+With several workers, metrics are published to ``Settings.metrics_dir`` (a
+fresh temporary directory unless one is configured) and ``/metrics``
+returns their sum.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import tempfile
+
+import uvicorn
+from loguru import logger
+
+from app.config import get_settings
+from app.logging_config import setup_logging
+
+
+def worker_count(configured: int) -> int:
+    """Resolve a configured worker count; 0 means one per CPU core."""
+    return configured if configured > 0 else (os.cpu_count() or 1)
+
+
+def main(argv: list[str] | None = None) -> int:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Serve the CarbonQ API.")
+    parser.add_argument("--workers", type=int, default=settings.web_concurrency, help="0 = one per CPU core")
+    parser.add_argument("--host", default=settings.host)
+    parser.add_argument("--port", type=int, default=settings.port)
+    args = parser.parse_args(argv)
+
+    setup_logging(debug=settings.debug)
+    workers = worker_count(args.workers)
+    if workers > 1:
+        if not settings.metrics_dir:
+            # Workers are spawned with this environment and read it as Settings.
+            os.environ["METRICS_DIR"] = tempfile.mkdtemp(prefix="carbonq-metrics-")
+        if settings.rate_limit_backend == "memory":
+            logger.warning("Rate limits apply per worker; use rate_limit_backend=redis to share them")
+        if settings.storage_backend == "memory":
+            logger.warning("storage_backend=memory keeps separate data in each worker")
+    logger.info("Serving on {}:{} with {} worker(s)", args.host, args.port, workers)
+
+    uvicorn.run("app.main:app", host=args.host, port=args.port, workers=workers)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
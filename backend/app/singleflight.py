@@ -0,0 +1,50 @@
+"""
+Single-flight request coalescing for the event loop.
+
+Concurrent callers asking for the same key share one in-flight computation
+instead of each running it: the first caller starts it, later callers await
+the same result. Nothing is cached — once the computation finishes, the next
+call for that key runs it again.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Any, TypeVar
+
+from app import metrics
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Coalesce concurrent identical calls; counts exported as metrics."""
+
+    def __init__(self, name: str) -> None:
+        self._inflight: dict[Hashable, asyncio.Task[Any]] = {}
+        self._calls = metrics.counter(f"singleflight.{name}.calls")
+        self._coalesced = metrics.counter(f"singleflight.{name}.coalesced")
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        Return the result of ``fn()``, sharing it with concurrent callers of *key*.
+
+        The computation runs in its own task, so a caller that disconnects
+        (and is cancelled) does not cancel it for the others.
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            self._calls.inc()
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+        else:
+            self._coalesced.inc()
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task[Any]) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # mark retrieved even if every caller went away
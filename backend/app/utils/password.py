@@ -2,12 +2,13 @@
 Password hashing utilities using bcrypt.
 
 Provides secure password hashing and verification with bcrypt.
+
+bcrypt is imported on first use rather than at startup (only the auth
+routes need it); the startup warm-up loads it in the background.
 """
 
 from __future__ import annotations
 
-import bcrypt
-
 
 def hash_password(password: str) -> str:
     """
@@ -19,6 +20,8 @@ def hash_password(password: str) -> str:
     Returns:
         Hashed password as a string (bcrypt returns bytes, we decode to UTF-8)
     """
+    import bcrypt
+
     # Generate salt and hash password (bcrypt handles salt automatically)
     password_bytes = password.encode("utf-8")
     salt = bcrypt.gensalt(rounds=12)  # 12 rounds is a good balance of security and performance
@@ -37,6 +40,8 @@ def verify_password(password: str, hashed: str) -> bool:
     Returns:
         True if password matches, False otherwise
     """
+    import bcrypt
+
     try:
         password_bytes = password.encode("utf-8")
         hashed_bytes = hashed.encode("utf-8")
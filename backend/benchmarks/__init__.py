@@ -0,0 +1,10 @@
+"""
+Micro-benchmarks for hot paths in the API.
+
+Run from the ``backend`` directory, e.g.::
+
+    python -m benchmarks.bench_serialization
+    python -m benchmarks.bench_repository
+    python -m benchmarks.bench_workers
+    python -m benchmarks.bench_startup
+"""
@@ -0,0 +1,68 @@
+"""
+Repository benchmark — Python cost of the dashboard read paths, without a database.
+
+Fills a ``MemoryRepository`` with one user's history and times the calls
+behind ``/stats``, ``/weekly`` and ``/recent``, so changes to the request
+handling can be measured apart from MongoDB latency.
+
+    python -m benchmarks.bench_repository [--events 50000] [--number 200]
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import timeit
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from app.buckets import local_day_edges
+from app.repositories import MemoryRepository
+from app.routers.dashboard import _aggregate
+
+_PLATFORMS = ["chatgpt", "claude", "gemini", "perplexity", "google_search"]
+
+
+def _fill(repo: MemoryRepository, user_id: str, events: int, days: int) -> None:
+    rng = random.Random(0)
+    start = datetime(2025, 1, 1)
+    span = timedelta(days=days).total_seconds()
+    for _ in range(events):
+        repo.insert_query(
+            user_id,
+            rng.choice(_PLATFORMS),
+            4.4,
+            start + timedelta(seconds=rng.random() * span),
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--events", type=int, default=50_000, help="events stored for the user")
+    parser.add_argument("--days", type=int, default=365, help="days the events are spread over")
+    parser.add_argument("--number", type=int, default=200, help="iterations per case")
+    args = parser.parse_args()
+
+    repo = MemoryRepository()
+    user_id = "0" * 24
+    fill = timeit.timeit(lambda: _fill(repo, user_id, args.events, args.days), number=1)
+    print(f"inserted {args.events} events in {fill * 1e3:.0f} ms")
+
+    week_ago = datetime(2025, 1, 1) + timedelta(days=args.days - 7)
+    # Local days with a half-hour offset split an hour bucket at every edge.
+    day_edges = local_day_edges(ZoneInfo("Asia/Kolkata"), week_ago.date() - timedelta(days=7), 14)
+    cases = [
+        ("stats (platform_totals)", lambda: _aggregate([], repo.platform_totals(user_id))),
+        ("raw week (fetch_queries)", lambda: _aggregate(repo.fetch_queries(user_id, week_ago))),
+        ("14 local days (buckets)", lambda: repo.bucket_series(user_id, "hour", day_edges)),
+        ("recent (fetch_recent 50)", lambda: repo.fetch_recent(user_id, 50)),
+    ]
+
+    print(f"{'call':<26} {'µs':>10}")
+    for label, fn in cases:
+        elapsed = timeit.timeit(fn, number=args.number)
+        print(f"{label:<26} {elapsed / args.number * 1e6:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
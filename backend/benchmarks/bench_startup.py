@@ -0,0 +1,120 @@
+"""
+Startup benchmark — import time of ``app.main`` and time to first response.
+
+Each run uses a fresh interpreter: ``python -X importtime -c "import
+app.main"`` for the import budget, then ``python -m app.server`` (in-memory
+storage, no MongoDB needed) polled until ``/health/live`` answers. The
+median of the runs is compared with the budgets; the exit status is 1 when
+one is exceeded, so the benchmark can guard against regressions in CI.
+
+    python -m benchmarks.bench_startup [--runs 5] [--import-budget-ms 1500] [--first-response-budget-ms 4000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+_IMPORT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def _env() -> dict[str, str]:
+    return {
+        **os.environ,
+        "STORAGE_BACKEND": "memory",
+        "MONGODB_URI": os.environ.get("MONGODB_URI", "mongodb://localhost:27017"),
+        "SESSION_SECRET_KEY": os.environ.get("SESSION_SECRET_KEY", "benchmark"),
+    }
+
+
+def _import_profile() -> tuple[float, dict[str, float]]:
+    """Return the cumulative import time of app.main and self time per module (ms)."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        env=_env(),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    total = 0.0
+    self_ms: dict[str, float] = {}
+    for line in result.stderr.splitlines():
+        match = _IMPORT_LINE.match(line)
+        if not match:
+            continue
+        own, cumulative, _, module = match.groups()
+        self_ms[module] = int(own) / 1000
+        if module == "app.main":
+            total = int(cumulative) / 1000
+    return total, self_ms
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _first_response_ms() -> float:
+    port = _free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "app.server", "--workers", "1", "--host", "127.0.0.1", "--port", str(port)],
+        env=_env(),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        deadline = started + 60
+        while time.perf_counter() < deadline:
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}/api/health/live").status_code == 200:
+                    return (time.perf_counter() - started) * 1000
+            except httpx.TransportError:
+                pass
+            time.sleep(0.01)
+        raise RuntimeError("server did not answer within 60 s")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per measurement")
+    parser.add_argument("--import-budget-ms", type=float, default=1500, help="median import time allowed")
+    parser.add_argument("--first-response-budget-ms", type=float, default=4000, help="median time to /health/live")
+    parser.add_argument("--top", type=int, default=10, help="slowest modules to list")
+    args = parser.parse_args()
+
+    imports = [_import_profile() for _ in range(args.runs)]
+    import_ms = statistics.median(total for total, _ in imports)
+    first_response_ms = statistics.median(_first_response_ms() for _ in range(args.runs))
+
+    slowest = sorted(imports[-1][1].items(), key=lambda item: item[1], reverse=True)[: args.top]
+    print(f"{'slowest modules (self)':<48} {'ms':>8}")
+    for module, ms in slowest:
+        print(f"{module:<48} {ms:>8.1f}")
+    print()
+
+    failed = False
+    for label, value, budget in (
+        ("import app.main", import_ms, args.import_budget_ms),
+        ("first response", first_response_ms, args.first_response_budget_ms),
+    ):
+        ok = value <= budget
+        failed |= not ok
+        print(f"{label:<20} {value:>8.0f} ms  (budget {budget:.0f} ms)  {'ok' if ok else 'OVER BUDGET'}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
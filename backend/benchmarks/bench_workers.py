@@ -0,0 +1,108 @@
+"""
+Worker scaling benchmark — request throughput for 1…N server processes.
+
+Starts ``python -m app.server`` with the in-memory storage backend (no
+MongoDB needed) for each worker count, then drives it from several client
+processes so the load generator is not the bottleneck. Throughput should
+grow with the worker count up to the number of free CPU cores.
+
+    python -m benchmarks.bench_workers [--workers 1 2 4] [--seconds 5] [--path /api/factors]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _start_server(workers: int, port: int) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "STORAGE_BACKEND": "memory",
+        "MONGODB_URI": os.environ.get("MONGODB_URI", "mongodb://localhost:27017"),
+        "SESSION_SECRET_KEY": os.environ.get("SESSION_SECRET_KEY", "benchmark"),
+        "RATE_LIMIT_ENABLED": "false",
+    }
+    server = subprocess.Popen(
+        [sys.executable, "-m", "app.server", "--workers", str(workers), "--host", "127.0.0.1", "--port", str(port)],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/api/health/ready").status_code == 200:
+                return server
+        except httpx.TransportError:
+            pass
+        time.sleep(0.2)
+    server.kill()
+    raise RuntimeError(f"server with {workers} worker(s) did not start")
+
+
+async def _drive(url: str, concurrency: int, seconds: float) -> int:
+    done = 0
+    stop = time.monotonic() + seconds
+
+    async def client_loop(client: httpx.AsyncClient) -> None:
+        nonlocal done
+        while time.monotonic() < stop:
+            response = await client.get(url)
+            response.raise_for_status()
+            done += 1
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits) as client:
+        await asyncio.gather(*(client_loop(client) for _ in range(concurrency)))
+    return done
+
+
+def _client(args: tuple[str, int, float]) -> int:
+    return asyncio.run(_drive(*args))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="worker counts to compare")
+    parser.add_argument("--clients", type=int, default=os.cpu_count() or 2, help="load-generating processes")
+    parser.add_argument("--concurrency", type=int, default=16, help="requests in flight per client process")
+    parser.add_argument("--seconds", type=float, default=5.0, help="measurement time per worker count")
+    parser.add_argument("--path", default="/api/factors", help="endpoint to request")
+    args = parser.parse_args()
+
+    print(f"{'workers':>8} {'req/s':>10} {'scaling':>8}")
+    baseline = None
+    for workers in args.workers:
+        port = _free_port()
+        server = _start_server(workers, port)
+        try:
+            url = f"http://127.0.0.1:{port}{args.path}"
+            with multiprocessing.Pool(args.clients) as pool:
+                started = time.perf_counter()
+                total = sum(pool.map(_client, [(url, args.concurrency, args.seconds)] * args.clients))
+                elapsed = time.perf_counter() - started
+        finally:
+            server.terminate()
+            server.wait()
+        rate = total / elapsed
+        baseline = baseline or rate
+        print(f"{workers:>8} {rate:>10.0f} {rate / baseline:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Shared fixtures — the API on the memory backend, MongoDB code on mongomock.
+
+Settings are read once per process, so the environment is set before the
+app is imported; tests change individual settings with ``monkeypatch``.
+Tests that need a real mongod (``live_db``) run only with ``TEST_MONGODB_URI``
+or ``MONGODB_URI`` set.
+"""
+
+from __future__ import annotations
+
+import os
+
+# A real server, for the tests that need one (query plans); skipped without
+TEST_MONGODB_URI = os.environ.get("TEST_MONGODB_URI") or os.environ.get("MONGODB_URI")
+
+os.environ.setdefault("MONGODB_URI", "mongodb://localhost:27017")
+os.environ.setdefault("SESSION_SECRET_KEY", "test-secret")
+os.environ.setdefault("STORAGE_BACKEND", "memory")
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+import uuid  # noqa: E402
+from collections.abc import Callable, Iterator  # noqa: E402
+from datetime import datetime  # noqa: E402
+from typing import Any  # noqa: E402
+
+import mongomock  # noqa: E402
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from pymongo import MongoClient  # noqa: E402
+from pymongo.database import Database  # noqa: E402
+
+from app.config import Settings, get_settings  # noqa: E402
+from app.dependencies import get_current_user  # noqa: E402
+from app.executors import shutdown_pools  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.repositories import MemoryRepository, MongoRepository, Repository, get_repository  # noqa: E402
+
+
+@pytest.fixture
+def settings() -> Settings:
+    """The process settings; change them with ``monkeypatch.setattr``."""
+    return get_settings()
+
+
+@pytest.fixture
+def repository() -> Iterator[MemoryRepository]:
+    """A fresh memory repository, returned by ``get_repository()`` during the test."""
+    get_repository.cache_clear()
+    repo = get_repository()
+    assert isinstance(repo, MemoryRepository)
+    yield repo
+    get_repository.cache_clear()
+
+
+@pytest.fixture
+def mongo_db(monkeypatch: pytest.MonkeyPatch) -> Database:
+    """A mongomock database, used by ``MongoRepository()`` during the test."""
+    db = mongomock.MongoClient().carbonq
+    monkeypatch.setattr("app.repositories.mongo.get_database", lambda: db)
+    monkeypatch.setattr("app.repositories.mongo.get_analytics_database", lambda: db)
+    return db
+
+
+@pytest.fixture
+def live_db() -> Iterator[Database]:
+    """A scratch database on the server at ``TEST_MONGODB_URI``, dropped afterwards."""
+    if not TEST_MONGODB_URI:
+        pytest.skip("needs a MongoDB server: set TEST_MONGODB_URI")
+    client: MongoClient = MongoClient(TEST_MONGODB_URI, serverSelectionTimeoutMS=5000)
+    db = client[f"carbonq_test_{uuid.uuid4().hex[:12]}"]
+    try:
+        yield db
+    finally:
+        client.drop_database(db.name)
+        client.close()
+
+
+@pytest.fixture
+def mongo_repository(
+    mongo_db: Database, settings: Settings, monkeypatch: pytest.MonkeyPatch
+) -> Iterator[MongoRepository]:
+    """``get_repository()`` on ``mongo_db`` during the test."""
+    monkeypatch.setattr(settings, "storage_backend", "mongo")
+    get_repository.cache_clear()
+    repo = get_repository()
+    assert isinstance(repo, MongoRepository)
+    yield repo
+    get_repository.cache_clear()
+
+
+@pytest.fixture
+def new_user() -> Callable[..., dict[str, Any]]:
+    """Factory inserting a user document into a repository."""
+
+    def new_user(repository: Repository, email: str = "user@example.com", **fields: Any) -> dict[str, Any]:
+        now = datetime.utcnow()
+        return repository.insert_user(
+            {"email": email, "password_hash": "x", "created_at": now, "updated_at": now, **fields}
+        )
+
+    return new_user
+
+
+@pytest.fixture
+def client() -> Iterator[TestClient]:
+    """A client for the app; ``sign_in`` picks the user its requests are made as."""
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+    shutdown_pools()
+
+
+@pytest.fixture
+def sign_in() -> Callable[[dict[str, Any]], None]:
+    """Make the test client's requests as the user with this document."""
+
+    def sign_in(doc: dict[str, Any]) -> None:
+        app.dependency_overrides[get_current_user] = lambda: User.from_db(doc)
+
+    return sign_in
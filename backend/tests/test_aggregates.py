@@ -0,0 +1,186 @@
+"""The aggregate worker (app.aggregates) on mongomock, which has no change streams or transactions."""
+
+from __future__ import annotations
+
+import calendar
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import mongomock
+import pytest
+from bson import ObjectId, Timestamp
+from pymongo import UpdateOne
+
+from app import aggregates, buckets, orgs
+from app.deletions import run_pending
+from app.jobs.state import save_checkpoint
+from app.locks import acquire_lock, owner_id
+from app.models.query import STANDARD_LAYOUT
+
+OWNER = owner_id()
+
+
+class _Session:
+    def with_transaction(self, callback):
+        return callback(None)
+
+
+@pytest.fixture
+def stream_db(mongo_db, mongo_repository, settings, monkeypatch):
+    """``mongo_db`` with ingest deferring events to a worker that holds the lock."""
+    monkeypatch.setattr(settings, "aggregates_mode", "stream")
+    monkeypatch.setattr(mongo_db.client, "start_session", contextmanager(lambda: iter([_Session()])), raising=False)
+    assert acquire_lock(mongo_db, aggregates.JOB_NAME, OWNER, aggregates.LOCK_TTL_SECONDS)
+    return mongo_db
+
+
+def _change(doc: dict) -> dict:
+    """The change stream's event for an insert, committed at the event's own time."""
+    committed = Timestamp(calendar.timegm(doc["timestamp"].timetuple()), 1)
+    return {"_id": {"_data": str(doc["_id"])}, "clusterTime": committed, "fullDocument": doc}
+
+
+def _docs(db, query_ids: list[str]) -> list[dict]:
+    return [db[STANDARD_LAYOUT.collection].find_one({"_id": ObjectId(query_id)}) for query_id in query_ids]
+
+
+def _replay(db, query_ids: list[str]) -> None:
+    aggregates.apply_batch(db, [_change(doc) for doc in _docs(db, query_ids)], OWNER)
+
+
+def _range_total(client, since: datetime) -> tuple[int, float]:
+    response = client.get("/api/dashboard/range", params={"from": since.isoformat()})
+    assert response.status_code == 200
+    body = response.json()
+    return body["total_queries"], body["total_carbon"]
+
+
+def _stored(db, collection: str) -> list[dict]:
+    docs = [{k: v for k, v in doc.items() if k != "_id"} for doc in db[collection].find()]
+    return sorted(docs, key=lambda doc: (doc.get("period", ""), doc.get("start", datetime.min)))
+
+
+def test_merge_matches_inline_ingest():
+    user_id, org_id = ObjectId(), ObjectId()
+    at = datetime(2026, 3, 1, 10, 20)
+    docs = [
+        {"user_id": user_id, "platform": "claude", "carbon_grams": 1.5, "timestamp": at, "org_id": org_id},
+        {"user_id": user_id, "platform": "claude", "carbon_grams": 2.0, "timestamp": at, "org_id": org_id},
+        {"user_id": user_id, "platform": "gemini", "carbon_grams": 0.5, "timestamp": at + timedelta(minutes=50)},
+        {"user_id": user_id, "platform": "gemini", "carbon_grams": 0.25, "timestamp": at + timedelta(days=1)},
+    ]
+    merged_db, inline_db = mongomock.MongoClient().merged, mongomock.MongoClient().inline
+
+    merged = aggregates.merge({"fullDocument": doc} for doc in docs)
+    assert len(merged[orgs.MEMBER_TOTALS_COLLECTION]) == 1
+    for collection, entries in merged.items():
+        merged_db[collection].bulk_write([UpdateOne(filter_, {"$inc": inc}, upsert=True) for filter_, inc in entries])
+    for doc in docs:
+        args = (doc["platform"], doc["carbon_grams"], doc["timestamp"])
+        inline_db[buckets.BUCKETS_COLLECTION].bulk_write(buckets.record_ops(user_id, *args))
+        if "org_id" in doc:
+            inline_db[buckets.ORG_BUCKETS.collection].bulk_write(
+                buckets.record_ops(org_id, *args, buckets.ORG_BUCKETS)
+            )
+            inline_db[orgs.MEMBER_TOTALS_COLLECTION].bulk_write([orgs.member_op(org_id, user_id, *args[:2])])
+
+    for collection in (buckets.BUCKETS_COLLECTION, buckets.ORG_BUCKETS.collection, orgs.MEMBER_TOTALS_COLLECTION):
+        assert _stored(merged_db, collection) == _stored(inline_db, collection)
+
+
+def test_nothing_is_sealed_before_the_worker_runs(stream_db):
+    assert aggregates.applied_through(stream_db) is None
+    assert buckets.seal_line("hour", db=stream_db) == datetime.min
+    at = datetime(2026, 3, 1, 10)
+    event = {"_id": ObjectId(), "user_id": ObjectId(), "platform": "claude", "carbon_grams": 1.0, "timestamp": at}
+    aggregates.apply_batch(stream_db, [_change(event)], OWNER)
+    assert aggregates.applied_through(stream_db) == at
+    assert buckets.seal_line("hour", db=stream_db) == datetime(2026, 3, 1, 9)
+
+
+def test_range_after_the_worker_catches_up(stream_db, mongo_repository, new_user, client, sign_in):
+    doc = new_user(mongo_repository)
+    user_id = str(doc["_id"])
+    sign_in(doc)
+    now = datetime.utcnow()
+    since = buckets.bucket_start(now - timedelta(days=1), "hour")
+    hour = buckets.bucket_start(now - timedelta(hours=3), "hour")
+    events = [
+        (now - timedelta(hours=20), 1.0),
+        (hour + timedelta(minutes=10), 2.0),
+        (hour + timedelta(minutes=40), 4.0),
+    ]
+    query_ids = [mongo_repository.insert_query(user_id, "claude", carbon, ts) for ts, carbon in events]
+
+    # The worker is behind when the range is read, which stores prefix sums
+    # for the buckets it can seal; the event it replays next falls in a bucket
+    # it has already incremented
+    _replay(stream_db, query_ids[:2])
+    assert _range_total(client, since) == (2, pytest.approx(3.0))
+    assert stream_db[buckets.BUCKETS_COLLECTION].count_documents({"cum_count": {"$exists": True}}) > 0
+
+    _replay(stream_db, query_ids[2:])
+    assert _range_total(client, since) == (3, pytest.approx(7.0))
+    for period in buckets.PERIODS:
+        at = buckets.bucket_end(now, period)
+        assert buckets.prefix(stream_db, ObjectId(user_id), period, at) == {"claude": (3, pytest.approx(7.0))}
+
+
+# ── Deletions while events are still in the stream ─────────────────────
+
+
+def _member_with_events(repository, new_user, carbons: list[float]) -> tuple[str, str, list[str]]:
+    user_id = str(new_user(repository)["_id"])
+    org = repository.insert_org({"name": "Acme", "created_at": datetime.utcnow(), "member_count": 0})
+    repository.join_org(user_id, str(org["_id"]), "member")
+    now = datetime.utcnow()
+    query_ids = [
+        repository.insert_query(user_id, "claude", carbon, now - timedelta(hours=hours), org_id=str(org["_id"]))
+        for hours, carbon in zip(range(len(carbons), 0, -1), carbons)
+    ]
+    return user_id, str(org["_id"]), query_ids
+
+
+def _run_deletions(db) -> dict[str, int]:
+    return run_pending(db, STANDARD_LAYOUT, batch_size=10, max_per_second=1e9)
+
+
+def _worker_idle(db) -> None:
+    save_checkpoint(db, aggregates.JOB_NAME, applied_through=datetime.utcnow())
+
+
+def test_purge_waits_for_the_worker(stream_db, mongo_repository, new_user):
+    user_id, org_id, query_ids = _member_with_events(mongo_repository, new_user, [1.0, 2.0])
+    _replay(stream_db, query_ids[:1])
+    pending = _docs(stream_db, query_ids[1:])
+    mongo_repository.request_deletion(user_id, "purge", "user@example.com")
+    kept_id = mongo_repository.insert_query(user_id, "claude", 4.0, datetime.utcnow(), org_id=org_id)
+
+    # The second event is still in the stream: raw events go, derived data waits
+    assert _run_deletions(stream_db) == {"jobs": 0, "waiting": 1, "failed": 0, "queries": 0}
+    assert [record.carbon_grams for record in mongo_repository.fetch_queries(user_id)] == [4.0]
+
+    aggregates.apply_batch(stream_db, [_change(doc) for doc in pending + _docs(stream_db, [kept_id])], OWNER)
+    _worker_idle(stream_db)
+    assert _run_deletions(stream_db)["jobs"] == 1
+
+    totals = buckets.prefix(stream_db, ObjectId(user_id), "hour", datetime.utcnow() + timedelta(hours=1))
+    assert totals == {"claude": (1, pytest.approx(4.0))}
+    row = stream_db[orgs.MEMBER_TOTALS_COLLECTION].find_one({"user_id": ObjectId(user_id)})
+    assert (row["total_count"], row["total_carbon"]) == (1, pytest.approx(4.0))
+
+
+def test_deleted_account_is_not_recreated_by_the_worker(stream_db, mongo_repository, new_user):
+    user_id, _, query_ids = _member_with_events(mongo_repository, new_user, [1.0, 2.0, 3.0])
+    _replay(stream_db, query_ids[:1])
+    pending = _docs(stream_db, query_ids[1:])
+    mongo_repository.request_deletion(user_id, "account", "admin@example.com")
+
+    assert _run_deletions(stream_db)["waiting"] == 1
+    aggregates.apply_batch(stream_db, [_change(doc) for doc in pending], OWNER)
+    _worker_idle(stream_db)
+    assert _run_deletions(stream_db)["jobs"] == 1
+
+    user = ObjectId(user_id)
+    assert stream_db[buckets.BUCKETS_COLLECTION].count_documents({"user_id": user}) == 0
+    assert stream_db[orgs.MEMBER_TOTALS_COLLECTION].count_documents({"user_id": user}) == 0
@@ -0,0 +1,147 @@
+"""Range buckets and prefix sums (app.buckets, MemoryRepository) against brute-force totals."""
+
+from __future__ import annotations
+
+import random
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+from app import buckets
+from app.models.query import STANDARD_LAYOUT
+from app.repositories import MongoRepository
+
+PLATFORMS = ("chatgpt", "claude", "gemini")
+START = datetime(2026, 3, 1)
+
+
+def _events(count: int = 300, days: int = 6, seed: int = 7) -> list[tuple[str, float, datetime]]:
+    rng = random.Random(seed)
+    return sorted(
+        (
+            (
+                rng.choice(PLATFORMS),
+                round(rng.uniform(0.1, 5.0), 3),
+                START + timedelta(minutes=rng.randrange(days * 1440)),
+            )
+            for _ in range(count)
+        ),
+        key=lambda event: event[2],
+    )
+
+
+def _brute(events, since: datetime | None, until: datetime) -> dict[str, tuple[int, float]]:
+    totals: dict[str, tuple[int, float]] = {}
+    for platform, carbon, ts in events:
+        if (since is None or ts >= since) and ts < until:
+            count, grams = totals.get(platform, (0, 0.0))
+            totals[platform] = (count + 1, grams + carbon)
+    return totals
+
+
+def _assert_totals(actual, expected) -> None:
+    actual = {p: v for p, v in actual.items() if v[0]}
+    assert actual.keys() == expected.keys()
+    for platform, (count, grams) in expected.items():
+        assert actual[platform][0] == count
+        assert actual[platform][1] == pytest.approx(grams)
+
+
+def _instants() -> list[datetime]:
+    rng = random.Random(3)
+    return [START + timedelta(minutes=15 * rng.randrange(7 * 96)) for _ in range(40)]
+
+
+# ── Memory backend ──────────────────────────────────────────────────────
+
+
+def test_memory_prefix_and_series_match_events(repository, new_user):
+    user_id = str(new_user(repository)["_id"])
+    events = _events()
+    for platform, carbon, ts in events:
+        repository.insert_query(user_id, platform, carbon, ts)
+
+    for at in _instants():  # quarter hours split their hour bucket
+        _assert_totals(repository.bucket_prefix(user_id, "hour", at), _brute(events, None, at))
+    day_edges = [START + timedelta(days=d) for d in range(8)]
+    for before, after, totals in zip(day_edges, day_edges[1:], repository.bucket_series(user_id, "day", day_edges)):
+        _assert_totals(totals, _brute(events, before, after))
+
+
+def test_memory_prefix_after_older_insert(repository, new_user):
+    user_id = str(new_user(repository)["_id"])
+    events = _events(100)
+    for platform, carbon, ts in events:
+        repository.insert_query(user_id, platform, carbon, ts)
+    at = START + timedelta(days=5)
+    repository.bucket_prefix(user_id, "hour", at)  # extends the cached prefix sums
+
+    late = ("claude", 2.5, START + timedelta(days=1, minutes=20))
+    repository.insert_query(user_id, *late)
+    _assert_totals(repository.bucket_prefix(user_id, "hour", at), _brute(events + [late], None, at))
+
+
+def test_range_endpoint(client, sign_in, repository, new_user):
+    doc = new_user(repository)
+    events = _events()
+    for platform, carbon, ts in events:
+        repository.insert_query(str(doc["_id"]), platform, carbon, ts)
+    sign_in(doc)
+
+    since, until = START + timedelta(days=1, hours=5), START + timedelta(days=4, hours=17)
+    response = client.get("/api/dashboard/range", params={"from": since.isoformat(), "to": until.isoformat()})
+    assert response.status_code == 200
+    expected = _brute(events, since, until)
+    body = response.json()
+    assert body["total_queries"] == sum(count for count, _ in expected.values())
+    assert body["total_carbon"] == pytest.approx(sum(grams for _, grams in expected.values()), abs=0.01)
+
+    response = client.get(
+        "/api/dashboard/range", params={"from": since.isoformat(), "to": until.isoformat(), "granularity": "day"}
+    )
+    points = response.json()["points"]
+    assert sum(point["queries"] for point in points) == sum(
+        count for count, _ in _brute(events, since.replace(hour=0), until.replace(hour=0) + timedelta(days=1)).values()
+    )
+
+
+# ── MongoDB buckets (prefix sums stored on sealed buckets) ──────────────
+
+
+@pytest.fixture
+def mongo_events(mongo_db):
+    repo = MongoRepository(db=mongo_db, layout=STANDARD_LAYOUT)
+    user_id = ObjectId()
+    events = _events()
+    for platform, carbon, ts in events:
+        repo.insert_query(str(user_id), platform, carbon, ts)
+    return user_id, events
+
+
+@pytest.mark.parametrize("now_days", [2, 4, 30])
+def test_mongo_prefix_with_seal_line(mongo_db, mongo_events, now_days):
+    user_id, events = mongo_events
+    now = START + timedelta(days=now_days)
+    for at in _instants():
+        _assert_totals(buckets.prefix(mongo_db, user_id, "hour", at, now=now), _brute(events, None, at))
+    sealed = mongo_db[buckets.BUCKETS_COLLECTION].count_documents({"user_id": user_id, "cum_count": {"$exists": True}})
+    assert sealed > 0
+    # Second pass reads the stored prefix sums
+    for at in _instants():
+        _assert_totals(buckets.prefix(mongo_db, user_id, "hour", at, now=now), _brute(events, None, at))
+
+
+def test_mongo_series_and_rebuild(mongo_db, mongo_events):
+    user_id, events = mongo_events
+    edges = [START + timedelta(hours=6 * i) for i in range(30)]
+    for before, after, totals in zip(edges, edges[1:], buckets.series(mongo_db, user_id, "hour", edges)):
+        _assert_totals(totals, _brute(events, before, after))
+
+    at = START + timedelta(days=3, hours=7, minutes=45)
+    expected = _brute(events, None, at)
+    _assert_totals(buckets.prefix(mongo_db, user_id, "hour", at), expected)
+    buckets.rebuild_user(mongo_db, STANDARD_LAYOUT, user_id)
+    _assert_totals(buckets.prefix(mongo_db, user_id, "hour", at), expected)
+    midnight = START + timedelta(days=3)
+    _assert_totals(buckets.prefix(mongo_db, user_id, "day", midnight), _brute(events, None, midnight))
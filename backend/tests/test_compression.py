@@ -0,0 +1,59 @@
+"""Response compression (app.compression) and its cache of compressed payloads."""
+
+from __future__ import annotations
+
+import gzip
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import compression, metrics
+
+
+@pytest.fixture
+def org_members(repository, new_user):
+    """Twelve members of one organization with a query each, so the dashboard is over 1 KB."""
+    org = repository.insert_org({"name": "Acme", "created_at": datetime.utcnow(), "member_count": 0})
+    org_id = str(org["_id"])
+    members = []
+    for i in range(12):
+        user_id = str(new_user(repository, email=f"member-{i:02d}@acme.example.com")["_id"])
+        repository.join_org(user_id, org_id, "admin" if i == 0 else "member")
+        repository.insert_query(user_id, "claude", 1.0 + i, datetime.utcnow() - timedelta(minutes=i), org_id=org_id)
+        members.append(repository.get_user(user_id))
+    return members
+
+
+def test_negotiate_prefers_the_best_accepted_encoding():
+    assert compression.negotiate("") is None
+    assert compression.negotiate("gzip") == "gzip"
+    assert compression.negotiate("gzip;q=0") is None
+    assert compression.negotiate("gzip, br, zstd") == compression.ENCODINGS[0]
+
+
+def test_org_dashboard_is_compressed_once(client, sign_in, org_members, monkeypatch):
+    monkeypatch.setattr(compression, "_payloads", OrderedDict())
+    hits, misses = metrics.counter("compression.cache.hits"), metrics.counter("compression.cache.misses")
+    hits_before, misses_before = hits.snapshot(), misses.snapshot()
+
+    bodies = []
+    for member in (org_members[0], org_members[5]):
+        sign_in(member)
+        response = client.get("/api/orgs/current/dashboard", headers={"Accept-Encoding": "gzip"})
+        assert response.status_code == 200
+        assert response.headers["content-encoding"] == "gzip"
+        assert len(response.content) >= compression.get_settings().compression_min_size
+        bodies.append(response.content)
+
+    assert bodies[0] == bodies[1]
+    assert len(compression._payloads) == 1
+    [data] = compression._payloads.values()
+    assert gzip.decompress(data) == bodies[0]
+    assert (misses.snapshot() - misses_before, hits.snapshot() - hits_before) == (1, 1)
+
+
+def test_small_bodies_are_not_compressed(client):
+    response = client.get("/api/factors", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert "content-encoding" not in response.headers
@@ -0,0 +1,90 @@
+"""Streamed dashboard responses (CSV export, live updates) under analytics pool load shedding."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.executors import WorkloadPool, shutdown_pools
+from app.models.user import User
+from app.routers import dashboard
+
+
+@pytest.fixture
+def admissions(monkeypatch):
+    """``admissions(True, False, ...)``: whether each next pool caller is admitted (then all are)."""
+    admit = WorkloadPool._admit
+    state = {"plan": [], "rejected": 0}
+
+    async def planned(self: WorkloadPool) -> None:
+        if state["plan"] and not state["plan"].pop(0):
+            state["rejected"] += 1
+            raise self._reject("test")
+        await admit(self)
+
+    monkeypatch.setattr(WorkloadPool, "_admit", planned)
+
+    def admissions(*plan: bool) -> dict:
+        state["plan"] = list(plan)
+        return state
+
+    return admissions
+
+
+def _history(repository, new_user, count: int) -> dict:
+    doc = new_user(repository)
+    start = datetime(2026, 3, 1)
+    for i in range(count):
+        repository.insert_query(str(doc["_id"]), "claude", 0.5, start + timedelta(minutes=i))
+    return doc
+
+
+def test_export_is_not_shed_once_started(client, sign_in, repository, new_user, admissions, monkeypatch):
+    sign_in(_history(repository, new_user, 9))
+    monkeypatch.setattr(dashboard, "_EXPORT_CHUNK_ROWS", 2)
+    state = admissions(True, *[False] * 10)
+
+    response = client.get("/api/dashboard/export")
+    assert response.status_code == 200
+    lines = response.text.splitlines()
+    assert lines[0].startswith("timestamp,platform") and len(lines) == 10
+    assert state["rejected"] == 0
+
+
+def test_busy_export_is_rejected_before_it_starts(client, sign_in, repository, new_user, admissions):
+    sign_in(_history(repository, new_user, 3))
+    admissions(False)
+
+    response = client.get("/api/dashboard/export")
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+
+
+def test_stream_skips_a_shed_catch_up_poll(repository, new_user, settings, admissions, monkeypatch):
+    doc = new_user(repository)
+    monkeypatch.setattr(settings, "web_concurrency", 2)
+    monkeypatch.setattr(settings, "stream_catch_up_seconds", 0.02)
+    state = admissions(True, False, False, False)  # the snapshot, then three catch-up polls shed
+
+    async def scenario() -> list[str]:
+        events = dashboard._stream_events(User.from_db(doc))
+        try:
+            first = await anext(events)
+            repository.insert_query(str(doc["_id"]), "claude", 1.5, datetime.utcnow())
+            return [first, await asyncio.wait_for(anext(events), 2)]
+        finally:
+            await events.aclose()
+
+    shutdown_pools()
+    try:
+        snapshot, query = asyncio.run(scenario())
+    finally:
+        shutdown_pools()
+    assert state["rejected"] == 3
+    assert snapshot.startswith("event: snapshot")
+    assert query.startswith("event: query")
+    data = json.loads(query.split("data: ", 1)[1])
+    assert data["stats"]["total_queries"] == 1
@@ -0,0 +1,126 @@
+"""Account deletions and data purges (app.deletions, MemoryRepository)."""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+from app import buckets, orgs
+from app.deletions import DELETIONS_COLLECTION, run_job, run_pending
+from app.models.query import STANDARD_LAYOUT
+
+PAST = datetime(2026, 1, 5, 12)
+
+
+def _fill(repository, user_id: str, org_id: str | None = None) -> tuple[int, float]:
+    """Five events long ago and three after any deletion request; return the later ones' totals."""
+    for i in range(5):
+        repository.insert_query(user_id, "chatgpt", 1.0, PAST + timedelta(hours=i), org_id=org_id)
+    soon = datetime.utcnow() + timedelta(minutes=5)
+    for i in range(3):
+        repository.insert_query(user_id, "claude", 2.0, soon + timedelta(seconds=i), org_id=org_id)
+    return 3, 6.0
+
+
+def _new_org(repository, user_id: str) -> str:
+    org = repository.insert_org({"name": "Acme", "created_at": datetime.utcnow(), "member_count": 0})
+    repository.join_org(user_id, str(org["_id"]), "member")
+    return str(org["_id"])
+
+
+# ── Memory backend ──────────────────────────────────────────────────────
+
+
+def test_memory_account_deletion(repository, new_user):
+    user_id = str(new_user(repository)["_id"])
+    org_id = _new_org(repository, user_id)
+    _fill(repository, user_id, org_id)
+
+    job = repository.request_deletion(user_id, "account", "admin@example.com")
+    assert job["status"] == "done"
+    assert job["deleted"]["queries"] == 8
+    assert repository.get_user(user_id) is None
+    assert repository.fetch_queries(user_id) == []
+    assert repository.bucket_prefix(user_id, "day", datetime.utcnow() + timedelta(days=1)) == {}
+    assert repository.get_org(org_id)["member_count"] == 0
+    assert repository.org_leaderboard(org_id, 10) == []
+
+
+def test_memory_purge_keeps_later_events_and_membership(repository, new_user):
+    user_id = str(new_user(repository)["_id"])
+    org_id = _new_org(repository, user_id)
+    kept_count, kept_carbon = _fill(repository, user_id, org_id)
+
+    job = repository.request_deletion(user_id, "purge", "user@example.com")
+    assert job["deleted"]["queries"] == 5
+    assert [record.platform for record in repository.fetch_queries(user_id)] == ["claude"] * kept_count
+    totals = repository.bucket_prefix(user_id, "day", datetime.utcnow() + timedelta(days=1))
+    assert totals == {"claude": (kept_count, kept_carbon)}
+    [row] = repository.org_leaderboard(org_id, 10)
+    assert (row["user_id"], row["queries"], row["carbon_grams"]) == (user_id, kept_count, kept_carbon)
+
+
+def test_delete_me_endpoint(client, sign_in, repository, new_user):
+    doc = new_user(repository)
+    _fill(repository, str(doc["_id"]))
+    sign_in(doc)
+
+    response = client.delete("/api/auth/me")
+    assert response.status_code == 202
+    assert repository.get_user(str(doc["_id"])) is None
+    assert repository.fetch_queries(str(doc["_id"])) == []
+
+
+# ── MongoDB job ─────────────────────────────────────────────────────────
+
+
+def _run_pending(db) -> dict[str, int]:
+    return run_pending(db, STANDARD_LAYOUT, batch_size=2, max_per_second=1e9)
+
+
+def test_mongo_purge_rebuilds_buckets_and_member_row(mongo_db, mongo_repository, new_user):
+    user_id = str(new_user(mongo_repository)["_id"])
+    org_id = _new_org(mongo_repository, user_id)
+    kept_count, kept_carbon = _fill(mongo_repository, user_id, org_id)
+
+    job = mongo_repository.request_deletion(user_id, "purge", "user@example.com")
+    assert _run_pending(mongo_db) == {"jobs": 1, "waiting": 0, "failed": 0, "queries": 5}
+
+    job = mongo_repository.get_deletion(str(job["_id"]))
+    assert job["status"] == "done" and job["total_queries"] == 5
+    assert mongo_repository.get_user(user_id) is not None
+    assert len(mongo_repository.fetch_queries(user_id)) == kept_count
+    totals = buckets.prefix(mongo_db, ObjectId(user_id), "day", datetime.utcnow() + timedelta(days=1))
+    assert totals["claude"][0] == kept_count and "chatgpt" not in totals
+    row = mongo_db[orgs.MEMBER_TOTALS_COLLECTION].find_one({"user_id": ObjectId(user_id)})
+    assert row["org_id"] == ObjectId(org_id)
+    assert (row["total_count"], row["total_carbon"]) == (kept_count, pytest.approx(kept_carbon))
+
+
+def test_mongo_account_deletion_resumes_after_a_crash(mongo_db, mongo_repository, new_user):
+    user_id = str(new_user(mongo_repository)["_id"])
+    org_id = _new_org(mongo_repository, user_id)
+    _fill(mongo_repository, user_id, org_id)
+    job = mongo_repository.request_deletion(user_id, "account", "admin@example.com")
+    assert mongo_repository.get_user(user_id) is None
+    assert mongo_repository.get_org(org_id)["member_count"] == 0
+
+    def crash(_: float) -> None:
+        raise SystemExit("killed")
+
+    job = mongo_db[DELETIONS_COLLECTION].find_one({"_id": job["_id"]})
+    with pytest.raises(SystemExit):
+        run_job(mongo_db, STANDARD_LAYOUT, job, batch_size=2, max_per_second=1.0, sleep=crash)
+    interrupted = mongo_repository.get_deletion(str(job["_id"]))
+    assert interrupted["status"] == "running" and interrupted["deleted"]["queries"] == 2
+
+    assert _run_pending(mongo_db)["jobs"] == 1
+    done = mongo_repository.get_deletion(str(job["_id"]))
+    assert done["status"] == "done"
+    assert done["deleted"]["queries"] == done["total_queries"] == 8
+    assert mongo_db.queries.count_documents({"user_id": ObjectId(user_id)}) == 0
+    assert mongo_db[buckets.BUCKETS_COLLECTION].count_documents({"user_id": ObjectId(user_id)}) == 0
+    assert mongo_db[orgs.MEMBER_TOTALS_COLLECTION].count_documents({"user_id": ObjectId(user_id)}) == 0
+    assert mongo_repository.get_org(org_id)["member_count"] == 0
@@ -0,0 +1,17 @@
+"""Every API query shape is served by an index (app.index_advisor), on a real mongod."""
+
+from __future__ import annotations
+
+import pytest
+
+from app.index_advisor import check_query_shapes, query_shapes
+from app.indexes import ensure_indexes
+from app.models.query import QUERY_LAYOUTS
+
+
+@pytest.mark.parametrize("storage", sorted(QUERY_LAYOUTS))
+def test_query_shapes_use_indexes(live_db, settings, monkeypatch, storage):
+    monkeypatch.setattr(settings, "queries_storage", storage)
+    ensure_indexes(live_db)
+
+    assert check_query_shapes(live_db, query_shapes(QUERY_LAYOUTS[storage])) == []
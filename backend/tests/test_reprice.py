@@ -0,0 +1,43 @@
+"""Re-pricing stored events (app.jobs.reprice) on mongomock, for both storage layouts."""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+from app.jobs import reprice
+from app.models.factors import FactorTable
+from app.models.query import QUERY_LAYOUTS
+from app.repositories import MongoRepository
+
+TABLE = FactorTable(version=7, factors={"chatgpt": 4.0, "claude": 3.0})
+
+
+@pytest.mark.parametrize("storage", sorted(QUERY_LAYOUTS))
+def test_partitions_reprice_every_event_once(mongo_db, settings, monkeypatch, storage):
+    monkeypatch.setattr(settings, "queries_storage", storage)
+    layout = QUERY_LAYOUTS[storage]
+    repo = MongoRepository(db=mongo_db, layout=layout)
+    start = datetime(2026, 3, 1)
+    for i in range(40):
+        # Runs of three events share a timestamp, so batches end inside ties
+        ts = start + timedelta(minutes=10 * (i // 3))
+        _id = ObjectId.from_datetime(start + timedelta(seconds=i))  # ids spread in time, as in production
+        repo.insert_query(str(ObjectId()), ("chatgpt", "claude")[i % 2], 1.0, ts, _id=_id, factor_version=6)
+
+    bounds = reprice._partition_bounds(mongo_db, layout, 3)
+    assert len(bounds) == 2
+    key = reprice._partition_key(layout)
+    assert all(isinstance(bound, datetime if key == "timestamp" else ObjectId) for bound in bounds)
+    edges = [None, *bounds, None]
+    changed = sum(
+        reprice._reprice_partition(mongo_db, TABLE, i, lower, upper, batch_size=4)
+        for i, (lower, upper) in enumerate(zip(edges[:-1], edges[1:]))
+    )
+
+    assert changed == 40
+    events = list(mongo_db[layout.collection].find())
+    assert all(event["factor_version"] == 7 for event in events)
+    assert all(event["carbon_grams"] == TABLE.factors[layout.record(event).platform] for event in events)
@@ -0,0 +1,39 @@
+"""Tiered retention (app.jobs.retention) on mongomock."""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+from app.jobs.retention import compact_user
+from app.models.query import STANDARD_LAYOUT
+from app.repositories import MongoRepository
+
+CUTOFF = datetime(2026, 3, 1)
+
+
+def test_compacted_events_are_deleted_in_batches(mongo_db, settings, monkeypatch):
+    monkeypatch.setattr(settings, "deletion_batch_size", 3)
+    monkeypatch.setattr(settings, "deletion_max_docs_per_second", 1e9)
+    deletes = []
+    delete_many = type(mongo_db.queries).delete_many
+
+    def counted(collection, filter_, *args, **kwargs):
+        deletes.append(filter_)
+        return delete_many(collection, filter_, *args, **kwargs)
+
+    monkeypatch.setattr(type(mongo_db.queries), "delete_many", counted)
+    repo = MongoRepository(db=mongo_db, layout=STANDARD_LAYOUT)
+    user_id, other_id = ObjectId(), ObjectId()
+    for owner in (user_id, other_id):
+        for hours in range(-10, 4):
+            repo.insert_query(str(owner), "claude", 1.0, CUTOFF + timedelta(hours=hours))
+
+    # Summaries already written by an interrupted run: only the delete is left
+    user = {"_id": user_id, "compacted_until": CUTOFF}
+    assert compact_user(mongo_db, STANDARD_LAYOUT, user, CUTOFF, "day") == (0, 10)
+    assert len(deletes) == 4
+    assert mongo_db.queries.count_documents({"user_id": user_id}) == 4
+    assert mongo_db.queries.count_documents({"user_id": user_id, "timestamp": {"$lt": CUTOFF}}) == 0
+    assert mongo_db.queries.count_documents({"user_id": other_id}) == 14
@@ -6,9 +6,12 @@
  * flushes the queue once they authenticate.
  */
 
-import { dashboardAPI, isLoggedIn } from '../lib/api';
+import { dashboardAPI, factorsAPI, isLoggedIn } from '../lib/api';
 import { CARBON_PER_QUERY } from '../lib/constants';
 
+// Server factors are refreshed at most this often
+const FACTORS_MAX_AGE_MS = 6 * 60 * 60 * 1000;
+
 // ── Check auth state on startup ─────────────────────────────────────────────
 (async function checkAuth() {
   const loggedIn = await isLoggedIn();
@@ -37,9 +40,30 @@ chrome.runtime.onMessage.addListener((message, sender, sendResponse) => {
   return false;
 });
 
+// ── Carbon factors (server registry, bundled constants as fallback) ─────────
+async function getCarbonFactors() {
+  const { carbonq_factors } = await chrome.storage.local.get('carbonq_factors');
+  if (carbonq_factors && Date.now() - carbonq_factors.fetchedAt < FACTORS_MAX_AGE_MS) {
+    return carbonq_factors.factors;
+  }
+  try {
+    const { version, factors } = await factorsAPI.get();
+    await chrome.storage.local.set({
+      carbonq_factors: { version, factors, fetchedAt: Date.now() },
+    });
+    return factors;
+  } catch (err) {
+    console.warn('[CarbonQ] Could not fetch carbon factors, using bundled values:', err);
+    return carbonq_factors?.factors || CARBON_PER_QUERY;
+  }
+}
+
 // ── Core: persist a query event ─────────────────────────────────────────────
 async function handleQuerySubmitted(platform) {
-  const carbonGrams = CARBON_PER_QUERY[platform];
+  // The server prices queries itself; the local estimate is only kept for
+  // events queued while logged out.
+  const factors = await getCarbonFactors();
+  const carbonGrams = factors[platform];
   if (carbonGrams === undefined) {
     console.warn('[CarbonQ] Unknown platform:', platform);
     return;
@@ -105,6 +105,15 @@ export const dashboardAPI = {
   },
 };
 
+/**
+ * Carbon factors API (public, cacheable)
+ */
+export const factorsAPI = {
+  async get() {
+    return apiRequest('/factors');
+  },
+};
+
 /**
  * Check if user is logged in
  */
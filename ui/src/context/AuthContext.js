@@ -3,6 +3,18 @@ import { authAPI } from '../services/api';
 
 const AuthContext = createContext(null);
 
+// Day views are bucketed by the account's timezone; keep it in step with the browser.
+async function syncTimezone(account) {
+  const timezone = Intl.DateTimeFormat().resolvedOptions().timeZone;
+  if (!account || !timezone || account.timezone === timezone) return account;
+  try {
+    const { data } = await authAPI.updateMe({ timezone });
+    return data;
+  } catch {
+    return account;
+  }
+}
+
 export function AuthProvider({ children }) {
   const [user, setUser] = useState(null);
   const [loading, setLoading] = useState(true);
@@ -11,7 +23,7 @@ export function AuthProvider({ children }) {
     try {
       // Session is stored in httpOnly cookie, just check if it's valid
       const { data } = await authAPI.me();
-      setUser(data);
+      setUser(await syncTimezone(data));
     } catch {
       // Session invalid or expired
       setUser(null);
@@ -27,14 +39,14 @@ export function AuthProvider({ children }) {
   const login = async (email, password) => {
     const { data } = await authAPI.login(email, password);
     // Cookie is set automatically by the server
-    setUser(data.user);
+    setUser(await syncTimezone(data.user));
     return data;
   };
 
   const register = async (email, password) => {
     const { data } = await authAPI.register(email, password);
     // Cookie is set automatically by the server
-    setUser(data.user);
+    setUser(await syncTimezone(data.user));
     return data;
   };
 
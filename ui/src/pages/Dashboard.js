@@ -38,6 +38,36 @@ export default function Dashboard() {
     fetchData();
   }, []);
 
+  // Live updates: the server pushes fresh stats and today's bucket on every
+  // new query, so the dashboard never needs to refetch.
+  useEffect(() => {
+    const source = dashboardAPI.stream();
+    const applyUpdate = (event) => {
+      const { stats: nextStats, today } = JSON.parse(event.data);
+      setStats(nextStats);
+      setWeekly((prev) => {
+        if (!prev?.days?.length) return prev;
+        const last = prev.days[prev.days.length - 1];
+        let days;
+        if (last.date === today.date) {
+          days = [...prev.days.slice(0, -1), today];
+        } else if (last.date < today.date) {
+          days = [...prev.days.slice(1), today];
+        } else {
+          return prev;
+        }
+        return {
+          days,
+          total_queries: days.reduce((s, d) => s + d.queries, 0),
+          total_carbon: Number(days.reduce((s, d) => s + d.carbon, 0).toFixed(2)),
+        };
+      });
+    };
+    source.addEventListener('snapshot', applyUpdate);
+    source.addEventListener('query', applyUpdate);
+    return () => source.close();
+  }, []);
+
   const trend = useMemo(() => {
     if (!weekly?.days || weekly.days.length < 2) return { direction: 'flat', percent: 0 };
     const days = weekly.days;
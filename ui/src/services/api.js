@@ -19,6 +19,7 @@ export const authAPI = {
   register: (email, password) => api.post('/auth/register', { email, password }),
   logout: () => api.post('/auth/logout'),
   me: () => api.get('/auth/me'),
+  updateMe: (fields) => api.patch('/auth/me', fields),
 };
 
 export const dashboardAPI = {
@@ -27,6 +28,10 @@ export const dashboardAPI = {
   recent: (limit = 15) => api.get(`/dashboard/recent?limit=${limit}`),
   weekly: () => api.get('/dashboard/weekly'),
   googleSearchComparison: () => api.get('/dashboard/google-search-comparison'),
+  // What-if scenarios; the response includes the totals and factors to re-evaluate locally
+  scenarios: (scenarios, days = 14) => api.post('/dashboard/scenarios', { scenarios, days }),
+  // Server-Sent Events: `snapshot` and `query` events with stats + today's bucket
+  stream: () => new EventSource(`${API_URL}/dashboard/stream`, { withCredentials: true }),
 };
 
 export default api;